@@ -0,0 +1,47 @@
+"""图片输出方案基准：比较各输出方案生成的PDF大小和耗时
+
+默认生成 600 DPI 的 A4 彩色扫描件和黑白文字扫描件各若干张，分别按各方案转换为A4页面。
+
+    python benchmarks/bench_image_profiles.py --files 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pdf'))
+
+from corpus import make_image_corpus  # noqa: E402
+from pdf_ops import images_to_pdf, format_size, IMAGE_PROFILES  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--dpi", type=int, default=600, help="生成的扫描件分辨率")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    # A4 纸为 8.27 × 11.69 英寸
+    width, height = round(8.27 * args.dpi), round(11.69 * args.dpi)
+    with tempfile.TemporaryDirectory() as tmp:
+        corpora = {
+            "彩色": make_image_corpus(os.path.join(tmp, "color"), args.files, width, height, args.dpi),
+            "黑白": make_image_corpus(os.path.join(tmp, "bilevel"), args.files, width, height, args.dpi,
+                                    bilevel=True),
+        }
+        input_size = sum(os.path.getsize(f) for files in corpora.values() for f in files)
+        print(f"{args.files} 张 × 2 组 {width}×{height}（{args.dpi} DPI）BMP，共 {format_size(input_size)}")
+        for name, files in corpora.items():
+            for profile in IMAGE_PROFILES:
+                output = os.path.join(tmp, "out.pdf")
+                start = time.perf_counter()
+                images_to_pdf(files, output, "A4纸", workers=args.workers, profile=profile)
+                elapsed = time.perf_counter() - start
+                print(f"{name}  {profile:<10}  {format_size(os.path.getsize(output)):>10}  {elapsed:7.2f} 秒")
+                os.remove(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""并行图片转PDF基准：比较单进程与多进程转换大量需要重新编码的图片的耗时
+
+    python benchmarks/bench_parallel_img2pdf.py --files 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pdf'))
+
+from corpus import make_image_corpus  # noqa: E402
+from pdf_ops import images_to_pdf, default_workers  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1240)
+    parser.add_argument("--height", type=int, default=1754)
+    parser.add_argument("--workers", type=int, nargs="*",
+                        help="要测试的进程数，默认 1、2、4…直到CPU数")
+    args = parser.parse_args()
+
+    workers_list = args.workers
+    if not workers_list:
+        workers_list, n = [], 1
+        while n < default_workers():
+            workers_list.append(n)
+            n *= 2
+        workers_list.append(default_workers())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = make_image_corpus(os.path.join(tmp, "corpus"), args.files, args.width, args.height)
+        print(f"{args.files} 张 {args.width}×{args.height} BMP 图片")
+        baseline = None
+        for workers in workers_list:
+            output = os.path.join(tmp, f"images_{workers}.pdf")
+            start = time.perf_counter()
+            images_to_pdf(files, output, workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"进程数 {workers:>2}: {elapsed:7.2f} 秒  加速比 {baseline / elapsed:5.2f}x")
+            os.remove(output)
+
+
+if __name__ == "__main__":
+    main()
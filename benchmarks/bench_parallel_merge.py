@@ -0,0 +1,48 @@
+"""并行合并基准：比较单进程与多进程合并大量PDF的耗时
+
+    python benchmarks/bench_parallel_merge.py --files 400 --pages 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pdf'))
+
+from corpus import make_pdf_corpus  # noqa: E402
+from pdf_ops import merge_pdf_files, default_workers  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="*",
+                        help="要测试的进程数，默认 1、2、4…直到CPU数")
+    args = parser.parse_args()
+
+    workers_list = args.workers
+    if not workers_list:
+        workers_list, n = [], 1
+        while n < default_workers():
+            workers_list.append(n)
+            n *= 2
+        workers_list.append(default_workers())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = make_pdf_corpus(os.path.join(tmp, "corpus"), args.files, args.pages)
+        print(f"{args.files} 个文件 × {args.pages} 页")
+        baseline = None
+        for workers in workers_list:
+            output = os.path.join(tmp, f"merged_{workers}.pdf")
+            start = time.perf_counter()
+            merge_pdf_files(files, output, workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"进程数 {workers:>2}: {elapsed:7.2f} 秒  加速比 {baseline / elapsed:5.2f}x")
+            os.remove(output)
+
+
+if __name__ == "__main__":
+    main()
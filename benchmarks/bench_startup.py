@@ -0,0 +1,75 @@
+"""测量图形界面的启动时间：从启动解释器到主窗口第一次显示
+
+每次在新的子进程中启动，模块缓存、已解析的样式表都不会被复用；没有显示器时使用
+offscreen 平台。输出启动解释器、导入模块、创建窗口到显示的各段耗时（取中位数），
+以及启动后是否已加载 PyPDF2。
+
+    python benchmarks/bench_startup.py --repeat 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PDF_DIR = os.path.join(BENCH_DIR, '..', 'pdf')
+
+
+def run_child():
+    """在子进程中启动界面，窗口显示后输出各时间点（time.time()）"""
+    entered = time.time()
+    sys.path.insert(0, PDF_DIR)
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+    import pdf_merger
+    imported = time.time()
+    window = pdf_merger.PDFMergerApp()
+    window.show()
+    # 事件循环第一次空闲时窗口已完成布局和绘制
+    QTimer.singleShot(0, app.quit)
+    app.exec_()
+    shown = time.time()
+    print(json.dumps({"entered": entered, "imported": imported, "shown": shown,
+                      "pypdf2_loaded": "PyPDF2" in sys.modules}))
+
+
+def measure():
+    env = dict(os.environ)
+    if not env.get("DISPLAY") and sys.platform.startswith("linux"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.time()
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                               capture_output=True, text=True, env=env, check=True)
+    times = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {
+        "interpreter": times["entered"] - start,
+        "import": times["imported"] - times["entered"],
+        "window": times["shown"] - times["imported"],
+        "total": times["shown"] - start,
+        "pypdf2_loaded": times["pypdf2_loaded"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图形界面启动时间")
+    parser.add_argument("--repeat", type=int, default=5, help="启动次数，耗时取中位数")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child()
+        return
+
+    measure()  # 预热：生成 .pyc，之后的测量与正常启动一致
+    runs = [measure() for _ in range(args.repeat)]
+    for key, label in (("interpreter", "启动解释器"), ("import", "导入模块"),
+                       ("window", "创建并显示窗口"), ("total", "到第一个窗口")):
+        print(f"{label:<10} {statistics.median(run[key] for run in runs) * 1000:8.1f} 毫秒")
+    print(f"启动后已加载 PyPDF2: {'是' if runs[-1]['pypdf2_loaded'] else '否'}")
+
+
+if __name__ == "__main__":
+    main()
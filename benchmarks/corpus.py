@@ -0,0 +1,159 @@
+"""生成基准测试用的合成PDF文件（不依赖任何第三方库）
+
+所有内容由 seed 决定，同样的参数每次生成完全相同的文件，测试结果可以复现。
+"""
+import os
+import random
+import struct
+import zlib
+
+FONT_NAMES = ("Helvetica", "Times-Roman", "Courier")
+
+
+def make_pdf(path, pages, lines_per_page=40, seed=0):
+    """生成一个 pages 页的PDF，每页有独立的字体字典和压缩后的文字内容流"""
+    objects = []  # 按编号顺序保存对象内容，编号从1开始
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_root = add(None)
+    kids = []
+    for page_index in range(pages):
+        font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /%s >>"
+                   % FONT_NAMES[(seed + page_index) % len(FONT_NAMES)].encode())
+        text = b"".join(b"BT /F1 10 Tf 40 %d Td (File %d page %d line %d: the quick brown fox) Tj ET\n"
+                        % (800 - 18 * line, seed, page_index, line) for line in range(lines_per_page))
+        data = zlib.compress(text)
+        content = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(data), data))
+        kids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+                        b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+                        % (pages_root, font, content)))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_root
+    objects[pages_root - 1] = b"<< /Type /Pages /Count %d /Kids [%s] >>" % (
+        len(kids), b" ".join(b"%d 0 R" % kid for kid in kids))
+    return _write_pdf(path, objects, catalog)
+
+
+def _write_pdf(path, objects, catalog):
+    """按编号顺序写出对象、交叉引用表和文件尾"""
+    with open(path, 'wb') as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for num, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (num, body))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        f.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+        f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                % (len(objects) + 1, catalog, xref))
+    return path
+
+
+def _template_bytes(length, seed):
+    """确定性的伪随机字节，同一 seed 在每个文件中完全相同，模拟模板中嵌入的字体"""
+    return random.Random(seed).randbytes(length)
+
+
+def make_invoice_pdf(path, seed=0, pages=1):
+    """生成一张“同一模板”的发票：每个文件都嵌入同样的字体和标志图片，内容流未压缩
+
+    字体程序和标志图片在所有文件中逐字节相同，只有文字内容随 seed 变化，
+    接近批量导出的账单、报表。
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_root = add(None)
+    font_data = zlib.compress(_template_bytes(48 * 1024, 1))
+    font_file = add(b"<< /Length %d /Length1 %d /Filter /FlateDecode >>\nstream\n%s\nendstream"
+                    % (len(font_data), 48 * 1024, font_data))
+    descriptor = add(b"<< /Type /FontDescriptor /FontName /InvoiceSans /Flags 32 "
+                     b"/FontBBox [0 -200 1000 900] /ItalicAngle 0 /Ascent 900 /Descent -200 "
+                     b"/CapHeight 700 /StemV 80 /FontFile2 %d 0 R >>" % font_file)
+    font = add(b"<< /Type /Font /Subtype /TrueType /BaseFont /InvoiceSans /FirstChar 32 /LastChar 126 "
+               b"/Widths [%s] /FontDescriptor %d 0 R >>" % (b" ".join([b"500"] * 95), descriptor))
+    # 未压缩的 RGB 标志图片
+    logo_pixels = bytes((x * 7 + y * 3) & 0xFF for y in range(60) for x in range(450))
+    logo = add(b"<< /Type /XObject /Subtype /Image /Width 150 /Height 60 /ColorSpace /DeviceRGB "
+               b"/BitsPerComponent 8 /Length %d >>\nstream\n%s\nendstream" % (len(logo_pixels), logo_pixels))
+    kids = []
+    for page_index in range(pages):
+        text = b"q 150 0 0 60 40 760 cm /Logo Do Q\n" + b"".join(
+            b"BT /F1 10 Tf 40 %d Td (Invoice %d page %d item %d: widget x %d) Tj ET\n"
+            % (700 - 16 * line, seed, page_index, line, (seed * 31 + line) % 97) for line in range(40))
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(text), text))
+        kids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+                        b"/Resources << /Font << /F1 %d 0 R >> /XObject << /Logo %d 0 R >> >> "
+                        b"/Contents %d 0 R >>" % (pages_root, font, logo, content)))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_root
+    objects[pages_root - 1] = b"<< /Type /Pages /Count %d /Kids [%s] >>" % (
+        len(kids), b" ".join(b"%d 0 R" % kid for kid in kids))
+    return _write_pdf(path, objects, catalog)
+
+
+def make_invoice_corpus(directory, files, pages=1):
+    """在 directory 中生成 files 张同一模板的发票，返回按顺序排列的路径"""
+    os.makedirs(directory, exist_ok=True)
+    return [make_invoice_pdf(os.path.join(directory, f"invoice_{index:05d}.pdf"), seed=index, pages=pages)
+            for index in range(files)]
+
+
+def make_pdf_corpus(directory, files, pages):
+    """在 directory 中生成 files 个各 pages 页的PDF，返回按顺序排列的路径"""
+    os.makedirs(directory, exist_ok=True)
+    return [make_pdf(os.path.join(directory, f"doc_{index:05d}.pdf"), pages, seed=index)
+            for index in range(files)]
+
+
+def make_bmp(path, width, height, seed=0, dpi=300, bilevel=False):
+    """生成一张 24 位 BMP 图片，img2pdf 需要解码并重新压缩
+
+    彩色内容为渐变加逐行不同的噪点，接近照片，无损压缩效果差；
+    bilevel 为 True 时是黑白两色的“文字行”，模拟文字扫描件。
+    """
+    rng = random.Random(seed)
+    row_bytes = width * 3
+    padding = bytes(((row_bytes + 3) & ~3) - row_bytes)
+    rows = []
+    if bilevel:
+        white = b"\xff" * row_bytes
+        line = white
+        for y in range(height):
+            if y % 48 == 0:
+                # 每个文字行随机生成一组“字形”黑块，行内各像素行相同
+                pattern = bytearray(white)
+                for x, value in zip(range(0, width - 8, 12), rng.randbytes(width // 12)):
+                    if value < 160:
+                        pattern[x * 3:(x + 4 + value % 5) * 3] = bytes((4 + value % 5) * 3)
+                line = bytes(pattern)
+            rows.append((line if y % 48 < 30 else white) + padding)
+    else:
+        gradient = bytes((x * 255 // max(width, 1) + seed) & 0xFF for x in range(row_bytes))
+        for y in range(height):
+            row = bytearray(gradient)
+            row[y % 4::4] = rng.randbytes(len(range(y % 4, row_bytes, 4)))
+            rows.append(bytes(row) + padding)
+    pixels = b"".join(rows)
+    pixels_per_meter = round(dpi / 0.0254)
+    with open(path, 'wb') as f:
+        f.write(b"BM" + struct.pack("<IHHI", 54 + len(pixels), 0, 0, 54))
+        f.write(struct.pack("<IiiHHIIiiII", 40, width, height, 1, 24, 0, len(pixels),
+                            pixels_per_meter, pixels_per_meter, 0, 0))
+        f.write(pixels)
+    return path
+
+
+def make_image_corpus(directory, files, width=1240, height=1754, dpi=150, bilevel=False):
+    """在 directory 中生成 files 张 BMP 图片（默认为 150 DPI 的 A4），返回按顺序排列的路径"""
+    os.makedirs(directory, exist_ok=True)
+    return [make_bmp(os.path.join(directory, f"scan_{index:05d}.bmp"), width, height, seed=index,
+                     dpi=dpi, bilevel=bilevel)
+            for index in range(files)]
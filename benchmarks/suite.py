@@ -0,0 +1,260 @@
+"""基准测试套件：在无界面环境下测量合并、提取、拆分和图片转PDF的耗时、峰值内存和输出大小
+
+语料由 corpus.py 按固定 seed 生成并缓存在 --corpus-dir 中，每个场景在独立的子进程中
+运行，互不共享缓存，峰值内存也只计该场景（含其进程池）。结果写成 JSON，
+与基线比较时超出容差的指标标记为退化，退出码为 1，适合放进每晚的批处理。
+
+    python benchmarks/suite.py --quick                      # 小语料，几十秒跑完
+    python benchmarks/suite.py --save-baseline baseline.json
+    python benchmarks/suite.py --baseline baseline.json --output latest.json
+    python benchmarks/suite.py --only merge_small extract_pages
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import shutil
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'pdf'))
+
+from corpus import make_pdf, make_pdf_corpus, make_invoice_corpus, make_image_corpus  # noqa: E402
+
+# 语料规模：(完整, --quick)
+CORPORA = {
+    "small_pdfs": ({"files": 300, "pages": 5}, {"files": 60, "pages": 5}),
+    "huge_pdfs": ({"files": 2, "pages": 5000}, {"files": 2, "pages": 1000}),
+    "invoices": ({"files": 300}, {"files": 60}),
+    "scans": ({"files": 12, "width": 2480, "height": 3508, "dpi": 300},
+              {"files": 4, "width": 1240, "height": 1754, "dpi": 150}),
+}
+
+# 语料生成方式改变时加一，已缓存的语料会重新生成，版本不同的基线不可比较
+CORPUS_VERSION = 1
+
+# 默认容差：耗时 +20%，峰值内存 +15%，输出大小 +1%；低于噪声下限的差值不算退化
+TOLERANCES = {"wall": 0.20, "peak_rss": 0.15, "output_size": 0.01}
+NOISE_FLOOR = {"wall": 0.05, "peak_rss": 8 * 1024 * 1024, "output_size": 1024}
+
+
+def build_corpus(name, corpus_dir, quick):
+    """生成（或复用已生成的）语料，返回文件路径列表"""
+    spec = CORPORA[name][1 if quick else 0]
+    directory = os.path.join(corpus_dir, "quick" if quick else "full", name)
+    marker = os.path.join(directory, ".done")
+    stamp = dict(spec, version=CORPUS_VERSION)
+    if _read_marker(marker) != stamp:
+        shutil.rmtree(directory, ignore_errors=True)
+        if name == "small_pdfs":
+            make_pdf_corpus(directory, spec["files"], spec["pages"])
+        elif name == "huge_pdfs":
+            os.makedirs(directory, exist_ok=True)
+            for index in range(spec["files"]):
+                make_pdf(os.path.join(directory, f"huge_{index}.pdf"), spec["pages"], seed=index)
+        elif name == "invoices":
+            make_invoice_corpus(directory, spec["files"])
+        else:
+            make_image_corpus(directory, spec["files"], spec["width"], spec["height"], spec["dpi"])
+        with open(marker, 'w') as f:
+            json.dump(stamp, f)
+    return sorted(os.path.join(directory, entry) for entry in os.listdir(directory) if not entry.startswith('.'))
+
+
+def _read_marker(marker):
+    try:
+        with open(marker) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(files, out, **kwargs):
+    from pdf_ops import merge_pdf_files
+    merge_pdf_files(files, out, **kwargs)
+    return [out]
+
+
+def _extract(files, out):
+    from pdf_ops import extract_pages, count_pages
+    pages = count_pages(files[0])
+    extract_pages(files[0], [1, pages // 2, pages], out)
+    return [out]
+
+
+def _split(files, out):
+    from pdf_ops import split_pdf_file, every_n_pages, split_output_names, count_pages
+    output_dir = os.path.splitext(out)[0]
+    os.makedirs(output_dir, exist_ok=True)
+    groups = every_n_pages(count_pages(files[0]), 100)
+    outputs = split_output_names(files[0], groups, output_dir=output_dir)
+    split_pdf_file(files[0], groups, outputs)
+    return outputs
+
+
+def _img2pdf(files, out, **kwargs):
+    from pdf_ops import images_to_pdf
+    images_to_pdf(files, out, "A4纸", **kwargs)
+    return [out]
+
+
+def _workers():
+    from pdf_ops import default_workers
+    return default_workers()
+
+
+# 场景：名称 -> (语料, 运行函数(文件列表, 输出文件) -> 输出文件列表)
+SCENARIOS = {
+    "merge_small": ("small_pdfs", lambda files, out: _merge(files, out)),
+    "merge_small_parallel": ("small_pdfs", lambda files, out: _merge(files, out, workers=_workers())),
+    "merge_huge": ("huge_pdfs", lambda files, out: _merge(files, out)),
+    "merge_optimize": ("invoices", lambda files, out: _merge(files, out, optimize=True)),
+    "extract_pages": ("huge_pdfs", _extract),
+    "split_every_100": ("huge_pdfs", _split),
+    "img2pdf_original": ("scans", lambda files, out: _img2pdf(files, out)),
+    "img2pdf_screen": ("scans", lambda files, out: _img2pdf(files, out, profile="屏幕 150 DPI")),
+    "img2pdf_parallel": ("scans", lambda files, out: _img2pdf(files, out, workers=_workers())),
+}
+
+
+def _peak_rss():
+    """本进程和已结束的子进程（进程池）中最大的峰值RSS"""
+    from pdf_ops import memory_usage
+    peak = memory_usage()[1] or 0
+    try:
+        import resource
+    except ImportError:
+        return peak
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    children *= 1 if sys.platform == "darwin" else 1024
+    return max(peak, children)
+
+
+def run_child(name, corpus_dir, quick, work_dir):
+    """在子进程中运行一个场景，结果以一行 JSON 输出到 stdout"""
+    corpus, run = SCENARIOS[name]
+    files = build_corpus(corpus, corpus_dir, quick)
+    out = os.path.join(work_dir, f"{name}.pdf")
+    start = time.perf_counter()
+    outputs = run(files, out)
+    wall = time.perf_counter() - start
+    output_size = sum(os.path.getsize(path) for path in outputs)
+    for path in outputs:
+        os.remove(path)
+    print(json.dumps({"wall": wall, "peak_rss": _peak_rss(), "output_size": output_size}))
+
+
+def run_scenario(name, args):
+    """重复运行一个场景，耗时取中位数，峰值内存取最大值"""
+    runs = []
+    for _ in range(args.repeat):
+        command = [sys.executable, os.path.abspath(__file__), "--child", name,
+                   "--corpus-dir", args.corpus_dir, "--work-dir", args.work_dir]
+        if args.quick:
+            command.append("--quick")
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"场景 {name} 运行失败：\n{completed.stderr}")
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {
+        "wall": statistics.median(run["wall"] for run in runs),
+        "peak_rss": max(run["peak_rss"] for run in runs),
+        "output_size": runs[-1]["output_size"],
+        "runs": len(runs),
+    }
+
+
+def compare(results, baseline):
+    """返回 [(场景, 指标, 基线值, 当前值, 是否退化)]，只列出超出容差的变化"""
+    changes = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        for metric, tolerance in TOLERANCES.items():
+            old, new = base.get(metric), result[metric]
+            if not old:
+                continue
+            if abs(new - old) <= NOISE_FLOOR[metric] or abs(new - old) <= old * tolerance:
+                continue
+            changes.append((name, metric, old, new, new > old))
+    return changes
+
+
+def _format(metric, value):
+    from pdf_ops import format_size
+    return f"{value:.2f} 秒" if metric == "wall" else format_size(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="使用小语料")
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS), metavar="场景", help="只运行指定场景")
+    parser.add_argument("--repeat", type=int, default=3, help="每个场景运行的次数，耗时取中位数")
+    parser.add_argument("--corpus-dir", default=os.path.join(BENCH_DIR, ".corpus"),
+                        help="语料缓存目录，生成一次后重复使用")
+    parser.add_argument("--work-dir", help="输出文件的临时目录，默认为语料目录下的 work")
+    parser.add_argument("--output", help="把结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="与该 JSON 结果比较，出现退化时退出码为 1")
+    parser.add_argument("--save-baseline", metavar="FILE", help="把本次结果保存为基线")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.work_dir = args.work_dir or os.path.join(args.corpus_dir, "work")
+    os.makedirs(args.work_dir, exist_ok=True)
+
+    if args.child:
+        run_child(args.child, args.corpus_dir, args.quick, args.work_dir)
+        return 0
+
+    names = args.only or list(SCENARIOS)
+    # 先在父进程中生成语料，生成时间和内存不计入场景
+    for corpus in sorted({SCENARIOS[name][0] for name in names}):
+        start = time.perf_counter()
+        files = build_corpus(corpus, args.corpus_dir, args.quick)
+        print(f"语料 {corpus}: {len(files)} 个文件（{time.perf_counter() - start:.1f} 秒）")
+
+    results = {}
+    for name in names:
+        results[name] = result = run_scenario(name, args)
+        print(f"{name:<22} {_format('wall', result['wall']):>10} {_format('peak_rss', result['peak_rss']):>10} "
+              f"{_format('output_size', result['output_size']):>10}")
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": args.quick,
+            "corpus_version": CORPUS_VERSION,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    meta = baseline.get("meta", {})
+    if meta.get("quick") != args.quick or meta.get("corpus_version") != CORPUS_VERSION:
+        print("注意：基线与本次使用的语料不同，比较结果没有意义")
+    regressions = 0
+    for name, metric, old, new, worse in compare(results, baseline):
+        regressions += worse
+        label = "退化" if worse else "改善"
+        print(f"{label}: {name} {metric} {_format(metric, old)} -> {_format(metric, new)} ({new / old - 1:+.0%})")
+    print(f"与基线比较：{regressions} 项退化" if regressions else "与基线比较：没有退化")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
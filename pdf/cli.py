@@ -0,0 +1,348 @@
+"""PDF工具箱命令行入口，不依赖Qt，可在无显示环境的服务器上运行
+
+用法示例：
+    python pdf/cli.py merge 输出.pdf a.pdf b.pdf 文件夹/
+    python pdf/cli.py extract 原文件.pdf 1,3,5-9 [-o 输出.pdf]
+    python pdf/cli.py split 原文件.pdf --every 10 [-o 输出文件夹]
+    python pdf/cli.py img2pdf 输出.pdf 1.jpg 2.png --paper A4
+    python pdf/cli.py batch 任务清单.json
+    python pdf/cli.py watch 扫描文件夹/ [--rule name] [--gap 30]
+    python pdf/cli.py serve [--port 8765] [-j 4]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from pdf_ops import (OperationError, PDF_EXTENSIONS, IMAGE_EXTENSIONS, iter_files,
+                     merge_pdf_files, extract_pages, images_to_pdf, parse_page_ranges,
+                     extract_output_name, count_pages, format_size, default_workers,
+                     parse_range_groups, every_n_pages, split_output_names, split_pdf_file,
+                     split_by_bookmarks, error_message)
+import instrument
+
+# 命令行中输出方案的写法，对应界面中的选项
+IMAGE_PROFILE_NAMES = {
+    "original": "原图（无损）",
+    "print": "打印 300 DPI",
+    "screen": "屏幕 150 DPI",
+}
+
+# 命令行中纸张类型的写法，对应界面中的选项
+PAPER_TYPES = {
+    "original": "原图", "原图": "原图",
+    "a4": "A4纸", "A4纸": "A4纸",
+    "a3": "A3纸", "A3纸": "A3纸",
+}
+
+
+def run_merge(inputs, output, memory_limit=None, streaming=True, workers=None, optimize=False, incremental=False):
+    with instrument.stage("scan") as scanning:
+        files = list(iter_files(inputs, PDF_EXTENSIONS))
+        scanning.add(files=len(files))
+    if not files:
+        raise OperationError("未找到任何PDF文件")
+    start = time.monotonic()
+    result = merge_pdf_files(files, output, streaming=streaming, memory_limit=memory_limit,
+                             workers=workers, optimize=optimize, incremental=incremental)
+    message = f"已合并 {len(files)} 个文件，共 {result['pages']} 页，峰值内存 {format_size(result['peak_rss'])}"
+    if "reused" in result:
+        message += (f"，重用 {result['reused']} 个未改动的文件，重新解析 {result['rebuilt']} 个，"
+                    f"用时 {time.monotonic() - start:.1f} 秒")
+    if optimize:
+        message += (f"，输出 {format_size(os.path.getsize(output))}，共享 {result['shared_objects']} 个重复对象，"
+                    f"约节省 {format_size(result['saved_bytes'])}，用时 {time.monotonic() - start:.1f} 秒")
+    return message
+
+
+def run_extract(input_file, pages, output=None):
+    max_pages = count_pages(input_file)
+    page_list = parse_page_ranges(pages, max_pages)
+    if page_list is None:
+        raise OperationError(f"页码格式错误或超出范围（共 {max_pages} 页）")
+    extract_pages(input_file, page_list, output or extract_output_name(input_file, page_list))
+    return f"已提取 {len(page_list)} 页"
+
+
+def run_split(input_file, ranges=None, every=None, bookmarks=False, output_dir=None, workers=None):
+    """按多组页码、每 N 页或顶层书签把一个PDF拆分为多个文件，源文件只解析一次"""
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    start = time.monotonic()
+    if bookmarks:
+        result = split_by_bookmarks(input_file, output_dir, workers=workers)
+    else:
+        max_pages = count_pages(input_file)
+        if ranges:
+            groups = parse_range_groups(ranges, max_pages)
+            if groups is None:
+                raise OperationError(f"页码格式错误或超出范围（共 {max_pages} 页）")
+        elif every:
+            groups = every_n_pages(max_pages, int(every))
+        else:
+            raise OperationError("请指定拆分方式：--ranges、--every 或 --bookmarks")
+        result = split_pdf_file(input_file, groups, split_output_names(input_file, groups, output_dir=output_dir),
+                                workers=workers)
+    return f"已拆分为 {result['outputs']} 个文件，共 {result['pages']} 页，用时 {time.monotonic() - start:.1f} 秒"
+
+
+def run_img2pdf(inputs, output, paper="原图", workers=None, profile="original"):
+    with instrument.stage("scan") as scanning:
+        files = list(iter_files(inputs, IMAGE_EXTENSIONS))
+        scanning.add(files=len(files))
+    if not files:
+        raise OperationError("未找到任何图片文件")
+    paper_type = PAPER_TYPES.get(paper.lower()) or PAPER_TYPES.get(paper)
+    if paper_type is None:
+        raise OperationError(f"未知的纸张设置: {paper}")
+    profile_name = IMAGE_PROFILE_NAMES.get(profile.lower())
+    if profile_name is None:
+        raise OperationError(f"未知的输出方案: {profile}")
+    start = time.monotonic()
+    images_to_pdf(files, output, paper_type, workers=workers, profile=profile_name)
+    return (f"已转换 {len(files)} 张图片，输出 {format_size(os.path.getsize(output))}，"
+            f"用时 {time.monotonic() - start:.1f} 秒")
+
+
+def run_watch(folder, output_dir=None, rule="time", gap=None, pattern=None, settle=None, poll=None,
+              polling=False, paper="原图", profile="original", workers=None):
+    """监视文件夹，文件写完后按规则分组合并或转换，直到按下 Ctrl+C"""
+    from watch_folder import (FolderWatcher, process_group, notifications_available, DEFAULT_GAP,
+                              DEFAULT_PATTERN, DEFAULT_SETTLE, DEFAULT_POLL_INTERVAL)
+    if not os.path.isdir(folder):
+        raise OperationError(f"文件夹不存在: {folder}")
+    paper_type = PAPER_TYPES.get(paper.lower()) or PAPER_TYPES.get(paper)
+    if paper_type is None:
+        raise OperationError(f"未知的纸张设置: {paper}")
+    profile_name = IMAGE_PROFILE_NAMES.get(profile.lower())
+    if profile_name is None:
+        raise OperationError(f"未知的输出方案: {profile}")
+    watcher = FolderWatcher(folder, output_dir, rule=rule, gap=gap or DEFAULT_GAP,
+                            pattern=pattern or DEFAULT_PATTERN, settle=settle or DEFAULT_SETTLE,
+                            poll_interval=poll or DEFAULT_POLL_INTERVAL, polling=polling)
+    mode = "文件通知" if not polling and notifications_available() else "定时扫描"
+    print(f"正在监视 {watcher.folder}（{mode}），输出到 {watcher.output_dir}，按 Ctrl+C 停止", flush=True)
+    for group in watcher.groups():
+        start = time.monotonic()
+        try:
+            process_group(group, paper_type, profile_name, workers)
+        except (OperationError, OSError) as e:
+            # 失败的文件留在 已处理 文件夹中，不影响之后的文件
+            print(f"失败: {group.name}（{len(group.files)} 个文件）: {_describe_error(e)}",
+                  file=sys.stderr, flush=True)
+            continue
+        print(f"{group.name}: {len(group.files)} 个文件 → {group.output}，用时 {time.monotonic() - start:.1f} 秒",
+              flush=True)
+
+
+def run_job(job):
+    """执行一个任务字典，键与子命令参数一致"""
+    command = job.get("command")
+    if command == "merge":
+        return run_merge(job["inputs"], job["output"], workers=job.get("workers"),
+                         optimize=_flag(job.get("optimize")), incremental=_flag(job.get("incremental")))
+    if command == "extract":
+        return run_extract(job["input"], job["pages"], job.get("output"))
+    if command == "split":
+        return run_split(job["input"], job.get("ranges"), job.get("every"), _flag(job.get("bookmarks")),
+                         job.get("output"), job.get("workers"))
+    if command == "img2pdf":
+        return run_img2pdf(job["inputs"], job["output"], job.get("paper") or "原图", job.get("workers"),
+                           job.get("profile") or "original")
+    raise OperationError(f"未知的任务类型: {command}")
+
+
+def _flag(value):
+    """清单中的开关：JSON 中为布尔值，CSV 中为 1/true/yes"""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def load_manifest(manifest_path):
+    """读取 JSON 或 CSV 任务清单，相对路径以清单所在文件夹为基准
+
+    JSON：任务字典的列表，或 {"jobs": [...]}。
+    CSV：表头为 command,output,inputs,input,pages,paper,profile,optimize,incremental,ranges,every,bookmarks，
+    多个输入用分号分隔。
+    split 任务的 output 为输出文件夹。
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    if manifest_path.lower().endswith('.csv'):
+        with open(manifest_path, newline='', encoding='utf-8-sig') as f:
+            jobs = []
+            for row in csv.DictReader(f):
+                job = {key: value.strip() for key, value in row.items() if key and value and value.strip()}
+                if "inputs" in job:
+                    job["inputs"] = [p.strip() for p in job["inputs"].split(';') if p.strip()]
+                jobs.append(job)
+    else:
+        with open(manifest_path, encoding='utf-8') as f:
+            data = json.load(f)
+        jobs = data["jobs"] if isinstance(data, dict) else data
+
+    def resolve(path):
+        return os.path.join(base_dir, os.path.expanduser(path))
+
+    for job in jobs:
+        for key in ("input", "output"):
+            if job.get(key):
+                job[key] = resolve(job[key])
+        if job.get("inputs"):
+            job["inputs"] = [resolve(p) for p in job["inputs"]]
+    return jobs
+
+
+def run_batch(manifest, stop_on_error=False):
+    jobs = load_manifest(manifest)
+    failed = 0
+    start = time.monotonic()
+    for index, job in enumerate(jobs, 1):
+        try:
+            with instrument.job(job.get("command") or "batch", manifest=manifest, index=index):
+                message = run_job(job)
+            print(f"[{index}/{len(jobs)}] {job.get('command')} {job.get('output') or job.get('input')}: {message}")
+        except (OperationError, OSError, KeyError, ValueError) as e:
+            failed += 1
+            print(f"[{index}/{len(jobs)}] 失败: {_describe_error(e)}", file=sys.stderr)
+            if stop_on_error:
+                break
+    print(f"完成 {len(jobs) - failed}/{len(jobs)} 个任务，用时 {time.monotonic() - start:.1f} 秒")
+    return 1 if failed else 0
+
+
+def _describe_error(error):
+    if isinstance(error, KeyError):
+        return f"任务缺少字段 {error}"
+    return error_message(error)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pdf-toolbox", description="PDF工具箱命令行版：合并、提取、图片转PDF")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    merge = subparsers.add_parser("merge", help="按顺序合并PDF文件")
+    merge.add_argument("output", help="输出文件")
+    merge.add_argument("inputs", nargs="+", help="PDF文件或文件夹（文件夹内按名称排序）")
+    merge.add_argument("--memory-limit", type=int, metavar="MB", help="内存上限，超过时释放解析缓存")
+    merge.add_argument("--in-memory", action="store_true", help="在内存中构建整个文档后再写出")
+    merge.add_argument("-j", "--workers", type=int, default=1, metavar="N",
+                       help=f"并行解析的进程数，0 表示使用全部CPU（{default_workers()}）")
+    merge.add_argument("--optimize", action="store_true",
+                       help="共享重复的字体和图片、压缩未压缩的内容并使用对象流，输出更小（单进程）")
+    merge.add_argument("--incremental", action="store_true",
+                       help="在输出旁保存合并记录，再次合并时只重新解析改动过的文件")
+
+    extract = subparsers.add_parser("extract", help="提取指定页面")
+    extract.add_argument("input", help="PDF文件")
+    extract.add_argument("pages", help="页码，如 1,3,5-9")
+    extract.add_argument("-o", "--output", help="输出文件，默认保存到原文件夹")
+
+    split = subparsers.add_parser("split", help="一次拆分出多个文件：多组页码、每 N 页或按书签")
+    split.add_argument("input", help="PDF文件")
+    mode = split.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--ranges", help="多组页码，每组一个文件，用分号分隔，如 \"1-3;4-9;10,12\"")
+    mode.add_argument("--every", type=int, metavar="N", help="每 N 页一个文件")
+    mode.add_argument("--bookmarks", action="store_true", help="每个顶层书签一个文件")
+    split.add_argument("-o", "--output-dir", help="输出文件夹，默认保存到原文件夹")
+    split.add_argument("-j", "--workers", type=int, default=1, metavar="N",
+                       help=f"并行写出的进程数，0 表示使用全部CPU（{default_workers()}）")
+
+    img2pdf = subparsers.add_parser("img2pdf", help="图片转PDF")
+    img2pdf.add_argument("output", help="输出文件")
+    img2pdf.add_argument("inputs", nargs="+", help="图片文件或文件夹")
+    img2pdf.add_argument("--paper", default="original", choices=["original", "a4", "a3"], type=str.lower,
+                         help="纸张设置，默认与原图一致")
+    img2pdf.add_argument("--profile", default="original", choices=list(IMAGE_PROFILE_NAMES), type=str.lower,
+                         help="输出方案：original 原样嵌入，print 缩小到300 DPI，screen 缩小到150 DPI")
+    img2pdf.add_argument("-j", "--workers", type=int, default=1, metavar="N",
+                         help=f"并行转换图片的进程数，0 表示使用全部CPU（{default_workers()}）")
+
+    batch = subparsers.add_parser("batch", help="在一个进程内执行 JSON/CSV 清单中的全部任务")
+    batch.add_argument("manifest", help="任务清单文件（.json 或 .csv）")
+    batch.add_argument("--stop-on-error", action="store_true", help="遇到失败的任务时停止")
+
+    watch = subparsers.add_parser("watch", help="监视文件夹，新文件写完后自动分组合并PDF或把图片转换为PDF")
+    watch.add_argument("folder", help="被监视的文件夹，处理过的文件移入其中的“已处理”文件夹")
+    watch.add_argument("-o", "--output-dir", help="输出文件夹，默认为被监视文件夹中的“输出”")
+    watch.add_argument("--rule", default="time", choices=["time", "name"],
+                       help="分组规则：time 按到达时间，name 按文件名（--pattern）")
+    watch.add_argument("--gap", type=float, metavar="秒", help="一组在多少秒内没有新文件后开始处理，默认 30")
+    watch.add_argument("--pattern", help="name 规则中提取组名的正则表达式，默认为第一个“_”之前的部分")
+    watch.add_argument("--settle", type=float, metavar="秒", help="文件多少秒内不再变化才算写完，默认 2")
+    watch.add_argument("--poll", type=float, metavar="秒", help="定时扫描的间隔，默认 2")
+    watch.add_argument("--polling", action="store_true", help="不使用文件通知（如网络共享文件夹），总是定时扫描")
+    watch.add_argument("--paper", default="original", choices=["original", "a4", "a3"], type=str.lower,
+                       help="图片转PDF的纸张设置")
+    watch.add_argument("--profile", default="original", choices=list(IMAGE_PROFILE_NAMES), type=str.lower,
+                       help="图片转PDF的输出方案")
+    watch.add_argument("-j", "--workers", type=int, default=1, metavar="N",
+                       help=f"并行处理的进程数，0 表示使用全部CPU（{default_workers()}）")
+
+    serve = subparsers.add_parser("serve", help="在本机运行 HTTP 服务，供其他程序调用合并、提取和图片转PDF")
+    serve.add_argument("--host", default="127.0.0.1", help="监听地址，默认只接受本机连接")
+    serve.add_argument("--port", type=int, default=8765, help="端口，默认 8765")
+    serve.add_argument("-j", "--workers", type=int, default=0, metavar="N",
+                       help=f"同时执行任务的进程数，0 表示使用全部CPU（{default_workers()}）")
+    serve.add_argument("--max-upload", type=int, default=512, metavar="MB", help="单个上传文件的大小上限")
+    serve.add_argument("--max-queue", type=int, default=32, metavar="N", help="等待执行的任务数上限，超过时返回 503")
+    serve.add_argument("--max-connections", type=int, default=64, metavar="N", help="同时连接数上限")
+    serve.add_argument("--allow-path", action="append", default=[], metavar="文件夹",
+                       help="允许任务直接使用该文件夹中的文件（可多次指定），否则只能使用上传的文件")
+    serve.add_argument("--spool-dir", help="保存上传文件和结果的文件夹，默认使用临时文件夹并在退出时删除")
+    return parser
+
+
+def run_serve(args):
+    from server import serve
+
+    def ready(server):
+        address = server.sockets[0].getsockname()
+        print(f"正在 http://{address[0]}:{address[1]}/ 上提供服务，按 Ctrl+C 停止", flush=True)
+
+    serve(args.host, args.port, args.spool_dir, ready, workers=args.workers or default_workers(),
+          max_upload=args.max_upload * 1024 * 1024, max_queue=args.max_queue,
+          max_connections=args.max_connections, allowed_paths=args.allow_path)
+    return 0
+
+
+def run_command(args):
+    if args.command == "merge":
+        memory_limit = args.memory_limit * 1024 * 1024 if args.memory_limit else None
+        workers = args.workers or default_workers()
+        return run_merge(args.inputs, args.output, memory_limit, streaming=not args.in_memory,
+                         workers=workers, optimize=args.optimize, incremental=args.incremental)
+    if args.command == "extract":
+        return run_extract(args.input, args.pages, args.output)
+    if args.command == "split":
+        return run_split(args.input, args.ranges, args.every, args.bookmarks, args.output_dir,
+                         args.workers or default_workers())
+    return run_img2pdf(args.inputs, args.output, args.paper, args.workers or default_workers(), args.profile)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "batch":
+            return run_batch(args.manifest, args.stop_on_error)
+        if args.command == "serve":
+            return run_serve(args)
+        if args.command == "watch":
+            # 每组文件作为一个任务记录在日志中
+            return run_watch(args.folder, args.output_dir, args.rule, args.gap, args.pattern, args.settle,
+                             args.poll, args.polling, args.paper, args.profile, args.workers or default_workers())
+        with instrument.job(args.command):
+            message = run_command(args)
+    except (OperationError, OSError) as e:
+        print(f"错误: {_describe_error(e)}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    print(message)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
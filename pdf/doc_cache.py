@@ -0,0 +1,189 @@
+"""解析结果缓存：同一文件多次加载、提取、合并时复用已解析的读取器，文件改动后自动失效
+
+PyPDF2 和 pdf_index 在第一次读取时才导入，界面启动时不加载。
+"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# 读取器缓存的内存预算（MB），可通过环境变量配置
+DEFAULT_CACHE_BUDGET = int(os.environ.get("PDF_TOOLBOX_CACHE_MB", "256")) * 1024 * 1024
+# 每个缓存的读取器占用一个文件句柄，限制同时打开的数量
+MAX_OPEN_FILES = 32
+MAX_PROBE_RESULTS = 4096
+
+# 估算读取器内存时每个交叉引用条目和每个已解析对象的开销（字节）
+XREF_ENTRY_COST = 100
+OBJECT_COST = 200
+
+
+def _cache_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _file_stamp(path):
+    """文件大小和修改时间，任一变化都视为文件已改动"""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _reader_size(reader):
+    """估算读取器占用的内存：交叉引用表加上已解析的对象，流按原始数据长度计算"""
+    size = XREF_ENTRY_COST * sum(len(entries) for entries in reader.xref.values())
+    for obj in reader.resolved_objects.values():
+        data = getattr(obj, "_data", None)
+        size += OBJECT_COST + (len(data) if data else 0)
+    return size
+
+
+class _CachedReader:
+    __slots__ = ("stamp", "file", "reader", "size", "in_use", "stale")
+
+    def __init__(self, stamp, file, reader):
+        self.stamp = stamp
+        self.file = file
+        self.reader = reader
+        self.size = 0
+        self.in_use = False
+        self.stale = False
+
+    def close(self):
+        self.reader = None
+        self.file.close()
+
+
+class DocumentCache:
+    """按 (路径, 大小, 修改时间) 缓存 PdfReader 和 probe_pdf 的结果
+
+    读取器通过 reader() 借出，同一时间只交给一个线程使用；已被借出时另建一个临时读取器。
+    归还时按 LRU 淘汰，使总的估算内存不超过 memory_budget：单个读取器超出预算时先丢弃
+    它已解析的对象，只保留交叉引用和页面列表，这部分正是重复解析最耗时的地方。
+    """
+
+    def __init__(self, memory_budget=DEFAULT_CACHE_BUDGET, max_open_files=MAX_OPEN_FILES):
+        self.memory_budget = memory_budget
+        self.max_open_files = max_open_files
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._readers = OrderedDict()
+        self._probes = OrderedDict()
+
+    def probe(self, path):
+        """返回 probe_pdf(path) 的结果，文件未改动时直接使用上次的结果"""
+        key = _cache_key(path)
+        stamp = _file_stamp(path)
+        with self._lock:
+            cached = self._probes.get(key)
+            if cached is not None and cached[0] == stamp:
+                self._probes.move_to_end(key)
+                self.hits += 1
+                return dict(cached[1])
+            self.misses += 1
+        from pdf_index import probe_pdf
+        info = probe_pdf(path)
+        with self._lock:
+            self._probes[key] = (stamp, info)
+            self._probes.move_to_end(key)
+            while len(self._probes) > MAX_PROBE_RESULTS:
+                self._probes.popitem(last=False)
+        return dict(info)
+
+    @contextmanager
+    def reader(self, path):
+        """借出 path 的 PdfReader，with 块结束时归还缓存"""
+        key = _cache_key(path)
+        stamp = _file_stamp(path)
+        entry = self._checkout(key, stamp)
+        if entry is None:
+            from PyPDF2 import PdfReader
+            from pdf_index import map_file
+            file = map_file(path)
+            try:
+                # 传入内存映射而不是路径，PdfReader 按需读取而不是把整个文件读进 Python 堆
+                entry = _CachedReader(stamp, file, PdfReader(file))
+            except BaseException:
+                file.close()
+                raise
+        try:
+            yield entry.reader
+        finally:
+            self._checkin(key, entry)
+
+    def _checkout(self, key, stamp):
+        with self._lock:
+            entry = self._readers.get(key)
+            if entry is None or entry.in_use:
+                self.misses += 1
+                return None
+            if entry.stamp != stamp:
+                # 文件已改动，旧的读取器作废
+                self._remove(key)
+                self.misses += 1
+                return None
+            entry.in_use = True
+            self._readers.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _checkin(self, key, entry):
+        if entry.stale or entry.reader is None:
+            entry.close()
+            return
+        size = _reader_size(entry.reader)
+        if size > self.memory_budget:
+            entry.reader.resolved_objects.clear()
+            size = _reader_size(entry.reader)
+        with self._lock:
+            entry.in_use = False
+            current = self._readers.get(key)
+            if current is not entry:
+                if size > self.memory_budget or (current is not None and current.in_use):
+                    # 缓存中的同一文件正被其他线程使用，保留那一个
+                    entry.close()
+                    return
+                if current is not None:
+                    self._remove(key)
+                self._readers[key] = entry
+            else:
+                self.used -= entry.size
+            entry.size = size
+            self.used += size
+            self._readers.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        """从最久未使用的读取器开始淘汰，正在使用的跳过"""
+        for key in list(self._readers):
+            if self.used <= self.memory_budget and len(self._readers) <= self.max_open_files:
+                break
+            if not self._readers[key].in_use:
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self._readers.pop(key)
+        self.used -= entry.size
+        if entry.in_use:
+            entry.stale = True  # 归还时再关闭
+        else:
+            entry.close()
+
+    def invalidate(self, path):
+        """丢弃 path 的缓存，文件被覆盖写入前调用"""
+        key = _cache_key(path)
+        with self._lock:
+            self._probes.pop(key, None)
+            if key in self._readers:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._probes.clear()
+            for key in list(self._readers):
+                self._remove(key)
+
+
+# 进程内共享的缓存
+document_cache = DocumentCache()
@@ -0,0 +1,380 @@
+"""文件列表：模型/视图实现，每行只占一份路径数据，由委托绘制文件名和删除按钮"""
+import os
+from PyQt5.QtWidgets import QListView, QLabel, QStyledItemDelegate, QStyle, QAbstractItemView
+from PyQt5.QtCore import (Qt, QAbstractListModel, QModelIndex, QMimeData, QRect, QSize,
+                          QEvent, pyqtSignal)
+from PyQt5.QtGui import QColor, QFont, QPainter, QPen
+
+# 列表项中保存完整文件路径的数据角色
+FILE_PATH_ROLE = Qt.UserRole
+# 页数（后台读取完成前为 None）
+PAGE_COUNT_ROLE = Qt.UserRole + 1
+# 缩略图（QImage，尚未渲染时为 None），设置了缩略图加载器时才有
+THUMBNAIL_ROLE = Qt.UserRole + 2
+
+# 列表内部拖动排序使用的 MIME 类型，内容为逗号分隔的行号
+ROWS_MIME_TYPE = "application/x-pdf-toolbox-rows"
+
+ROW_HEIGHT = 36
+DELETE_WIDTH = 40
+PAGE_COUNT_WIDTH = 70
+THUMBNAIL_WIDTH = 22
+
+# 文件列表的样式，由主窗口并入应用级样式表；拖入文件时 dragging 属性为 true，显示虚线边框
+FILE_LIST_STYLE = """
+    DragDropListView {
+        border: 1px solid #F7F7F7;
+        border-radius: 4px;
+        background-color: white;
+        color: #333333;
+        font-size: 13px;
+        padding: 4px;
+    }
+    DragDropListView:focus {
+        border: 1px solid #F7F7F7;
+    }
+    DragDropListView[dragging="true"] {
+        border: 2px dashed #2B6DE8;
+        background-color: #F8FBFF;
+    }
+    QLabel#emptyHint {
+        color: #999999;
+        font-size: 13px;
+        background: transparent;
+        border: 1px solid #F3F4F7;
+        border-radius: 4px;
+    }
+"""
+
+
+def draw_thumbnail(painter, box, image, border="#E0E0E0"):
+    """在 box 中按比例居中绘制缩略图并加边框，image 为 None（尚未渲染）时画白色空白页"""
+    if image is None:
+        painter.fillRect(box, QColor("white"))
+    else:
+        size = image.size().scaled(box.size(), Qt.KeepAspectRatio)
+        box = QRect(box.left() + (box.width() - size.width()) // 2,
+                    box.top() + (box.height() - size.height()) // 2, size.width(), size.height())
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.drawImage(box, image)
+    painter.setPen(QPen(QColor(border)))
+    painter.drawRect(box.adjusted(0, 0, -1, -1))
+
+
+class FileListModel(QAbstractListModel):
+    """按顺序保存文件路径，另用集合做O(1)去重
+
+    行号即列表下标，按行号取路径为O(1)。删除和移动行时列表中其后的元素整体平移，
+    由 list 在C层面的内存移动完成（5万行时约0.1毫秒），不在Python中逐行重建顺序或索引。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._paths = []
+        self._path_set = set()
+        self._page_counts = {}
+        self.thumbnails = None  # 缩略图加载器，见 DragDropListView.set_thumbnails
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path = self._paths[index.row()]
+        if role == Qt.DisplayRole:
+            return os.path.basename(path)
+        if role in (FILE_PATH_ROLE, Qt.ToolTipRole):  # 同名文件可通过完整路径区分
+            return path
+        if role == PAGE_COUNT_ROLE:
+            return self._page_counts.get(path)
+        if role == THUMBNAIL_ROLE and self.thumbnails is not None:
+            # 只有绘制到的行才会请求，列表再长也只渲染可见部分
+            return self.thumbnails.thumbnail(path)
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled  # 只允许拖放到行之间
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self):
+        return [ROWS_MIME_TYPE]
+
+    def mimeData(self, indexes):
+        mime = QMimeData()
+        rows = sorted({index.row() for index in indexes})
+        mime.setData(ROWS_MIME_TYPE, ",".join(map(str, rows)).encode())
+        return mime
+
+    def paths(self):
+        return list(self._paths)
+
+    def path(self, row):
+        return self._paths[row]
+
+    def __contains__(self, path):
+        return os.path.normpath(path) in self._path_set
+
+    def add_paths(self, paths):
+        """批量追加文件，跳过已存在的文件，返回实际添加的数量"""
+        new_paths = []
+        for path in paths:
+            path = os.path.normpath(path)
+            if path not in self._path_set:
+                self._path_set.add(path)
+                new_paths.append(path)
+        if new_paths:
+            first = len(self._paths)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_paths) - 1)
+            self._paths.extend(new_paths)
+            self.endInsertRows()
+        return len(new_paths)
+
+    def set_page_counts(self, counts):
+        """批量设置页数，counts 为 (路径, 页数) 的列表；已移除的文件忽略"""
+        changed = False
+        for path, pages in counts:
+            path = os.path.normpath(path)
+            if path in self._path_set:
+                self._page_counts[path] = pages
+                changed = True
+        if changed:
+            # 一次通知全部行，视图只重绘可见部分
+            self.dataChanged.emit(self.index(0), self.index(len(self._paths) - 1), [PAGE_COUNT_ROLE])
+
+    def remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        path = self._paths.pop(row)
+        self._path_set.discard(path)
+        self._page_counts.pop(path, None)
+        self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._paths.clear()
+        self._path_set.clear()
+        self._page_counts.clear()
+        self.endResetModel()
+
+    def move_rows(self, rows, target):
+        """把 rows 中的行按原顺序移动到 target 行之前
+
+        连续的行作为一段移动，每段用 beginMoveRows 通知视图，选中状态等持久索引由 Qt 更新；
+        耗时与移动的段数成正比，与列表长度无关（除了 list 的内存移动）。
+        """
+        rows = sorted(set(rows))
+        above = _runs([row for row in rows if row < target])
+        below = _runs([row for row in rows if row >= target])
+        # target 之前的段从后往前依次移到 target 之前，排在已移动的段前面
+        dest = target
+        for first, last in reversed(above):
+            count = last - first + 1
+            if last + 1 != dest:
+                self._move_block(first, last, dest, dest - count)
+            dest -= count
+        # target 及之后的段从前往后依次接在后面
+        dest = target
+        for first, last in below:
+            if first != dest:
+                self._move_block(first, last, dest, dest)
+            dest += last - first + 1
+
+    def _move_block(self, first, last, destination, insert_at):
+        """把第 first 到 last 行移到 destination 行之前；insert_at 为移除后在列表中的插入位置"""
+        self.beginMoveRows(QModelIndex(), first, last, QModelIndex(), destination)
+        block = self._paths[first:last + 1]
+        del self._paths[first:last + 1]
+        self._paths[insert_at:insert_at] = block
+        self.endMoveRows()
+
+
+def _runs(rows):
+    """把排好序的行号分成连续的段，返回 [(起始行, 结束行)]"""
+    runs = []
+    for row in rows:
+        if runs and runs[-1][1] + 1 == row:
+            runs[-1] = (runs[-1][0], row)
+        else:
+            runs.append((row, row))
+    return runs
+
+
+class FileItemDelegate(QStyledItemDelegate):
+    """绘制缩略图、文件名和右侧的“删除”文字，点击删除区域时发出 delete_requested"""
+    delete_requested = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.hover_delete_row = -1
+        self.show_thumbnails = False
+        self.font = QFont()
+        self.font.setPixelSize(13)
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), ROW_HEIGHT)
+
+    def delete_rect(self, rect):
+        return QRect(rect.right() - DELETE_WIDTH - 12, rect.top(), DELETE_WIDTH, rect.height())
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect
+        if option.state & QStyle.State_Selected:
+            background = QColor("#EEF7FF")
+        elif option.state & QStyle.State_MouseOver:
+            background = QColor("#F5F5F5")
+        else:
+            background = QColor("white")
+        painter.fillRect(rect, background)
+        painter.setPen(QPen(QColor("#F0F0F0")))
+        painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+
+        painter.setFont(self.font)
+        delete_rect = self.delete_rect(rect)
+        text_right = delete_rect.left() - 8
+        pages = index.data(PAGE_COUNT_ROLE)
+        if pages is not None:
+            pages_rect = QRect(text_right - PAGE_COUNT_WIDTH, rect.top(), PAGE_COUNT_WIDTH, rect.height())
+            painter.setPen(QColor("#999999"))
+            painter.drawText(pages_rect, Qt.AlignVCenter | Qt.AlignRight, f"{pages} 页")
+            text_right = pages_rect.left()
+        text_left = rect.left() + 12
+        if self.show_thumbnails:
+            draw_thumbnail(painter, QRect(text_left, rect.top() + 4, THUMBNAIL_WIDTH, rect.height() - 8),
+                                 index.data(THUMBNAIL_ROLE))
+            text_left += THUMBNAIL_WIDTH + 8
+        text_rect = QRect(text_left, rect.top(), text_right - text_left - 8, rect.height())
+        name = option.fontMetrics.elidedText(index.data(Qt.DisplayRole), Qt.ElideMiddle, text_rect.width())
+        painter.setPen(QColor("#333333"))
+        painter.drawText(text_rect, Qt.AlignVCenter | Qt.AlignLeft, name)
+
+        painter.setPen(QColor("#2B6DE8" if index.row() == self.hover_delete_row else "#666666"))
+        painter.drawText(delete_rect, Qt.AlignCenter, "删除")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton \
+                and self.delete_rect(option.rect).contains(event.pos()):
+            self.delete_requested.emit(index.row())
+            return True
+        if event.type() == QEvent.MouseMove:
+            row = index.row() if self.delete_rect(option.rect).contains(event.pos()) else -1
+            if row != self.hover_delete_row:
+                self.hover_delete_row = row
+                self.parent().viewport().update()
+        return super().editorEvent(event, model, option, index)
+
+
+class DragDropListView(QListView):
+    """支持拖入文件、拖动排序的文件列表，行数再多也只绘制可见的部分"""
+
+    def __init__(self, parent=None, model=None):
+        super().__init__(parent)
+        self.parent_widget = parent
+        self.setModel(model if model is not None else FileListModel(self))
+        self.delegate = FileItemDelegate(self)
+        self.setItemDelegate(self.delegate)
+        self.setUniformItemSizes(True)  # 行高固定，滚动和插入时无需逐行计算尺寸
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setDragEnabled(True)
+        self.setAcceptDrops(True)
+        self.setDropIndicatorShown(True)
+        self.setDragDropMode(QAbstractItemView.DragDrop)
+        self.setDefaultDropAction(Qt.MoveAction)
+        self.setMouseTracking(True)
+        self.setAttribute(Qt.WA_Hover)
+
+        # 添加空状态提示标签
+        self.empty_label = QLabel("将文件拖拽到此处", self)
+        self.empty_label.setObjectName("emptyHint")
+        self.empty_label.setAlignment(Qt.AlignCenter)
+        self.empty_label.hide()
+        # 设置提示标签层级
+        self.empty_label.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.empty_label.lower()  # 将提示标签放到底层
+
+
+        model = self.model()
+        model.rowsInserted.connect(self.updateEmptyState)
+        model.rowsRemoved.connect(self.updateEmptyState)
+        model.modelReset.connect(self.updateEmptyState)
+
+    def count(self):
+        return self.model().rowCount()
+
+    def set_thumbnails(self, loader):
+        """在文件名左侧显示第一页（或图片本身）的缩略图，loader 为 thumbnails.ThumbnailLoader"""
+        self.model().thumbnails = loader
+        self.delegate.show_thumbnails = True
+        loader.updated.connect(self.viewport().update)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # 调整提示标签位置
+        self.empty_label.setGeometry(0, 0, self.width(), self.height())
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.updateEmptyState()
+
+    def updateEmptyState(self):
+        # 根据列表项数量显示或隐藏提示
+        self.empty_label.setVisible(self.count() == 0)
+
+    def leaveEvent(self, event):
+        self.delegate.hover_delete_row = -1
+        super().leaveEvent(event)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.accept()
+            self.set_dragging(True)
+        else:
+            super().dragEnterEvent(event)
+
+    def dragMoveEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.accept()
+        else:
+            super().dragMoveEvent(event)  # 处理内部拖拽
+
+    def set_dragging(self, dragging):
+        """切换拖入文件时的虚线边框，样式见 FILE_LIST_STYLE"""
+        self.setProperty("dragging", dragging)
+        # 动态属性改变后重新应用样式表
+        self.style().unpolish(self)
+        self.style().polish(self)
+
+    def dragLeaveEvent(self, event):
+        self.set_dragging(False)
+        self.updateEmptyState()  # 恢复提示（如果列表为空）
+        event.accept()
+
+    def dropEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.accept()
+            self.set_dragging(False)
+            # 处理文件
+            if hasattr(self.parent_widget, 'handle_dropped_files'):
+                self.parent_widget.handle_dropped_files(event.mimeData().urls())
+            self.updateEmptyState()  # 根据列表状态显示或隐藏提示
+        elif event.source() is self and event.mimeData().hasFormat(ROWS_MIME_TYPE):
+            rows = [int(row) for row in bytes(event.mimeData().data(ROWS_MIME_TYPE)).decode().split(",")]
+            self.model().move_rows(rows, self.drop_row(event.pos()))
+            # 行已在模型内移动，返回复制动作，避免视图再删除源行
+            event.setDropAction(Qt.CopyAction)
+            event.accept()
+        else:
+            super().dropEvent(event)
+
+    def drop_row(self, pos):
+        """根据放下位置计算插入行：落在某行的下半部分时插入到它之后"""
+        index = self.indexAt(pos)
+        if not index.isValid():
+            return self.count()
+        rect = self.visualRect(index)
+        return index.row() + 1 if pos.y() > rect.center().y() else index.row()
@@ -0,0 +1,257 @@
+"""结构化性能日志：按任务记录各阶段（扫描、解析、复制页面、压缩、写出）的耗时和数据量
+
+任务结束时向 JSON-lines 日志写出每个阶段的汇总（event 为 "stage"）和任务本身的结果
+（event 为 "job"），失败时附带真实的异常类型、原因链和调用栈，从用户发回的日志即可
+看出慢在哪一步、错在哪里。同一阶段在一个任务中多次出现（如逐个文件解析）时累加为一条，
+日志行数与文件数无关。没有正在进行的任务时 stage() 不做任何记录。
+
+日志默认写入 ~/.pdf-toolbox/output.log，
+可用环境变量 PDF_TOOLBOX_LOG 指定其他文件，设为空字符串则关闭。
+add_hook() 注册的回调在任务开始和每条事件写出时调用，可接入外部分析器；
+设置 PDF_TOOLBOX_PROFILE=目录 时用 cProfile 分析每个任务，结果保存到该目录。
+"""
+import itertools
+import json
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+# 日志超过该大小时改名为 output.log.1，只保留一份旧日志
+LOG_MAX_BYTES = 5 * 1024 * 1024
+
+
+def default_log_path():
+    configured = os.environ.get("PDF_TOOLBOX_LOG")
+    if configured is not None:
+        return configured or None
+    # 源码运行时也不写入项目目录，以免改动仓库中的文件
+    return os.path.join(os.path.expanduser("~"), ".pdf-toolbox", "output.log")
+
+
+log_path = default_log_path()
+
+_lock = threading.Lock()
+_local = threading.local()
+_hooks = []
+_job_ids = itertools.count(1)
+
+
+def set_log_path(path):
+    """修改日志文件，None 表示不写日志（钩子仍会被调用）"""
+    global log_path
+    log_path = path
+
+
+def add_hook(hook):
+    """注册 hook(phase, record)：phase 为 "start"（任务开始）或 "end"（写出一条事件）
+
+    回调在执行任务的线程中调用，抛出的异常被忽略，不影响任务本身。
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+class Stage:
+    """一个阶段在任务中的累计耗时（秒）、进入次数和计数（pages、bytes_read 等）"""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.counts = {}
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+
+class JobTrace:
+    """一个任务的记录，fields 中的内容原样写入 job 事件"""
+
+    def __init__(self, operation, fields):
+        self.id = f"{os.getpid()}-{next(_job_ids)}"
+        self.operation = operation
+        self.fields = dict(fields)
+        self.stages = {}
+        self.start = time.perf_counter()
+
+    def add(self, **fields):
+        self.fields.update(fields)
+
+    def stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name)
+        return stage
+
+    def finish(self, status, error=None):
+        seconds = time.perf_counter() - self.start
+        totals = {}
+        for stage in self.stages.values():
+            _emit({"event": "stage", "job": self.id, "operation": self.operation, "stage": stage.name,
+                   "seconds": round(stage.seconds, 4), "calls": stage.calls, **stage.counts})
+            for key, value in stage.counts.items():
+                totals[key] = totals.get(key, 0) + value
+        from pdf_ops import memory_usage
+        record = {"event": "job", "job": self.id, "operation": self.operation, "status": status,
+                  "seconds": round(seconds, 4), **totals, **self.fields,
+                  "stages": {name: round(stage.seconds, 4) for name, stage in self.stages.items()},
+                  "peak_rss": memory_usage()[1]}
+        if error is not None:
+            record["error"] = describe_exception(error)
+        _emit(record)
+
+
+def current_job():
+    """当前线程中正在进行的任务，没有时为 None"""
+    return getattr(_local, "job", None)
+
+
+@contextmanager
+def job(operation, **fields):
+    """记录一个任务；已有任务在进行时（如批处理调用单项操作）计入外层任务"""
+    trace = current_job()
+    if trace is not None:
+        yield trace
+        return
+    trace = _local.job = JobTrace(operation, fields)
+    _call_hooks("start", {"event": "job", "job": trace.id, "operation": operation})
+    status, error = "ok", None
+    try:
+        yield trace
+    except BaseException as e:
+        from pdf_ops import OperationCancelled
+        if isinstance(e, (OperationCancelled, KeyboardInterrupt)):
+            status = "cancelled"
+        else:
+            status, error = "failed", e
+        raise
+    finally:
+        _local.job = None
+        trace.finish(status, error)
+
+
+@contextmanager
+def stage(name, **counts):
+    """把 with 块的耗时计入当前任务的 name 阶段，counts 及块内 add() 的计数一并累加"""
+    trace = current_job()
+    if trace is None:
+        yield Stage(name)
+        return
+    entry = trace.stage(name)
+    entry.calls += 1
+    entry.add(**counts)
+    start = time.perf_counter()
+    try:
+        yield entry
+    finally:
+        entry.seconds += time.perf_counter() - start
+
+
+def record(name, seconds, **counts):
+    """把已测得的耗时计入当前任务的 name 阶段（如写出器内部累计的压缩时间）"""
+    trace = current_job()
+    if trace is not None:
+        entry = trace.stage(name)
+        entry.calls += 1
+        entry.seconds += seconds
+        entry.add(**counts)
+
+
+def event(name, error=None, **fields):
+    """写出一条不属于任何任务的事件（如启动时无法打开任务队列），error 为异常时附带它的描述"""
+    record = {"event": name, **fields}
+    if error is not None:
+        record["error"] = describe_exception(error)
+    _emit(record)
+
+
+def iterate(name, iterable):
+    """逐个产生 iterable 的元素，取下一个元素的耗时计入 name 阶段"""
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def describe_exception(error):
+    """异常的类型、消息、原因链和调用栈"""
+    causes = []
+    cause = error.__cause__ or error.__context__
+    while cause is not None and len(causes) < 5:
+        causes.append({"type": _type_name(cause), "message": str(cause)})
+        cause = cause.__cause__ or cause.__context__
+    return {"type": _type_name(error), "message": str(error), "causes": causes,
+            "traceback": "".join(traceback.format_exception(type(error), error, error.__traceback__))}
+
+
+def _type_name(error):
+    cls = type(error)
+    return cls.__name__ if cls.__module__ == "builtins" else f"{cls.__module__}.{cls.__name__}"
+
+
+def _call_hooks(phase, record):
+    for hook in list(_hooks):
+        try:
+            hook(phase, record)
+        except Exception:
+            pass
+
+
+def _emit(record):
+    record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "pid": os.getpid(), **record}
+    _call_hooks("end", record)
+    path = log_path
+    if not path:
+        return
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _lock:
+        # 日志写不进去时放弃，不影响操作本身
+        try:
+            if os.path.exists(path) and os.path.getsize(path) > LOG_MAX_BYTES:
+                os.replace(path, path + ".1")
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except OSError:
+            pass
+
+
+class CProfileHook:
+    """用 cProfile 分析每个任务，结束时保存为 目录/操作-任务编号.prof"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._local = threading.local()
+
+    def __call__(self, phase, record):
+        if record["event"] != "job":
+            return
+        if phase == "start":
+            import cProfile
+            self._local.profiler = cProfile.Profile()
+            self._local.profiler.enable()
+            return
+        profiler = getattr(self._local, "profiler", None)
+        if profiler is None:
+            return
+        profiler.disable()
+        self._local.profiler = None
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, f"{record['operation']}-{record['job']}.prof"))
+
+
+if os.environ.get("PDF_TOOLBOX_PROFILE"):
+    add_hook(CProfileHook(os.environ["PDF_TOOLBOX_PROFILE"]))
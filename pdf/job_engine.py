@@ -0,0 +1,388 @@
+"""后台任务引擎：在 QThreadPool 中运行耗时的PDF操作，通过信号返回进度和结果
+
+合并、提取、拆分和图片转PDF通过 QueueRunner 进入持久化的任务队列（见 job_queue），
+提取和拆分使用单独的名额，不必排在长时间的合并之后。
+"""
+import threading
+import time
+from contextlib import contextmanager
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from pdf_ops import OperationCancelled, OperationError, error_message, iter_files
+from doc_cache import document_cache
+from job_queue import CANCELLED, DONE, FAILED, MAX_CONCURRENCY, INTERACTIVE_CONCURRENCY
+import instrument
+
+# 进度信号的最小间隔（秒），避免逐页发信号拖慢界面
+PROGRESS_INTERVAL = 0.03
+
+
+def failure_message(error):
+    """任务失败时展示给用户的信息"""
+    if isinstance(error, OperationError):
+        return error_message(error)
+    return f"处理时出错: {type(error).__name__}: {error}"
+
+
+class JobSignals(QObject):
+    # file_index, file_count, page_index, page_count
+    progress = pyqtSignal(int, int, int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    done = pyqtSignal()  # 无论成功、失败或取消都会发出
+
+
+class Job(QRunnable):
+    """在线程池中执行 func(*args, progress=..., cancel_event=..., **kwargs)
+
+    每次执行记为 instrument 中的一个任务，名称默认取 func 的函数名。
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = JobSignals()
+        self.cancel_event = threading.Event()
+        self._last_progress = 0.0
+        self.operation = getattr(func, "__name__", type(self).__name__)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _emit_progress(self, file_index, file_count, page_index, page_count):
+        now = time.monotonic()
+        # 每个文件的最后一页总是发出，其余按时间间隔节流
+        if page_index < page_count and now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        self.signals.progress.emit(file_index, file_count, page_index, page_count)
+
+    def execute(self):
+        # 异常的类型、原因和调用栈由 instrument 写入日志
+        with instrument.job(self.operation):
+            return self.func(*self.args, progress=self._emit_progress,
+                             cancel_event=self.cancel_event, **self.kwargs)
+
+    def run(self):
+        try:
+            result = self.execute()
+        except OperationCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(failure_message(e))
+        else:
+            self.signals.finished.emit(result)
+        finally:
+            self.signals.done.emit()
+
+
+class BatchSignals(JobSignals):
+    found = pyqtSignal(list)  # 新产生的一批结果
+
+
+class BatchJob(Job):
+    """在后台逐个产生结果，分批通过 found 信号发送
+
+    第一个结果立即发出，之后每隔 BATCH_INTERVAL 秒合并发出一次，界面无需逐个处理。
+    子类实现 items()；max_results 不为 None 时产生足够的结果后停止。
+    finished 信号携带结果总数。
+    读取页数、渲染缩略图等界面中频繁启动的辅助任务不写入 instrument 日志，
+    子类设置 log_job = True 时才记录。
+    """
+    BATCH_INTERVAL = 0.05
+    stage = "scan"  # 在 instrument 日志中的阶段名称
+    log_job = False
+
+    def __init__(self, max_results=None):
+        super().__init__(None)
+        self.operation = type(self).__name__
+        self.signals = BatchSignals()
+        self.max_results = max_results
+        self.found_count = 0
+
+    def items(self):
+        raise NotImplementedError
+
+    @contextmanager
+    def _trace(self):
+        if not self.log_job:
+            yield None
+            return
+        with instrument.job(self.operation) as trace, instrument.stage(self.stage):
+            yield trace
+
+    def run(self):
+        batch = []
+        last_emit = 0.0
+        try:
+            with self._trace() as trace:
+                for item in self.items():
+                    batch.append(item)
+                    self.found_count += 1
+                    now = time.monotonic()
+                    if now - last_emit >= self.BATCH_INTERVAL:
+                        self.signals.found.emit(batch)
+                        batch = []
+                        last_emit = now
+                    if self.max_results is not None and self.found_count >= self.max_results:
+                        break
+                if trace is not None:
+                    trace.add(found=self.found_count)
+        except OperationCancelled:
+            pass
+        finally:
+            if batch:
+                self.signals.found.emit(batch)
+            if self.cancel_event.is_set():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(self.found_count)
+            self.signals.done.emit()
+
+
+class ScanJob(BatchJob):
+    """遍历文件夹，found 信号携带找到的文件路径"""
+    log_job = True  # 由用户添加文件夹触发，记录大文件夹的扫描耗时
+
+    def __init__(self, paths, extensions, max_results=None):
+        super().__init__(max_results)
+        self.paths = paths
+        self.extensions = extensions
+
+    def items(self):
+        return iter_files(self.paths, self.extensions, self.cancel_event, sort=False)
+
+
+class ProbeJob(BatchJob):
+    """读取PDF文件的页数，found 信号携带 (路径, 页数)；无法读取的文件跳过"""
+    stage = "parse"
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+
+    def items(self):
+        for path in self.paths:
+            if self.cancel_event.is_set():
+                return
+            try:
+                yield path, document_cache.probe(path)["pages"]
+            except Exception:
+                continue
+
+
+class WatchJob(BatchJob):
+    """监视文件夹（见 watch_folder.FolderWatcher），found 信号携带已移入“已处理”文件夹、等待处理的组
+
+    一直运行到取消为止，应在单独的 JobEngine 中启动，以免占用其他任务的线程。
+    """
+    BATCH_INTERVAL = 0  # 每组立即发出
+    stage = "watch"
+
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def items(self):
+        return self.watcher.groups(self.cancel_event)
+
+
+class JobEngine(QObject):
+    """管理后台任务的提交、取消和退出时的等待"""
+
+    def __init__(self, parent=None, max_threads=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self.jobs = set()
+
+    def start(self, job):
+        """启动任务；调用前应先连接好 job.signals，以免漏掉早期信号"""
+        self.jobs.add(job)  # 保持引用，直到任务结束
+        job.signals.done.connect(lambda: self.jobs.discard(job))
+        self.pool.start(job)
+        return job
+
+    def cancel_all(self):
+        for job in list(self.jobs):
+            job.cancel()
+
+    def shutdown(self, msecs=5000):
+        """取消所有任务并等待线程池结束"""
+        self.cancel_all()
+        return self.pool.waitForDone(msecs)
+
+
+class QueuedJob(Job):
+    """执行任务队列（job_queue.JobQueue）中的一个任务，结果和每个文件的进度写入队列
+
+    interrupt() 用于程序退出：任务停止但在队列中保持运行中，下次启动时重新排队。
+    """
+    CHECKPOINT_INTERVAL = 1.0  # 写入进度的最小间隔（秒）
+
+    def __init__(self, queue, job_id):
+        func, args, kwargs = queue.call(job_id)
+        super().__init__(func, *args, **kwargs)
+        self.queue = queue
+        self.job_id = job_id
+        self.runner = None
+        self.interrupted = False
+        self._last_checkpoint = 0.0
+
+    def cancel(self):
+        super().cancel()
+        if self.runner is not None:
+            self.runner.drop(self.job_id)
+
+    def interrupt(self):
+        self.interrupted = True
+        self.cancel()
+
+    def _emit_progress(self, file_index, file_count, page_index, page_count):
+        if page_index >= page_count:
+            now = time.monotonic()
+            if file_index + 1 >= file_count or now - self._last_checkpoint >= self.CHECKPOINT_INTERVAL:
+                self._last_checkpoint = now
+                self.queue.checkpoint(self.job_id, file_index + 1, file_count)
+        super()._emit_progress(file_index, file_count, page_index, page_count)
+
+    def run(self):
+        try:
+            result = self.execute()
+        except OperationCancelled:
+            if not self.interrupted:
+                self.queue.finish(self.job_id, CANCELLED)
+            self.signals.cancelled.emit()
+        except Exception as e:
+            message = failure_message(e)
+            self.queue.finish(self.job_id, FAILED, message)
+            self.signals.failed.emit(message)
+        else:
+            self.queue.finish(self.job_id, DONE)
+            self.signals.finished.emit(result)
+        finally:
+            self.signals.done.emit()
+
+
+class QueueRunner(QObject):
+    """按加入顺序启动队列中的任务
+
+    合并和图片转PDF同时运行的任务数不超过 queue.concurrency；提取和拆分另有
+    INTERACTIVE_CONCURRENCY 个名额，不会排在长时间的合并之后。
+    """
+    changed = pyqtSignal()  # 队列中的任务或进度有变化
+
+    def __init__(self, queue, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self.engine = JobEngine(self, MAX_CONCURRENCY + INTERACTIVE_CONCURRENCY)
+        self.pending = {}  # 本次运行中加入、尚未启动的任务
+        self.running = {}
+        self.interactive = set()  # running 中占用提取和拆分名额的任务
+        self.stopped = False
+
+    def enqueue(self, func, *args, **kwargs):
+        """加入队列，返回 QueuedJob；任务在下一次事件循环中才会启动，调用者可以先连接信号"""
+        job_id = self.queue.enqueue(func.__name__, *args, **kwargs)
+        job = QueuedJob(self.queue, job_id)
+        job.runner = self
+        self.pending[job_id] = job
+        self.changed.emit()
+        QTimer.singleShot(0, self.schedule)
+        return job
+
+    def resume(self):
+        """上次退出时未完成的任务重新排队并启动，返回重新排队的任务数"""
+        count = self.queue.recover()
+        self.schedule()
+        return count
+
+    def schedule(self):
+        """启动等待中的任务，直到两类任务各自达到并行数"""
+        for interactive in (True, False):
+            while not self.stopped and not self.is_full(interactive):
+                job_id = self.queue.next_queued(interactive)
+                if job_id is None:
+                    break
+                self._start(job_id, interactive)
+        self.changed.emit()
+
+    def _start(self, job_id, interactive):
+        job = self.pending.pop(job_id, None)
+        if job is None:
+            try:
+                job = QueuedJob(self.queue, job_id)
+            except Exception as e:
+                self.queue.finish(job_id, FAILED, failure_message(e))
+                return
+        if not self.queue.mark_running(job_id):
+            # 打开同一队列的另一个程序已开始执行这个任务
+            job.signals.failed.emit("该任务已由另一个窗口执行")
+            job.signals.done.emit()
+            return
+        self.running[job_id] = job
+        if interactive:
+            self.interactive.add(job_id)
+        job.signals.progress.connect(self._on_progress)
+        job.signals.done.connect(lambda job_id=job_id: self._on_done(job_id))
+        self.engine.start(job)
+
+    def cancel(self, job_id):
+        if job_id in self.running:
+            self.running[job_id].cancel()
+        elif job_id in self.pending:
+            self.pending[job_id].cancel()
+        else:
+            self.queue.cancel(job_id)
+        self.changed.emit()
+
+    def drop(self, job_id):
+        """取消尚未启动的任务"""
+        job = self.pending.get(job_id)
+        if job is not None and self.queue.cancel(job_id):
+            del self.pending[job_id]
+            job.signals.cancelled.emit()
+            job.signals.done.emit()
+            self.changed.emit()
+
+    def retry(self, job_id):
+        if self.queue.retry(job_id):
+            self.schedule()
+
+    def remove(self, job_id):
+        if job_id not in self.running and job_id not in self.pending and self.queue.remove(job_id):
+            self.changed.emit()
+
+    def clear_finished(self):
+        self.queue.clear_finished()
+        self.changed.emit()
+
+    def is_full(self, interactive=False):
+        """已达到并行数，新加入的任务需要等待；interactive 为 True 时指提取和拆分的名额"""
+        if interactive:
+            return len(self.interactive) >= INTERACTIVE_CONCURRENCY
+        return len(self.running) - len(self.interactive) >= self.queue.concurrency
+
+    def set_concurrency(self, value):
+        self.queue.concurrency = value
+        self.schedule()
+
+    def _on_progress(self, file_index, file_count, page_index, page_count):
+        if page_index >= page_count:
+            self.changed.emit()
+
+    def _on_done(self, job_id):
+        self.running.pop(job_id, None)
+        self.interactive.discard(job_id)
+        self.schedule()
+
+    def shutdown(self, msecs=5000):
+        """停止运行中的任务并等待；它们在队列中保持运行中，下次启动时继续"""
+        self.stopped = True
+        for job in list(self.running.values()):
+            job.interrupt()
+        return self.engine.shutdown(msecs)
@@ -0,0 +1,312 @@
+"""持久化的任务队列：合并、提取、拆分和图片转PDF任务保存在 SQLite 数据库中
+
+任务按加入的顺序执行，合并和图片转PDF同时运行的任务数可以设置；提取和拆分通常很快，
+另有 INTERACTIVE_CONCURRENCY 个名额，不必排在长时间的合并之后。程序关闭或崩溃时
+仍在运行的任务，下次启动后重新排队继续执行；多个程序同时打开同一队列时，只接手已退出的
+程序留下的任务（每个 JobQueue 在运行期间锁住自己的锁文件，见 owner_alive）。
+进度按输入文件记录；合并任务未完成的输出和每个输入写完后的记录保存在输出文件夹的工作目录中
+（见 merge_pdf_files 的 work_dir），继续时已完成的文件不再解析，其他任务从头执行。
+本模块不依赖 PyQt5，界面中的调度见 job_engine.QueueRunner。
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+import instrument
+import pdf_ops
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+STATUS_NAMES = {QUEUED: "等待中", RUNNING: "运行中", DONE: "已完成", FAILED: "失败", CANCELLED: "已取消"}
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED)
+
+# 可以排队的操作：函数名 -> 显示名称
+OPERATIONS = {
+    "merge_pdf_files": "合并",
+    "extract_pages": "提取",
+    "split_pdf_file": "拆分",
+    "split_by_bookmarks": "按书签拆分",
+    "images_to_pdf": "图片转PDF",
+}
+
+# 提取和拆分在单独的名额中运行，不占用 concurrency，也不必等待正在运行的合并
+INTERACTIVE_OPERATIONS = ("extract_pages", "split_pdf_file", "split_by_bookmarks")
+INTERACTIVE_CONCURRENCY = 2
+
+DEFAULT_CONCURRENCY = 1
+MAX_CONCURRENCY = 4
+# 合并任务的工作目录名前缀，位于输出文件夹中
+WORK_DIR_PREFIX = ".pdf-toolbox-job-"
+# 各个打开队列的程序的锁文件位于数据库旁的 <数据库>.owners 文件夹中
+OWNER_LOCK_SUFFIX = ".lock"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    operation TEXT NOT NULL,
+    args TEXT NOT NULL,
+    kwargs TEXT NOT NULL,
+    title TEXT NOT NULL,
+    status TEXT NOT NULL,
+    files_done INTEGER NOT NULL DEFAULT 0,
+    file_count INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    owner TEXT
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def default_db_path():
+    """队列数据库，环境变量 PDF_TOOLBOX_QUEUE_DB 可指定其他文件，设为空字符串则只保存在内存中"""
+    configured = os.environ.get("PDF_TOOLBOX_QUEUE_DB")
+    if configured is not None:
+        return configured or ":memory:"
+    return os.path.join(os.path.expanduser("~"), ".pdf-toolbox", "queue.db")
+
+
+def lock_file(path):
+    """以不等待的方式独占锁住 path，返回打开的文件；已被其他进程锁住时返回 None
+
+    锁在文件关闭或进程退出（包括崩溃）时由系统释放。
+    """
+    f = open(path, 'a+b')
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def owner_alive(owner_dir, owner):
+    """owner 对应的程序是否仍在运行：它的锁文件存在且仍被锁住；已退出时删除锁文件"""
+    path = os.path.join(owner_dir, owner + OWNER_LOCK_SUFFIX)
+    if not os.path.exists(path):
+        return False
+    try:
+        f = lock_file(path)
+    except OSError:
+        return False
+    if f is None:
+        return True
+    f.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return False
+
+
+def describe(operation, args):
+    """任务在队列中显示的说明"""
+    name = OPERATIONS[operation]
+    if operation == "merge_pdf_files":
+        return f"{name} {len(args[0])} 个文件 → {os.path.basename(args[1])}"
+    if operation == "extract_pages":
+        return f"{name} {os.path.basename(args[0])} 的 {len(args[1])} 页"
+    if operation == "images_to_pdf":
+        return f"{name} {len(args[0])} 张图片 → {os.path.basename(args[1])}"
+    return f"{name} {os.path.basename(args[0])}"
+
+
+class JobQueue:
+    """任务队列的数据库，可在多个线程中使用"""
+
+    def __init__(self, path=None):
+        self.path = default_db_path() if path is None else path
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # 自动提交：每次修改立即写入，崩溃时最多丢失正在写的一条
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            if self.path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+            columns = [row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")]
+            if "owner" not in columns:
+                # 旧版本创建的数据库
+                self._db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        # 运行中的任务记下由哪个程序执行，其他程序只接手锁文件已释放的任务
+        self.owner = uuid.uuid4().hex
+        self.owner_dir = None
+        self._owner_lock = None
+        if self.path != ":memory:":
+            self.owner_dir = os.path.abspath(self.path) + ".owners"
+            os.makedirs(self.owner_dir, exist_ok=True)
+            self._owner_lock = lock_file(os.path.join(self.owner_dir, self.owner + OWNER_LOCK_SUFFIX))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+        if self._owner_lock is not None:
+            self._owner_lock.close()
+            self._owner_lock = None
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    def _fetch(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
+
+    def enqueue(self, operation, *args, **kwargs):
+        """加入任务，返回任务编号；参数须能保存为 JSON"""
+        if operation not in OPERATIONS:
+            raise ValueError(f"不能排队的操作: {operation}")
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (operation, args, kwargs, title, status, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (operation, json.dumps(args), json.dumps(kwargs), describe(operation, args), QUEUED, time.time()))
+            job_id = cursor.lastrowid
+            if operation == "merge_pdf_files" and not kwargs.get("optimize"):
+                # 合并的中间结果保存在输出文件夹中，继续时不必重新解析已完成的文件
+                output_dir = os.path.dirname(os.path.abspath(args[1]))
+                kwargs = dict(kwargs, work_dir=os.path.join(output_dir, f"{WORK_DIR_PREFIX}{job_id}"))
+                self._db.execute("UPDATE jobs SET kwargs = ? WHERE id = ?", (json.dumps(kwargs), job_id))
+        return job_id
+
+    def get(self, job_id):
+        rows = self._fetch("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def jobs(self):
+        return self._fetch("SELECT * FROM jobs ORDER BY id")
+
+    def next_queued(self, interactive=False):
+        """最早加入的等待任务编号，没有时返回 None
+
+        interactive 为 True 时只找提取和拆分任务（INTERACTIVE_OPERATIONS），否则只找其他任务。
+        """
+        placeholders = ", ".join("?" * len(INTERACTIVE_OPERATIONS))
+        rows = self._fetch(
+            f"SELECT id FROM jobs WHERE status = ? AND operation {'' if interactive else 'NOT '}IN ({placeholders}) "
+            "ORDER BY id LIMIT 1", (QUEUED, *INTERACTIVE_OPERATIONS))
+        return rows[0]["id"] if rows else None
+
+    def call(self, job_id):
+        """返回 (函数, 位置参数, 关键字参数)"""
+        job = self.get(job_id)
+        return getattr(pdf_ops, job["operation"]), json.loads(job["args"]), json.loads(job["kwargs"])
+
+    def mark_running(self, job_id):
+        """开始执行等待中的任务；已被打开同一队列的其他程序开始执行时返回 False"""
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, started = ?, message = '', owner = ? WHERE id = ? AND status = ?",
+            (RUNNING, time.time(), self.owner, job_id, QUEUED))
+        return cursor.rowcount > 0
+
+    def checkpoint(self, job_id, files_done, file_count):
+        self._execute("UPDATE jobs SET files_done = ?, file_count = ? WHERE id = ?",
+                      (files_done, file_count, job_id))
+
+    def finish(self, job_id, status, message=""):
+        self._execute("UPDATE jobs SET status = ?, message = ?, finished = ? WHERE id = ?",
+                      (status, message, time.time(), job_id))
+        if status in (DONE, CANCELLED):
+            self._remove_work_dir(job_id)
+
+    def cancel(self, job_id):
+        """取消等待中的任务；运行中的任务由执行者取消后调用 finish"""
+        cursor = self._execute("UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status = ?",
+                               (CANCELLED, time.time(), job_id, QUEUED))
+        if cursor.rowcount:
+            self._remove_work_dir(job_id)
+        return cursor.rowcount > 0
+
+    def retry(self, job_id):
+        """失败或已取消的任务重新排队"""
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, message = '', files_done = 0, started = NULL, finished = NULL "
+            "WHERE id = ? AND status IN (?, ?)", (QUEUED, job_id, FAILED, CANCELLED))
+        return cursor.rowcount > 0
+
+    def remove(self, job_id):
+        """删除未在运行的任务及其工作目录"""
+        job = self.get(job_id)
+        if job is None or job["status"] == RUNNING:
+            return False
+        self._remove_work_dir(job_id)
+        self._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return True
+
+    def clear_finished(self):
+        for row in self._fetch("SELECT id FROM jobs WHERE status IN (?, ?, ?)", FINISHED_STATUSES):
+            self.remove(row["id"])
+
+    def recover(self):
+        """已退出的程序留下的运行中任务重新排队，返回任务数；仍在运行的程序的任务不受影响"""
+        count = 0
+        for row in self._fetch("SELECT DISTINCT owner FROM jobs WHERE status = ?", (RUNNING,)):
+            owner = row["owner"]
+            if owner == self.owner or (owner and self.owner_dir and owner_alive(self.owner_dir, owner)):
+                continue
+            count += self._execute("UPDATE jobs SET status = ? WHERE status = ? AND owner IS ?",
+                                   (QUEUED, RUNNING, owner)).rowcount
+        self._prune_owner_locks()
+        return count
+
+    def _prune_owner_locks(self):
+        """删除已退出的程序留下的锁文件"""
+        if self.owner_dir is None:
+            return
+        try:
+            names = os.listdir(self.owner_dir)
+        except OSError:
+            return
+        for name in names:
+            owner = name[:-len(OWNER_LOCK_SUFFIX)]
+            if name.endswith(OWNER_LOCK_SUFFIX) and owner != self.owner:
+                owner_alive(self.owner_dir, owner)
+
+    @property
+    def concurrency(self):
+        rows = self._fetch("SELECT value FROM settings WHERE key = 'concurrency'")
+        return int(rows[0]["value"]) if rows else DEFAULT_CONCURRENCY
+
+    @concurrency.setter
+    def concurrency(self, value):
+        value = max(1, min(int(value), MAX_CONCURRENCY))
+        self._execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('concurrency', ?)", (str(value),))
+
+    def _remove_work_dir(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            work_dir = json.loads(job["kwargs"]).get("work_dir")
+            if work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def open_queue(path=None):
+    """打开任务队列，返回 (队列, 是否改用了内存中的队列)
+
+    数据库无法打开时把错误写入 instrument 日志，改用内存中的队列，任务不会保存到下次启动。
+    """
+    try:
+        return JobQueue(path), False
+    except (OSError, sqlite3.Error) as e:
+        instrument.event("open_queue", error=e, path=default_db_path() if path is None else path)
+        return JobQueue(":memory:"), True
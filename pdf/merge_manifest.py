@@ -0,0 +1,88 @@
+"""增量合并的记录：合并结果旁的 输出.pdf.merge.json
+
+记录输出文件的大小和修改时间，以及每个输入文件的内容摘要和它在输出中对应的片段
+（字节范围、对象编号、相对偏移和页面编号，见 StreamingPdfWriter.segment_since）。
+下一次合并同一输出时，内容没有变化的输入直接从上次的输出中复制对应的字节范围，
+只重新解析改动过的文件。输出被其他程序改动过时记录失效。
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".merge.json"
+HASH_CHUNK = 1024 * 1024
+
+
+def manifest_path(output_file):
+    return output_file + MANIFEST_SUFFIX
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def file_digest(path):
+    """文件内容的摘要"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def input_digests(file_list, manifest=None):
+    """返回 [(大小, 修改时间, 摘要)]；路径、大小和修改时间都与记录相同的文件不再读取"""
+    known = {}
+    if manifest is not None:
+        for entry in manifest["inputs"]:
+            known[(entry["path"], entry["size"], entry["mtime_ns"])] = entry["digest"]
+    result = []
+    for path in file_list:
+        size, mtime_ns = _stamp(path)
+        digest = known.get((os.path.abspath(path), size, mtime_ns)) or file_digest(path)
+        result.append((size, mtime_ns, digest))
+    return result
+
+
+def load_manifest(output_file):
+    """读取 output_file 的合并记录；没有记录、格式不对或输出已被改动时返回 None"""
+    try:
+        with open(manifest_path(output_file), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            return None
+        if [manifest["output_size"], manifest["output_mtime_ns"]] != list(_stamp(output_file)):
+            return None
+        return manifest
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_manifest(output_file, file_list, digests, segments):
+    """保存合并记录，segments 与 file_list 一一对应；写不进去时只是下次完整合并"""
+    size, mtime_ns = _stamp(output_file)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "output_size": size,
+        "output_mtime_ns": mtime_ns,
+        "inputs": [dict(segment, path=os.path.abspath(path), size=stamp[0], mtime_ns=stamp[1], digest=stamp[2])
+                   for path, stamp, segment in zip(file_list, digests, segments)],
+    }
+    path = manifest_path(output_file)
+    try:
+        fd, temp_file = tempfile.mkstemp(prefix=".pdf-toolbox-", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, separators=(",", ":"))
+            os.replace(temp_file, path)
+        except BaseException:
+            os.remove(temp_file)
+            raise
+    except OSError:
+        pass
@@ -0,0 +1,325 @@
+"""轻量PDF索引：只读取文件尾、交叉引用和实际用到的对象，打开文件的开销与文档大小无关"""
+import mmap
+import os
+import re
+from io import BytesIO
+from itertools import islice
+
+from PyPDF2 import PdfReader
+from PyPDF2.errors import PdfReadError
+from PyPDF2.generic import DictionaryObject, IndirectObject, NameObject, NullObject, read_object
+from PyPDF2._utils import read_non_whitespace
+
+# 在文件末尾查找 startxref 的范围
+TAIL_SIZE = 1024
+
+SUBSECTION_PATTERN = re.compile(rb'\s*(?:(\d+)\s+(\d+)[ \t]*(?:\r\n|\r|\n)|(trailer))')
+OBJECT_HEADER_PATTERN = re.compile(rb'\s*(\d+)\s+(\d+)\s+obj')
+
+# 页面可以从页面树的上级节点继承的属性
+INHERITABLE_PAGE_KEYS = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+
+def map_file(path):
+    """以只读内存映射打开 path，返回支持 read/seek/tell 的对象，用法与二进制文件对象相同
+
+    文件内容由操作系统按需换入页缓存，不占用 Python 堆内存，任意偏移的读取不需要
+    从头缓冲；空文件或不支持映射的文件（如管道）退回普通文件对象。
+    映射期间文件不能被截断写入，输出统一先写临时文件或在写入前使缓存失效。
+    """
+    f = open(path, 'rb')
+    try:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return f
+    # mmap 持有自己的文件描述符，原文件对象可以关闭
+    f.close()
+    return mapped
+
+
+class _TableSection:
+    """传统交叉引用表：每个条目固定长度，按编号直接定位，不需要逐行解析"""
+
+    def __init__(self, stream, subsections):
+        self.stream = stream
+        self.subsections = subsections  # [(起始编号, 数量, 首个条目的偏移, 条目长度)]
+
+    def lookup(self, num):
+        for start, count, position, entry_length in self.subsections:
+            if start <= num < start + count:
+                self.stream.seek(position + (num - start) * entry_length)
+                entry = self.stream.read(18)
+                if entry[17:18] != b"n":
+                    return ("f",)
+                return ("n", int(entry[:10]), int(entry[11:16]))
+        return None
+
+
+class _StreamSection:
+    """交叉引用流（PDF 1.5）：解压后同样是定长条目"""
+
+    def __init__(self, data, widths, index):
+        self.data = data
+        self.widths = widths
+        self.entry_length = sum(widths)
+        self.subsections = []
+        row = 0
+        for start, count in zip(index[::2], index[1::2]):
+            self.subsections.append((start, count, row))
+            row += count
+
+    def _field(self, entry, start, width, default):
+        if width == 0:
+            return default
+        return int.from_bytes(entry[start:start + width], "big")
+
+    def lookup(self, num):
+        for start, count, row in self.subsections:
+            if start <= num < start + count:
+                position = (row + num - start) * self.entry_length
+                entry = self.data[position:position + self.entry_length]
+                w0, w1, w2 = self.widths
+                kind = self._field(entry, 0, w0, 1)
+                second = self._field(entry, w0, w1, 0)
+                third = self._field(entry, w0 + w1, w2, 0)
+                if kind == 1:
+                    return ("n", second, third)
+                if kind == 2:
+                    return ("c", second, third)
+                return ("f",)
+        return None
+
+
+class PdfIndex:
+    """按需读取对象的PDF索引，可作为 PyPDF2 解析函数的 pdf 参数使用
+
+    打开时只读取最后一个交叉引用段和文件尾，更早的段（/Prev）在查找不到对象时才读取。
+    对象读取后缓存在 objects 中，可调用 clear_cache() 释放。
+    """
+    strict = True  # 让 PyPDF2 遇到格式错误时抛出异常，而不是扫描整个文件修复
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.objects = {}
+        self._checked = 0
+        self._object_streams = {}
+        self._sections = []
+        self._visited = set()
+        self._pending = [self._find_startxref()]
+        self.trailer = None
+        self._load_next_section()
+        if self.trailer is None:
+            raise PdfReadError("未找到文件尾")
+
+    def _find_startxref(self):
+        self.stream.seek(0, os.SEEK_END)
+        end = self.stream.tell()
+        if isinstance(self.stream, mmap.mmap):
+            # 内存映射可以直接在文件末尾搜索，不必先读出来
+            tail = memoryview(self.stream)[max(0, end - TAIL_SIZE):]
+        else:
+            self.stream.seek(max(0, end - TAIL_SIZE))
+            tail = self.stream.read()
+        try:
+            matches = re.findall(rb'startxref\s+(\d+)', tail)
+        finally:
+            if isinstance(tail, memoryview):
+                tail.release()  # 未释放的视图会使映射无法关闭
+        if not matches:
+            raise PdfReadError("未找到 startxref")
+        return int(matches[-1])
+
+    def _load_next_section(self):
+        """读取待处理的下一个交叉引用段，返回是否读取到新的段"""
+        while self._pending:
+            offset = self._pending.pop(0)
+            if offset in self._visited:
+                continue
+            self._visited.add(offset)
+            self.stream.seek(offset)
+            if self.stream.read(4) == b"xref":
+                trailer = self._read_table(offset + 4)
+                # 混合格式：表中缺少的对象在 /XRefStm 指向的交叉引用流中
+                if "/XRefStm" in trailer:
+                    self._pending.insert(0, int(trailer.raw_get("/XRefStm")))
+            else:
+                trailer = self._read_xref_stream(offset)
+            if self.trailer is None:
+                self.trailer = trailer
+            if "/Prev" in trailer:
+                self._pending.append(int(trailer.raw_get("/Prev")))
+            return True
+        return False
+
+    def _read_table(self, position):
+        subsections = []
+        while True:
+            self.stream.seek(position)
+            chunk = self.stream.read(64)
+            match = SUBSECTION_PATTERN.match(chunk)
+            if match is None:
+                raise PdfReadError(f"交叉引用表格式错误，位置 {position}")
+            if match.group(3):
+                self.stream.seek(position + match.end())
+                read_non_whitespace(self.stream)
+                self.stream.seek(-1, 1)
+                trailer = read_object(self.stream, self)
+                break
+            start, count = int(match.group(1)), int(match.group(2))
+            position += match.end()
+            entry_length = 20
+            if count:
+                # 标准条目为 20 字节；有些生成器只用一个换行符，条目为 19 字节
+                self.stream.seek(position)
+                entry = self.stream.read(20)
+                if entry[18:19] in (b"\r", b"\n") and entry[19:20] not in (b"\r", b"\n"):
+                    entry_length = 19
+            subsections.append((start, count, position, entry_length))
+            position += count * entry_length
+        self._sections.append(_TableSection(self.stream, subsections))
+        return trailer
+
+    def _read_xref_stream(self, offset):
+        xref = self._read_at(offset)
+        if xref.get("/Type") != "/XRef":
+            raise PdfReadError(f"startxref 指向的不是交叉引用，位置 {offset}")
+        size = int(xref["/Size"])
+        index = [int(n) for n in xref.get("/Index", [0, size])]
+        widths = [int(w) for w in xref["/W"]]
+        self._sections.append(_StreamSection(xref.get_data(), widths, index))
+        return xref
+
+    def _lookup(self, num):
+        checked = 0
+        while True:
+            for section in self._sections[checked:]:
+                entry = section.lookup(num)
+                if entry is not None:
+                    return entry
+            checked = len(self._sections)
+            if not self._load_next_section():
+                return None
+
+    def _read_at(self, offset, num=None):
+        self.stream.seek(offset)
+        header = OBJECT_HEADER_PATTERN.match(self.stream.read(32))
+        if header is None or (num is not None and int(header.group(1)) != num):
+            raise PdfReadError(f"对象 {num} 的偏移 {offset} 无效")
+        self.stream.seek(offset + header.end())
+        read_non_whitespace(self.stream)
+        self.stream.seek(-1, 1)
+        return read_object(self.stream, self)
+
+    def _read_compressed(self, num, stream_num):
+        cached = self._object_streams.get(stream_num)
+        if cached is None:
+            object_stream = self.get_object(stream_num)
+            data = object_stream.get_data()
+            first = int(object_stream["/First"])
+            header = data[:first].split()
+            offsets = {int(header[i]): first + int(header[i + 1])
+                       for i in range(0, 2 * int(object_stream["/N"]), 2)}
+            cached = self._object_streams[stream_num] = (data, offsets)
+        data, offsets = cached
+        buffer = BytesIO(data)
+        buffer.seek(offsets[num])
+        return read_object(buffer, self)
+
+    def get_object(self, ref):
+        """按编号或间接引用读取对象，不存在的对象返回 NullObject"""
+        num = ref.idnum if isinstance(ref, IndirectObject) else ref
+        obj = self.objects.get(num)
+        if obj is None:
+            entry = self._lookup(num)
+            if entry is None or entry[0] == "f":
+                obj = NullObject()
+            elif entry[0] == "n":
+                obj = self._read_at(entry[1], num)
+            else:
+                obj = self._read_compressed(num, entry[1])
+            self.objects[num] = obj
+        return obj
+
+    def clear_cache(self):
+        self.objects.clear()
+        self._object_streams.clear()
+        self._checked = 0
+
+    def release_streams(self, min_size):
+        """丢弃上次调用之后新缓存的、数据不小于 min_size 字节的流对象，再次访问时从文件读取"""
+        # 缓存按读取顺序排列，只检查末尾新增的部分
+        new_objects = islice(reversed(self.objects.items()), max(len(self.objects) - self._checked, 0))
+        for num in [num for num, obj in new_objects if len(getattr(obj, "_data", b"")) >= min_size]:
+            del self.objects[num]
+        self._checked = len(self.objects)
+
+    def page(self, number):
+        """按页码（从0开始）沿页面树向下查找页面，只读取经过的节点
+
+        返回页面字典的副本，补上从上级节点继承的属性，indirect_reference 指向原页面对象。
+        节点的 /Count 等于 /Kids 的数量时，子节点都是单页，直接按下标取，不读取同级节点。
+        """
+        node = self.trailer["/Root"]["/Pages"]
+        if not 0 <= number < int(node["/Count"]):
+            raise IndexError(f"页码 {number + 1} 超出范围")
+        inherited = {}
+        remaining = number
+        while True:
+            for key in INHERITABLE_PAGE_KEYS:
+                if key in node:
+                    inherited[key] = node.raw_get(key)
+            kid = self._find_kid(node["/Kids"], int(node["/Count"]), remaining)
+            if kid is None:
+                raise PdfReadError(f"页面树中找不到第 {number + 1} 页")
+            kid_ref, node, remaining = kid
+            if "/Kids" not in node:
+                break
+        page = DictionaryObject(node)
+        for key, value in inherited.items():
+            if key not in page:
+                page[NameObject(key)] = value
+        page.indirect_reference = kid_ref
+        return page
+
+    def _find_kid(self, kids, count, remaining):
+        """返回包含第 remaining 页的子节点 (引用, 对象, 在该子节点中的页码)"""
+        if count == len(kids) and remaining < len(kids):
+            kid = kids[remaining].get_object()
+            if "/Kids" not in kid or int(kid["/Count"]) == 1:
+                return kids[remaining], kid, 0
+        for kid_ref in kids:
+            kid = kid_ref.get_object()
+            kid_count = int(kid["/Count"]) if "/Kids" in kid else 1
+            if remaining < kid_count:
+                return kid_ref, kid, remaining
+            remaining -= kid_count
+        return None
+
+
+def probe_pdf(pdf_file):
+    """读取页数、标题和是否加密，只访问文件尾、交叉引用、文档目录和页面树根节点
+
+    返回 {"pages", "title", "encrypted"}。索引无法解析的文件（如交叉引用损坏）
+    退回 PdfReader 完整解析，它能重建交叉引用。
+    """
+    with map_file(pdf_file) as f:
+        try:
+            index = PdfIndex(f)
+            trailer = index.trailer
+            pages = int(trailer["/Root"]["/Pages"]["/Count"])
+            if pages < 0:
+                raise PdfReadError("页数无效")
+            encrypted = "/Encrypt" in trailer
+            title = None
+            if not encrypted and "/Info" in trailer:
+                # 加密文件中的字符串也是加密的，不读取标题
+                info = trailer["/Info"]
+                if "/Title" in info:
+                    title = info["/Title"]
+        except Exception:
+            f.seek(0)
+            reader = PdfReader(f)
+            pages = len(reader.pages)
+            encrypted = reader.is_encrypted
+            title = None if encrypted or reader.metadata is None else reader.metadata.title
+    return {"pages": pages, "title": str(title) if title else None, "encrypted": encrypted}
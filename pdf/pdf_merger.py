@@ -1,184 +1,319 @@
 import sys
 import os
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QFileDialog, 
-                           QVBoxLayout, QHBoxLayout, QWidget, QListWidget, QProgressBar, 
-                           QLabel, QStackedWidget, QSpinBox, QFrame, QListWidgetItem, QSizePolicy, QLineEdit, QComboBox, QRadioButton)
-from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation
-from PyQt5.QtGui import QPalette, QFont, QIcon
-from PyPDF2 import PdfReader, PdfWriter
-from PyQt5.QtSvg import QSvgWidget
-from PyQt5.QtCore import QSize
+                           QVBoxLayout, QHBoxLayout, QWidget, QProgressBar, 
+                           QLabel, QStackedWidget, QLineEdit, QComboBox, QCheckBox,
+                           QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QSpinBox)
+from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QItemSelectionModel
+from PyQt5.QtGui import QIcon
+
+from file_list import DragDropListView, FILE_LIST_STYLE, ROW_HEIGHT
+from thumbnails import ThumbnailLoader, PageGridView
+from doc_cache import document_cache
+from job_engine import JobEngine, ScanJob, ProbeJob, QueueRunner, WatchJob
+from job_queue import open_queue, STATUS_NAMES, MAX_CONCURRENCY, INTERACTIVE_OPERATIONS
+from pdf_ops import (merge_pdf_files, extract_pages, images_to_pdf, format_size,
+                     parse_page_ranges, format_page_ranges, extract_output_name, IMAGE_EXTENSIONS,
+                     parse_range_groups, every_n_pages, split_output_names, split_pdf_file,
+                     split_by_bookmarks,
+                     PDF_EXTENSIONS, IMAGE_PROFILES, DEFAULT_IMAGE_PROFILE,
+                     default_workers)
+
+# 合并文件数达到该值时使用多进程并行解析
+PARALLEL_MERGE_MIN_FILES = 8
+# 图片数达到该值时在多个进程中并行转换
+PARALLEL_CONVERT_MIN_FILES = 4
+# 拆分出的文件数达到该值时在多个进程中并行写出
+PARALLEL_SPLIT_MIN_OUTPUTS = 8
+# 文件列表的高度；提取页面加载PDF后列表只占一行，其余空间显示页面缩略图
+FILE_LIST_HEIGHT = 300
+
+# 提取页面的拆分方式：(输入提示, 示例)
+SPLIT_MODES = {
+    "提取页码": ("输入需要提取的页码：", "（示例：1,3,5-9）"),
+    "多组页码": ("输入多组页码：", "（每组一个文件，用分号分隔，示例：1-3;4-9）"),
+    "每N页": ("每个文件的页数：", "（示例：10）"),
+    "按书签": ("按顶层书签拆分", "（每个书签一个文件）"),
+}
+
+# 应用级样式表：启动时只解析一次，控件按类名或 objectName 匹配，不再各自调用 setStyleSheet
+APP_STYLE = """
+    QMainWindow {
+        background-color: white;
+    }
+    QMainWindow QLabel {
+        color: #333333;
+        font-size: 13px;
+    }
+    QMainWindow QListView {
+        font-size: 13px;
+    }
+    QWidget#nav, QStackedWidget#pages {
+        background-color: #F3F4F7;
+    }
+    QLabel#title {
+        color: #333333;
+        font-size: 24px;
+        font-weight: bold;
+        padding: 20px 0px;
+        background-color: #F3F4F7;
+    }
+    NavButton {
+        border: none;
+        text-align: center;
+        padding: 8px 16px;
+        font-size: 15px;
+        color: #666666;
+        background-color: #F3F4F7;
+        margin: 4px 16px;
+    }
+    NavButton:checked {
+        color: #2B6DE8;
+        font-weight: bold;
+        background-color: #DFE7F4;
+        border-radius: 6px;
+    }
+    NavButton:hover:!checked {
+        color: #2B6DE8;
+        background-color: #E8E9ED;
+        border-radius: 6px;
+    }
+    ActionButton {
+        background-color: #4B8BF4;
+        color: white;
+        border: none;
+        border-radius: 4px;
+        padding: 8px 16px;
+        font-size: 14px;
+    }
+    ActionButton:hover {
+        background-color: #3B7DE8;
+    }
+    ActionButton:pressed {
+        background-color: #2B6DD8;
+    }
+    ActionButton:disabled {
+        background-color: rgba(75, 139, 244, 0.5);  /* 50%透明度 */
+        color: rgba(255, 255, 255, 0.5);  /* 50%透明度 */
+    }
+    AddFileButton {
+        background-color: white;
+        color: #666666;
+        border: none;
+        font-size: 14px;
+        padding: 8px 12px;
+        text-align: left;
+    }
+    AddFileButton:hover {
+        color: #2B6DE8;
+    }
+    ProgressPanel QLabel {
+        color: #666666;
+        font-size: 13px;
+    }
+    ProgressPanel QProgressBar {
+        background-color: #E8E9ED;
+        border: none;
+        border-radius: 4px;
+    }
+    ProgressPanel QProgressBar::chunk {
+        background-color: #4B8BF4;
+        border-radius: 4px;
+    }
+    ProgressPanel QPushButton {
+        background-color: transparent;
+        color: #666666;
+        border: none;
+        font-size: 13px;
+        padding: 4px 8px;
+    }
+    ProgressPanel QPushButton:hover {
+        color: #2B6DE8;
+    }
+    QTableWidget#queueTable {
+        color: #333333;
+        background-color: white;
+        border: 1px solid #F3F4F7;
+        border-radius: 4px;
+        font-size: 13px;
+        selection-background-color: #F0F7FF;
+        selection-color: #2B6DE8;
+    }
+    QSpinBox {
+        color: #333333;
+        background-color: white;
+        border: 1px solid #E0E0E0;
+        border-radius: 4px;
+        padding: 4px 8px;
+        font-size: 13px;
+    }
+    PageGridView {
+        border: none;
+        border-top: 1px solid #F0F0F0;
+        background-color: white;
+    }
+    QWidget#listContainer {
+        background-color: white;
+        border: 1px solid #F3F4F7;
+        border-radius: 4px;
+    }
+    QLabel#hint {
+        color: #666666;
+        font-size: 13px;
+    }
+    QLabel#fieldLabel {
+        color: #333333;
+        font-size: 15px;
+    }
+    QLabel#maxPage {
+        color: #666666;
+        font-size: 15px;
+        padding: 0 4px;
+    }
+    QLabel#example {
+        color: #999999;
+        font-size: 13px;
+        padding-left: 8px;
+    }
+    QLineEdit {
+        color: #333333;
+        background-color: white;
+        border: 1px solid #E0E0E0;
+        border-radius: 4px;
+        padding: 4px 8px;
+        font-size: 15px;
+        min-width: 120px;
+    }
+    QLineEdit:disabled {
+        background-color: #F5F5F5;
+        color: #999999;
+    }
+    QCheckBox {
+        color: #666666;
+        font-size: 13px;
+    }
+    QComboBox {
+        color: #333333;
+        background-color: white;
+        border: 1px solid #E0E0E0;
+        border-radius: 4px;
+        padding: 4px 12px;
+        font-size: 15px;
+        min-width: 120px;
+    }
+    QComboBox:hover {
+        border-color: #2B6DE8;
+    }
+    QComboBox::drop-down {
+        width: 20px;
+        border: none;
+        background: transparent;
+    }
+    QComboBox::down-arrow {
+        image: none;  /* 移除默认箭头图片 */
+        border-left: 5px solid transparent;
+        border-right: 5px solid transparent;
+        border-top: 5px solid #666666;
+        margin-right: 8px;
+    }
+    QComboBox QAbstractItemView {
+        border: 1px solid #E0E0E0;
+        border-radius: 4px;
+        background-color: white;
+        selection-background-color: #F0F7FF;
+        selection-color: #2B6DE8;
+    }
+    QComboBox QAbstractItemView::item {
+        height: 32px;
+        padding-left: 12px;
+        color: #333333;
+    }
+    QComboBox QAbstractItemView::item:hover {
+        background-color: #F5F5F5;
+    }
+    QLabel#toast {
+        background-color: rgba(240, 240, 240, 0.9);  /* 半透明灰色背景 */
+        color: #333333;  /* 深色文字 */
+        padding: 12px 24px;
+        border-radius: 6px;
+        font-size: 14px;
+    }
+""" + FILE_LIST_STYLE
+
+
+def styled(widget, name):
+    """设置 objectName，由 APP_STYLE 中的 #name 规则决定样式"""
+    widget.setObjectName(name)
+    return widget
+
 
 class NavButton(QPushButton):
     def __init__(self, text, parent=None):
         super().__init__(text, parent)
         self.setCheckable(True)
         self.setMinimumHeight(40)
-        self.setStyleSheet("""
-            QPushButton {
-                border: none;
-                text-align: center;
-                padding: 8px 16px;
-                font-size: 15px;
-                color: #666666;
-                background-color: #F3F4F7;
-                margin: 4px 16px;
-            }
-            QPushButton:checked {
-                color: #2B6DE8;
-                font-weight: bold;
-                background-color: #DFE7F4;
-                border-radius: 6px;
-            }
-            QPushButton:hover:!checked {
-                color: #2B6DE8;
-                background-color: #E8E9ED;
-                border-radius: 6px;
-            }
-        """)
 
 class ActionButton(QPushButton):
     def __init__(self, text, parent=None):
         super().__init__(text, parent)
         self.setMinimumHeight(36)
         self.setFixedWidth(200)  # 设固定宽度
-        self.setStyleSheet("""
-            QPushButton {
-                background-color: #4B8BF4;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 8px 16px;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #3B7DE8;
-            }
-            QPushButton:pressed {
-                background-color: #2B6DD8;
-            }
-            QPushButton:disabled {
-                background-color: rgba(75, 139, 244, 0.5);  /* 50%透明度 */
-                color: rgba(255, 255, 255, 0.5);  /* 50%透明度 */
-            }
-        """)
-
-class DragDropListWidget(QListWidget):
+
+class ProgressPanel(QWidget):
+    """后台任务进度条，包含状态文字和取消按钮"""
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setAcceptDrops(True)
-        self.setDragDropMode(QListWidget.InternalMove)
-        self.parent_widget = parent
-        
-        # 添加空状态提示标签
-        self.empty_label = QLabel("将文件拖拽到此处", self)
-        self.empty_label.setStyleSheet("""
-            QLabel {
-                color: #999999;
-                font-size: 13px;
-                background: transparent;
-            }
-        """)
-        self.empty_label.setAlignment(Qt.AlignCenter)
-        self.empty_label.hide()
-        # 设置提示标签层级
-        self.empty_label.setAttribute(Qt.WA_TransparentForMouseEvents)
-        self.empty_label.lower()  # 将提示标签放到底层
-        
-        self.default_style = """
-            QListWidget {
-                border: 1px solid #F7F7F7;
-                border-radius: 4px;
-                background-color: white;
-                color: #333333;
-                font-size: 13px;
-                padding: 4px;
-            }
-            QListWidget::item {
-                color: #333333;
-                background-color: white;
-                padding: 0px;
-                border-bottom: 1px solid #F0F0F0;
-            }
-            QListWidget::item:selected {
-                background-color: #EEF7FF;
-                color: #333333;
-            }
-            QListWidget::item:hover {
-                background-color: #F5F5F5;
-            }
-            QListWidget:focus {
-                border: 1px solid #F7F7F7;
-            }
-        """
-        self.setStyleSheet(self.default_style)
-        
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        # 调整提示标签位置
-        self.empty_label.setGeometry(0, 0, self.width(), self.height())
-        
-    def showEvent(self, event):
-        super().showEvent(event)
-        self.updateEmptyState()
-        
-    def updateEmptyState(self):
-        # 根据列表项数量显示或隐藏提示
-        self.empty_label.setVisible(self.count() == 0)
-
-    def dragEnterEvent(self, event):
-        if event.mimeData().hasUrls():
-            event.accept()
-            # 不再在这里隐藏提示标签
-            self.setStyleSheet("""
-                QListWidget {
-                    border: 2px dashed #2B6DE8;
-                    border-radius: 4px;
-                    background-color: #F8FBFF;
-                    color: #333333;
-                    font-size: 13px;
-                    padding: 4px;
-                }
-                QListWidget::item {
-                    color: #333333;
-                    background-color: white;
-                    padding: 0px;
-                    border-bottom: 1px solid #F0F0F0;
-                }
-                QListWidget::item:selected {
-                    background-color: #EEF7FF;
-                    color: #333333;
-                }
-                QListWidget::item:hover {
-                    background-color: #F5F5F5;
-                }
-            """)
-        else:
-            super().dragEnterEvent(event)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(8)
 
-    def dragMoveEvent(self, event):
-        if event.mimeData().hasUrls():
-            event.accept()
-        else:
-            super().dragMoveEvent(event)  # 处理内部拖拽
-
-    def dragLeaveEvent(self, event):
-        self.setStyleSheet(self.default_style)
-        self.updateEmptyState()  # 恢复提示（如果列表为空）
-        event.accept()
-
-    def dropEvent(self, event):
-        if event.mimeData().hasUrls():
-            event.accept()
-            self.setStyleSheet(self.default_style)
-            # 处理文件
-            if isinstance(self.parent_widget, PDFSplitWidget):
-                self.parent_widget.handle_dropped_files(event.mimeData().urls())
-            elif hasattr(self.parent_widget, 'handle_dropped_files'):
-                self.parent_widget.handle_dropped_files(event.mimeData().urls())
-            self.updateEmptyState()  # 根据列表状态显示或隐藏提示
+        self.status_label = QLabel("")
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.setFixedHeight(8)
+
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.setCursor(Qt.PointingHandCursor)
+
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.progress_bar, 1)
+        layout.addWidget(self.cancel_button)
+        self.job = None
+        self.cancel_button.clicked.connect(self.cancel)
+        self.hide()
+
+    def is_busy(self):
+        return self.job is not None
+
+    def start(self, job, message, busy=False):
+        """显示进度；busy 为 True 时总量未知，进度条显示为忙碌状态"""
+        self.job = job
+        self.status_label.setText(message)
+        self.progress_bar.setRange(0, 0 if busy else 1000)
+        self.progress_bar.setValue(0)
+        self.cancel_button.setEnabled(True)
+        self.show()
+
+    def update_progress(self, file_index, file_count, page_index, page_count):
+        # 总进度 = 已完成文件 + 当前文件内的页进度
+        fraction = (file_index + page_index / max(page_count, 1)) / max(file_count, 1)
+        self.progress_bar.setValue(int(fraction * 1000))
+        if file_count > 1:
+            self.status_label.setText(f"第 {file_index + 1}/{file_count} 个文件")
         else:
-            super().dropEvent(event)
+            self.status_label.setText(f"第 {page_index}/{page_count} 页")
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("正在取消...")
+
+    def finish(self):
+        self.job = None
+        self.hide()
 
 class PDFSplitWidget(QWidget):
     def __init__(self, parent=None):
@@ -197,13 +332,11 @@ class PDFSplitWidget(QWidget):
                     self.load_pdf(file_path)
                     break  # 只处理第一个文件
                 elif os.path.isdir(file_path):
-                    # 处理文件夹中的第一个PDF文件
-                    for root, dirs, files in os.walk(file_path):
-                        for file in files:
-                            if file.lower().endswith('.pdf'):
-                                full_path = os.path.join(root, file)
-                                self.load_pdf(full_path)
-                                return  # 找到第一个PDF文件后返回
+                    # 在后台查找文件夹中的第一个PDF文件
+                    self.main_window.start_scan(
+                        self.progress_panel, self.split_button, [file_path], PDF_EXTENSIONS,
+                        on_found=lambda batch: self.load_pdf(batch[0]), max_results=1)
+                    break
 
     def setup_ui(self):
         layout = QVBoxLayout()
@@ -211,37 +344,32 @@ class PDFSplitWidget(QWidget):
         layout.setSpacing(12)
         
         # 创建列表容器
-        list_container = QWidget()
-        list_container.setStyleSheet("""
-            QWidget {
-                background-color: white;
-                border: 1px solid #F3F4F7;
-                border-radius: 4px;
-            }
-        """)
+        list_container = styled(QWidget(), "listContainer")
         list_layout = QVBoxLayout(list_container)
         list_layout.setContentsMargins(4, 4, 4, 4)
         
         # 文件列表
-        self.file_list = DragDropListWidget(self)
-        self.file_list.setFixedHeight(300)  # 使用固定高度
+        self.file_list = DragDropListView(self)
+        self.file_list.setFixedHeight(FILE_LIST_HEIGHT)  # 使用固定高度
+        self.file_list.set_thumbnails(self.main_window.thumbnails)
+        self.file_list.delegate.delete_requested.connect(lambda row: self.remove_file())
+        
+        # 页面缩略图，选中的页面填入页码输入框
+        self.page_grid = PageGridView(self.main_window.thumbnails)
+        self.page_grid.pages_selected.connect(self.on_pages_selected)
+        self.page_grid.hide()
         
         # 添加文件按钮
         self.add_file_button = AddFileButton()
         self.add_file_button.clicked.connect(self.select_file)
         
         list_layout.addWidget(self.file_list)
+        list_layout.addWidget(self.page_grid)
         list_layout.addWidget(self.add_file_button)
         layout.addWidget(list_container)
         
         # 提示语放在列表下方
-        self.label = QLabel("添加要提取的PDF文件，提取后的PDF文件会保存至原文件夹")
-        self.label.setStyleSheet("""
-            QLabel {
-                color: #666666;
-                font-size: 13px;
-            }
-        """)
+        self.label = styled(QLabel("添加要提取的PDF文件，提取后的PDF文件会保存至原文件夹"), "hint")
         layout.addWidget(self.label)
         
         # 修改页面范围设置
@@ -250,48 +378,26 @@ class PDFSplitWidget(QWidget):
         range_layout.setContentsMargins(0, 0, 0, 0)
         range_layout.setSpacing(4)  # 设置组件间距
         
-        self.range_label = QLabel("输入需要提取的页码：")
-        self.range_label.setStyleSheet("color: #333333; font-size: 15px;")
+        # 拆分方式：提取一组页码，或一次拆分出多个文件
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(list(SPLIT_MODES))
+        self.mode_combo.currentTextChanged.connect(self.update_mode)
+        
+        self.range_label = styled(QLabel("输入需要提取的页码："), "fieldLabel")
         
         # 使用输入框替代数字选择器
         self.page_input = QLineEdit()
         self.page_input.setEnabled(False)
-        self.page_input.setStyleSheet("""
-            QLineEdit {
-                color: #333333;
-                background-color: white;
-                border: 1px solid #E0E0E0;
-                border-radius: 4px;
-                padding: 4px 8px;
-                font-size: 15px;
-                min-width: 120px;
-            }
-            QLineEdit:disabled {
-                background-color: #F5F5F5;
-                color: #999999;
-            }
-        """)
+        self.page_input.textEdited.connect(self.on_page_input_edited)
         
         # 添加最大页码显示
-        self.max_page_label = QLabel("/--")
-        self.max_page_label.setStyleSheet("""
-            QLabel {
-                color: #666666;
-                font-size: 15px;
-                padding: 0 4px;
-            }
-        """)
+        self.max_page_label = styled(QLabel("/--"), "maxPage")
         
         # 添加范例说明
-        self.example_label = QLabel("（示例：1,3,5-9）")
-        self.example_label.setStyleSheet("""
-            QLabel {
-                color: #999999;
-                font-size: 13px;
-                padding-left: 8px;
-            }
-        """)
+        self.example_label = styled(QLabel("（示例：1,3,5-9）"), "example")
         
+        range_layout.addWidget(self.mode_combo)
+        range_layout.addSpacing(8)
         range_layout.addWidget(self.range_label)
         range_layout.addWidget(self.page_input)
         range_layout.addWidget(self.max_page_label)
@@ -305,7 +411,9 @@ class PDFSplitWidget(QWidget):
         bottom_layout = QHBoxLayout(bottom_container)
         bottom_layout.setContentsMargins(20, 10, 20, 20)  # 增加左右边距
         
-        # 按钮靠右放置
+        # 进度条在左，按钮靠右放置
+        self.progress_panel = ProgressPanel()
+        bottom_layout.addWidget(self.progress_panel, 1)
         bottom_layout.addStretch()
         self.split_button = ActionButton("提取PDF")
         self.split_button.clicked.connect(self.split_pdf)
@@ -322,63 +430,65 @@ class PDFSplitWidget(QWidget):
 
     def load_pdf(self, file_path):
         self.pdf_file = file_path
-        self.file_list.clear()
-        
-        # 添加带删除按钮的文件项
-        item = QListWidgetItem()
-        widget = QWidget()
-        layout = QHBoxLayout(widget)
-        layout.setContentsMargins(12, 4, 12, 4)
-        
-        # 文件名标签
-        label = QLabel(os.path.basename(file_path))
-        label.setStyleSheet("""
-            QLabel {
-                color: #333333;
-                font-size: 13px;
-                border: none;  /* 移除边框 */
-                background: transparent;  /* 透明背景 */
-            }
-        """)
-        label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
-        
-        # 删除按钮
-        delete_btn = DeleteButton()
-        delete_btn.setFixedWidth(40)
-        delete_btn.clicked.connect(lambda: self.remove_file())
-        
-        layout.addWidget(label)
-        layout.addWidget(delete_btn)
-        
-        # 设置整个项目的样式
-        widget.setStyleSheet("""
-            QWidget {
-                background: transparent;  /* 透明背景 */
-                border: none;  /* 移除边框 */
-            }
-        """)
-        
-        widget.setFixedHeight(36)  # 固定每个项目的高度
-        item.setSizeHint(widget.sizeHint())
-        
-        self.file_list.addItem(item)
-        self.file_list.setItemWidget(item, widget)
-        
-        # 读取PDF页数
-        with open(file_path, 'rb') as file:
-            pdf = PdfReader(file)
-            self.max_pages = len(pdf.pages)
+        self.main_window.thumbnails.forget(file_path)  # 同名文件可能已被修改
+        self.file_list.model().clear()
+        self.file_list.model().add_paths([file_path])
+        
+        # 只读取交叉引用和页面树根节点获取页数，与文档大小无关
+        try:
+            info = document_cache.probe(file_path)
+        except Exception as e:
+            self.remove_file()
+            self.main_window.show_toast(f"无法读取PDF文件: {e}")
+            return
+        self.max_pages = info["pages"]
+        self.file_list.model().set_page_counts([(file_path, self.max_pages)])
+        self.show_pages(file_path, self.max_pages)
         
         # 更新控件
-        self.page_input.setEnabled(True)
+        self.page_input.setEnabled(self.mode_combo.currentText() != "按书签")
         self.page_input.clear()
         self.max_page_label.setText(f"/{self.max_pages}页")  # 更新最大页码显示，添加“页”
         self.split_button.setEnabled(True)
         
-        self.main_window.show_toast(f"PDF文件加载，共 {self.max_pages} 页")
+        if info["encrypted"]:
+            self.main_window.show_toast(f"PDF文件已加密，共 {self.max_pages} 页，提取时可能需要密码")
+        elif info["title"]:
+            self.main_window.show_toast(f"已加载《{info['title']}》，共 {self.max_pages} 页")
+        else:
+            self.main_window.show_toast(f"PDF文件加载，共 {self.max_pages} 页")
+
+    def show_pages(self, file_path, pages):
+        """显示页面缩略图，文件列表缩为一行，整体高度不变"""
+        self.page_grid.set_document(file_path, pages)
+        list_height = ROW_HEIGHT + 10  # 加上列表的边框和内边距
+        if file_path is None:
+            self.page_grid.hide()
+            self.file_list.setFixedHeight(FILE_LIST_HEIGHT)
+        else:
+            self.file_list.setFixedHeight(list_height)
+            self.page_grid.setFixedHeight(FILE_LIST_HEIGHT - list_height - self.page_grid.parentWidget().layout().spacing())
+            self.page_grid.show()
+
+    def on_pages_selected(self, pages):
+        """在缩略图中选中页面时改用“提取页码”方式，并把页码写入输入框"""
+        if not pages:
+            return
+        if self.mode_combo.currentText() != "提取页码":
+            self.mode_combo.setCurrentText("提取页码")
+        self.page_input.setText(format_page_ranges(pages))
+
+    def on_page_input_edited(self, text):
+        """输入的页码有效时在缩略图中选中对应页面"""
+        if self.mode_combo.currentText() != "提取页码":
+            return
+        pages = self.parse_page_ranges(text.strip()) if text.strip() else []
+        if pages is not None:
+            self.page_grid.select_pages(pages)
 
     def remove_file(self):
-        self.file_list.clear()
+        self.file_list.model().clear()
+        self.show_pages(None, 0)
         self.pdf_file = None
         self.max_pages = 0
         self.page_input.setEnabled(False)
@@ -388,137 +498,94 @@ class PDFSplitWidget(QWidget):
 
     def parse_page_ranges(self, input_text):
         """解析页码输入"""
-        try:
-            # 替换中文逗号为英文逗号
-            input_text = input_text.replace('，', ',')
-            pages = set()
-            parts = input_text.replace(' ', '').split(',')
-            
-            for part in parts:
-                if '-' in part:
-                    start, end = map(int, part.split('-'))
-                    if start < 1 or end > self.max_pages or start > end:
-                        raise ValueError
-                    pages.update(range(start, end + 1))
-                else:
-                    page = int(part)
-                    if page < 1 or page > self.max_pages:
-                        raise ValueError
-                    pages.add(page)
-            
-            return sorted(list(pages))
-        except ValueError:
-            return None
+        return parse_page_ranges(input_text, self.max_pages)
+
+    def update_mode(self, mode):
+        label, example = SPLIT_MODES[mode]
+        self.range_label.setText(label)
+        self.example_label.setText(example)
+        self.page_input.clear()
+        self.page_input.setVisible(mode != "按书签")
+        self.max_page_label.setVisible(mode != "按书签")
+        self.page_input.setEnabled(self.pdf_file is not None and mode != "按书签")
 
     def split_pdf(self):
         if not self.pdf_file:
             return
         
+        mode = self.mode_combo.currentText()
+        if mode == "按书签":
+            self.start_split(split_by_bookmarks, self.pdf_file)
+            return
+        
         input_text = self.page_input.text().strip()
         if not input_text:
-            self.main_window.show_toast("请输入需要提取的页码")
+            self.main_window.show_toast("请输入需要提取的页码" if mode != "每N页" else "请输入每个文件的页数")
+            return
+        
+        if mode == "多组页码":
+            groups = parse_range_groups(input_text, self.max_pages)
+            if groups is None:
+                self.main_window.show_toast("页码格式错误或超出范围")
+                return
+            self.start_split(split_pdf_file, self.pdf_file, groups, split_output_names(self.pdf_file, groups),
+                             outputs=len(groups))
+            return
+        if mode == "每N页":
+            if not input_text.isdigit() or int(input_text) < 1:
+                self.main_window.show_toast("请输入大于0的整数")
+                return
+            groups = every_n_pages(self.max_pages, int(input_text))
+            self.start_split(split_pdf_file, self.pdf_file, groups, split_output_names(self.pdf_file, groups),
+                             outputs=len(groups))
             return
         
         pages = self.parse_page_ranges(input_text)
         if pages is None:
-            self.main_window.show_toast("页码格式错误或超���范围")
+            self.main_window.show_toast("页码格式错误或超出范围")
             return
         
         # 创建输出文件名
-        base_name = os.path.splitext(self.pdf_file)[0]
-        page_desc = f"{pages[0]}-{pages[-1]}" if len(pages) > 1 else str(pages[0])
-        output_file = f"{base_name}_提取_{page_desc}.pdf"
+        output_file = extract_output_name(self.pdf_file, pages)
         
-        try:
-            # 提取PDF
-            pdf_writer = PdfWriter()
-            with open(self.pdf_file, 'rb') as file:
-                pdf_reader = PdfReader(file)
-                
-                # 添加选定的页面
-                for page_num in pages:
-                    pdf_writer.add_page(pdf_reader.pages[page_num - 1])
-            
-            # 保存提取后的PDF
-            with open(output_file, 'wb') as output:
-                pdf_writer.write(output)
-            
-            self.main_window.show_toast("PDF提取完成，文件已保存至原文件夹")
-            
-        except Exception as e:
-            self.main_window.show_toast("提取PDF时出错")
+        # 在后台线程中提取PDF
+        self.main_window.start_job(
+            self.progress_panel, self.split_button, "正在提取...",
+            extract_pages, self.pdf_file, pages, output_file,
+            on_finished=lambda _: self.main_window.show_toast("PDF提取完成，文件已保存至原文件夹"))
+
+    def start_split(self, func, *args, outputs=None):
+        """在后台拆分出多个文件；outputs 为 None（按书签拆分，读取书签后才知道文件数）时也使用多进程"""
+        workers = default_workers() if outputs is None or outputs >= PARALLEL_SPLIT_MIN_OUTPUTS else None
+        self.main_window.start_job(
+            self.progress_panel, self.split_button, "正在拆分...", func, *args, workers=workers,
+            on_finished=lambda result: self.main_window.show_toast(
+                f"拆分完成！共 {result['outputs']} 个文件，已保存至原文件夹"))
 
 class AddFileButton(QPushButton):
     def __init__(self, parent=None):
         super().__init__("+ 添加文件", parent)
-        self.setStyleSheet("""
-            QPushButton {
-                background-color: white;
-                color: #666666;
-                border: none;
-                font-size: 14px;
-                padding: 8px 12px;
-                text-align: left;
-            }
-            QPushButton:hover {
-                color: #2B6DE8;
-            }
-        """)
         self.setCursor(Qt.PointingHandCursor)
 
-class DeleteButton(QPushButton):
-    def __init__(self, parent=None):
-        super().__init__("删除", parent)
-        self.setStyleSheet("""
-            QPushButton {
-                background-color: transparent;
-                color: #666666;
-                border: none;
-                font-size: 13px;
-                padding: 4px 8px;
-                text-align: center;
-            }
-            QPushButton:hover {
-                color: #2B6DE8;
-            }
-        """)
-        self.setCursor(Qt.PointingHandCursor)
-
-    def setSelected(self, selected):
-        if selected:
-            self.setStyleSheet("""
-                QPushButton {
-                    background-color: #EEF7FF;
-                    color: #666666;
-                    border: none;
-                    font-size: 13px;
-                    padding: 4px 8px;
-                    text-align: center;
-                }
-                QPushButton:hover {
-                    color: #2B6DE8;
-                }
-            """)
-        else:
-            self.setStyleSheet("""
-                QPushButton {
-                    background-color: transparent;
-                    color: #666666;
-                    border: none;
-                    font-size: 13px;
-                    padding: 4px 8px;
-                    text-align: center;
-                }
-                QPushButton:hover {
-                    color: #2B6DE8;
-                }
-            """)
-
 class PDFMergerApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("PDF工具箱")
         self.setGeometry(100, 100, 800, 500)
+        # 在创建控件之前设置，控件创建时直接应用，不必之后再重新计算样式
+        QApplication.instance().setStyleSheet(APP_STYLE)
+        
+        # 后台任务引擎
+        self.job_engine = JobEngine(self)
+        # 合并、提取和转换任务进入持久化的队列，关闭程序后下次启动时继续；
+        # 提取和拆分使用单独的名额，不必排在长时间的合并之后
+        queue, self.queue_in_memory = open_queue()
+        self.queue_runner = QueueRunner(queue, self)
+        # 监视文件夹一直运行，使用单独的线程池，在第一次使用时创建
+        self.watch_engine = None
+        self.watch_job = None
+        # 缩略图在单独的线程池中渲染，不会排在合并等任务之后
+        self.thumbnails = ThumbnailLoader(self)
         
         # 设置应用图标
         try:
@@ -539,27 +606,6 @@ class PDFMergerApp(QMainWindow):
         except Exception as e:
             print(f"设置图标时出错: {e}")
         
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: white;
-            }
-            QWidget {
-                background-color: white;
-            }
-            QLabel {
-                color: #333333;
-                font-size: 13px;
-            }
-            QSpinBox {
-                color: #333333;
-                background-color: white;
-                font-size: 13px;
-            }
-            QListWidget {
-                font-size: 13px;
-            }
-        """)
-        
         # 创建主布局
         main_widget = QWidget()
         main_layout = QHBoxLayout()
@@ -567,25 +613,15 @@ class PDFMergerApp(QMainWindow):
         main_layout.setContentsMargins(0, 0, 0, 0)
         
         # 创建左侧导航栏
-        nav_widget = QWidget()
-        nav_widget.setStyleSheet("background-color: #F3F4F7;")  # 修改背景色
+        nav_widget = styled(QWidget(), "nav")
         nav_layout = QVBoxLayout()
         nav_layout.setContentsMargins(0, 0, 0, 0)
         nav_layout.setSpacing(0)
         nav_widget.setFixedWidth(200)  # 增加导航栏宽度
         
         # 添加Logo或标题
-        title_label = QLabel("PDF工具箱")
+        title_label = styled(QLabel("PDF工具箱"), "title")
         title_label.setAlignment(Qt.AlignCenter)  # 文字居中
-        title_label.setStyleSheet("""
-            QLabel {
-                color: #333333;
-                font-size: 24px;
-                font-weight: bold;
-                padding: 20px 0px;
-                background-color: #F3F4F7;
-            }
-        """)
         nav_layout.addWidget(title_label)
         
         self.merge_nav = NavButton("PDF合并")
@@ -598,15 +634,17 @@ class PDFMergerApp(QMainWindow):
         self.image_nav = NavButton("图片转PDF")  # 添加新的导航按钮
         self.image_nav.clicked.connect(lambda: self.switch_page(2))
         
-        nav_layout.addWidget(self.merge_nav)
-        nav_layout.addWidget(self.split_nav)
-        nav_layout.addWidget(self.image_nav)  # 添加到导航栏
+        self.queue_nav = NavButton("任务队列")
+        self.queue_nav.clicked.connect(lambda: self.switch_page(3))
+        
+        self.nav_buttons = [self.merge_nav, self.split_nav, self.image_nav, self.queue_nav]
+        for button in self.nav_buttons:
+            nav_layout.addWidget(button)
         nav_layout.addStretch()
         nav_widget.setLayout(nav_layout)
         
         # 创建堆叠窗口
-        self.stack = QStackedWidget()
-        self.stack.setStyleSheet("background-color: #F3F4F7;")
+        self.stack = styled(QStackedWidget(), "pages")
         
         # 创建PDF合并页面
         merge_page = QWidget()
@@ -615,20 +653,17 @@ class PDFMergerApp(QMainWindow):
         merge_layout.setSpacing(12)
         
         # 创建列表容器
-        list_container = QWidget()
-        list_container.setStyleSheet("""
-            QWidget {
-                background-color: white;
-                border: 1px solid #F3F4F7;
-                border-radius: 4px;
-            }
-        """)
+        list_container = styled(QWidget(), "listContainer")
         list_layout = QVBoxLayout(list_container)
         list_layout.setContentsMargins(4, 4, 4, 4)
         
         # 文件列表
-        self.file_list = DragDropListWidget(self)
-        self.file_list.setFixedHeight(300)  # 使用固定高度
+        self.file_list = DragDropListView(self)
+        self.file_list.setFixedHeight(FILE_LIST_HEIGHT)  # 使用固定高度
+        self.file_list.set_thumbnails(self.thumbnails)
+        self.file_model = self.file_list.model()
+        self.file_list.delegate.delete_requested.connect(self.file_model.remove_row)
+        self.file_model.rowsInserted.connect(self.probe_new_rows)
         
         # 添加文件按钮
         self.add_file_button = AddFileButton()
@@ -639,13 +674,7 @@ class PDFMergerApp(QMainWindow):
         merge_layout.addWidget(list_container)
         
         # 提示语放在列表下方
-        self.merge_label = QLabel("添加要合并的PDF文件，可拖拽调整文件合并顺序")
-        self.merge_label.setStyleSheet("""
-            QLabel {
-                color: #666666;
-                font-size: 13px;
-            }
-        """)
+        self.merge_label = styled(QLabel("添加要合并的PDF文件，可拖拽调整文件合并顺序"), "hint")
         merge_layout.addWidget(self.merge_label)
         
         # 底部按钮容器
@@ -653,8 +682,14 @@ class PDFMergerApp(QMainWindow):
         bottom_layout = QHBoxLayout(bottom_container)
         bottom_layout.setContentsMargins(20, 10, 20, 20)
         
-        # 按钮靠右放置
+        # 进度条在左，按钮靠右放置
+        self.merge_progress = ProgressPanel()
+        bottom_layout.addWidget(self.merge_progress, 1)
         bottom_layout.addStretch()
+        # 优化输出：共享重复的字体、图片并压缩，适合合并大量同一模板生成的文件
+        self.optimize_check = QCheckBox("优化文件大小")
+        self.optimize_check.setToolTip("合并同一模板生成的文件时，重复的字体和图片只保存一份")
+        bottom_layout.addWidget(self.optimize_check)
         self.merge_button = ActionButton("合并PDF")
         self.merge_button.clicked.connect(self.merge_pdfs)
         bottom_layout.addWidget(self.merge_button)
@@ -663,16 +698,11 @@ class PDFMergerApp(QMainWindow):
         
         merge_page.setLayout(merge_layout)
         
-        # 创建PDF拆分页面
-        self.split_page = PDFSplitWidget(self)
-        
-        # 创建图片转PDF页面
-        self.image_page = ImageToPDFWidget(self)
-        
-        # 将页面添加到堆叠窗口
+        # 将页面添加到堆叠窗口；提取和图片转PDF页面在第一次切换过去时才创建，先放占位控件
         self.stack.addWidget(merge_page)
-        self.stack.addWidget(self.split_page)
-        self.stack.addWidget(self.image_page)  # 添加新页面
+        self.page_factories = {1: PDFSplitWidget, 2: ImageToPDFWidget, 3: QueueWidget}
+        for _ in self.page_factories:
+            self.stack.addWidget(QWidget())
         
         # 组装主布局
         main_layout.addWidget(nav_widget)
@@ -682,102 +712,45 @@ class PDFMergerApp(QMainWindow):
         self.setCentralWidget(main_widget)
         
         # Toast信息标签
-        self.toast_label = QLabel("", self)
-        self.toast_label.setStyleSheet("""
-            QLabel {
-                background-color: rgba(240, 240, 240, 0.9);  /* 半透明灰色背景 */
-                color: #333333;  /* 深色文字 */
-                padding: 12px 24px;
-                border-radius: 6px;
-                font-size: 14px;
-            }
-        """)
+        self.toast_label = styled(QLabel("", self), "toast")
         self.toast_label.setAlignment(Qt.AlignCenter)
         self.toast_label.setVisible(False)
         self.toast_label.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
         self.toast_label.setAttribute(Qt.WA_TranslucentBackground)
         
-        # 存储PDF文件列表
-        self.pdf_files = []
+        # 窗口显示后继续上次未完成的任务
+        QTimer.singleShot(0, self.resume_queue)
+
+    def page(self, index):
+        """返回第 index 页，尚未创建时先创建并替换占位控件"""
+        factory = self.page_factories.pop(index, None)
+        if factory is not None:
+            placeholder = self.stack.widget(index)
+            self.stack.insertWidget(index, factory(self))
+            self.stack.removeWidget(placeholder)
+            placeholder.deleteLater()
+        return self.stack.widget(index)
 
     def switch_page(self, index):
-        self.stack.setCurrentIndex(index)
-        if index == 0:
-            self.merge_nav.setChecked(True)
-            self.split_nav.setChecked(False)
-            self.image_nav.setChecked(False)
-        elif index == 1:
-            self.merge_nav.setChecked(False)
-            self.split_nav.setChecked(True)
-            self.image_nav.setChecked(False)
-        else:
-            self.merge_nav.setChecked(False)
-            self.split_nav.setChecked(False)
-            self.image_nav.setChecked(True)
-
-    def add_file_with_delete(self, file_path):
-        item = QListWidgetItem()
-        widget = QWidget()
-        layout = QHBoxLayout(widget)
-        layout.setContentsMargins(12, 4, 12, 4)
-        
-        # 文件名标签
-        label = QLabel(os.path.basename(file_path))
-        label.setStyleSheet("""
-            QLabel {
-                color: #333333;
-                font-size: 13px;
-                border: none;  /* 移除边框 */
-                background: transparent;  /* 透明背景 */
-            }
-        """)
-        label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
-        
-        # 删除按钮
-        delete_btn = DeleteButton()
-        delete_btn.setFixedWidth(40)
-        delete_btn.clicked.connect(lambda: self.remove_file(item, file_path))
-        
-        layout.addWidget(label)
-        layout.addWidget(delete_btn)
-        
-        # 设置整个项目的样式
-        widget.setStyleSheet("""
-            QWidget {
-                background: transparent;  /* 透明背景 */
-                border: none;  /* 移除边框 */
-            }
-        """)
-        
-        widget.setFixedHeight(36)
-        item.setSizeHint(widget.sizeHint())
-        
-        self.file_list.addItem(item)
-        self.file_list.setItemWidget(item, widget)
-
-    def remove_file(self, item, file_path):
-        row = self.file_list.row(item)
-        self.file_list.takeItem(row)
-        if file_path in self.pdf_files:
-            self.pdf_files.remove(file_path)
-        self.file_list.updateEmptyState()  # 更新空状态
+        self.stack.setCurrentWidget(self.page(index))
+        for i, button in enumerate(self.nav_buttons):
+            button.setChecked(i == index)
 
     def handle_dropped_files(self, urls):
+        # 文件直接加入列表，文件夹在后台扫描，结果分批加入
+        new_files = []
+        folders = []
         for url in urls:
             if url.isLocalFile():
                 file_path = url.toLocalFile()
                 if os.path.isfile(file_path) and file_path.lower().endswith('.pdf'):
-                    if file_path not in self.pdf_files:
-                        self.pdf_files.append(file_path)
-                        self.add_file_with_delete(file_path)
+                    new_files.append(file_path)
                 elif os.path.isdir(file_path):
-                    for root, dirs, files in os.walk(file_path):
-                        for file in files:
-                            if file.lower().endswith('.pdf'):
-                                full_path = os.path.join(root, file)
-                                if full_path not in self.pdf_files:
-                                    self.pdf_files.append(full_path)
-                                    self.add_file_with_delete(full_path)
+                    folders.append(file_path)
+        self.file_model.add_paths(new_files)
+        if folders:
+            self.start_scan(self.merge_progress, self.merge_button, folders, PDF_EXTENSIONS,
+                            on_found=self.file_model.add_paths)
 
     def show_toast(self, message, duration=3000, fade_duration=200):
         self.toast_label.setText(message)
@@ -804,14 +777,17 @@ class PDFMergerApp(QMainWindow):
     def select_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, "选择PDF文件", "", "PDF文件 (*.pdf)")
         if files:
-            for file in files:
-                if file not in self.pdf_files:
-                    self.pdf_files.append(file)
-                    self.add_file_with_delete(file)  # 使用新的添加方法
+            self.file_model.add_paths(files)
             self.show_toast("文件已选择")
 
+    def probe_new_rows(self, parent, first, last):
+        """在后台读取新加入文件的页数，显示在列表中"""
+        job = ProbeJob([self.file_model.path(row) for row in range(first, last + 1)])
+        job.signals.found.connect(self.file_model.set_page_counts)
+        self.job_engine.start(job)
+
     def merge_pdfs(self):
-        if not self.pdf_files:
+        if self.file_model.rowCount() == 0:
             self.show_toast("未选择任何PDF文件", 3000)
             return
         
@@ -819,44 +795,221 @@ class PDFMergerApp(QMainWindow):
         if not output_file:
             return
         
-        # Merge the PDF files in the order they appear in the QListWidget
-        pdf_writer = PdfWriter()
+        # Merge the PDF files in the order they appear in the list
+        ordered_files = self.file_model.paths()
         
-        # 获取每个列表项的实际文件路径
-        for index in range(self.file_list.count()):
-            item = self.file_list.item(index)
-            widget = self.file_list.itemWidget(item)
-            file_name = widget.layout().itemAt(0).widget().text()  # 获取文件名标签的文本
-            file_path = next((f for f in self.pdf_files if os.path.basename(f) == file_name), None)
-            
-            if file_path:
-                try:
-                    pdf_reader = PdfReader(file_path)
-                    for page in pdf_reader.pages:
-                        pdf_writer.add_page(page)
-                except Exception as e:
-                    self.show_toast(f"处理文件 {file_name} 时出错")
-                    return
+        # 在后台线程中合并，界面保持响应；文件较多时再分给多个进程并行解析
+        workers = default_workers() if len(ordered_files) >= PARALLEL_MERGE_MIN_FILES else None
+        self.start_job(self.merge_progress, self.merge_button, "正在合并...",
+                       merge_pdf_files, ordered_files, output_file, workers=workers,
+                       optimize=self.optimize_check.isChecked(), on_finished=self.on_merge_finished)
+
+    def on_merge_finished(self, result):
+        if "saved_bytes" in result:
+            self.show_toast(f"合并完成！已优化，约节省 {format_size(result['saved_bytes'])}")
+        else:
+            self.show_toast(f"合并完成！文件保存至目标文件夹（峰值内存 {format_size(result['peak_rss'])}）")
         
-        try:
-            # Write the merged PDF to the output file
-            with open(output_file, 'wb') as out:
-                pdf_writer.write(out)
-            
-            self.show_toast("合并完成！文件保存至目标文件夹")
-            
-            # Clear the list and internal storage
-            self.file_list.clear()
-            self.pdf_files.clear()
-        except Exception as e:
-            self.show_toast("保存文件时出错")
+        # Clear the list
+        self.file_model.clear()
+
+    def start_job(self, panel, button, message, func, *args, on_finished=None, **kwargs):
+        """把 func 加入任务队列，进度显示在 panel 中，完成前禁用 button"""
+        if panel.is_busy():
+            self.show_toast("正在处理，请稍候")
+            return None
+        waiting = self.queue_runner.is_full(func.__name__ in INTERACTIVE_OPERATIONS)
+        job = self.queue_runner.enqueue(func, *args, **kwargs)
+        button.setEnabled(False)
+        panel.start(job, "已加入任务队列，等待中..." if waiting else message)
+        
+        job.signals.progress.connect(panel.update_progress)
+        if on_finished is not None:
+            job.signals.finished.connect(on_finished)
+        job.signals.failed.connect(self.show_toast)
+        job.signals.cancelled.connect(lambda: self.show_toast("已取消"))
+        job.signals.done.connect(panel.finish)
+        job.signals.done.connect(lambda: button.setEnabled(True))
+        return job
+
+    def start_watch(self, folder, rule):
+        """监视 folder，新文件写完后按 rule 分组加入任务队列"""
+        from watch_folder import FolderWatcher
+        if self.watch_engine is None:
+            self.watch_engine = JobEngine(self, 1)
+        job = WatchJob(FolderWatcher(folder, rule=rule))
+        job.signals.found.connect(self.enqueue_watch_groups)
+        job.signals.done.connect(lambda: setattr(self, "watch_job", None))
+        self.watch_job = job
+        return self.watch_engine.start(job)
+
+    def stop_watch(self):
+        if self.watch_job is not None:
+            self.watch_job.cancel()
+
+    def enqueue_watch_groups(self, groups):
+        for group in groups:
+            if group.kind == "pdf":
+                workers = default_workers() if len(group.files) >= PARALLEL_MERGE_MIN_FILES else None
+                self.queue_runner.enqueue(merge_pdf_files, group.files, group.output, workers=workers)
+            else:
+                workers = default_workers() if len(group.files) >= PARALLEL_CONVERT_MIN_FILES else None
+                self.queue_runner.enqueue(images_to_pdf, group.files, group.output, workers=workers)
+            self.show_toast(f"监视文件夹：{group.name} 的 {len(group.files)} 个文件已加入任务队列")
+
+    def resume_queue(self):
+        if self.queue_in_memory:
+            self.show_toast("无法打开任务队列，本次的任务不会保存到下次启动", 5000)
+            return
+        count = self.queue_runner.resume()
+        if count:
+            self.show_toast(f"继续执行上次未完成的 {count} 个任务")
+
+    def start_scan(self, panel, button, paths, extensions, on_found, max_results=None):
+        """在后台扫描文件夹，找到的文件分批交给 on_found，面板中显示已找到的数量"""
+        if panel.is_busy():
+            self.show_toast("正在处理，请稍候")
+            return None
+        job = ScanJob(paths, extensions, max_results)
+        button.setEnabled(False)
+        panel.start(job, "正在扫描...", busy=True)
+        
+        job.signals.found.connect(on_found)
+        job.signals.found.connect(lambda batch: panel.status_label.setText(f"已找到 {job.found_count} 个文件"))
+        job.signals.done.connect(panel.finish)
+        job.signals.done.connect(lambda: button.setEnabled(True))
+        return self.job_engine.start(job)
+
+    def closeEvent(self, event):
+        # 退出前停止并等待后台任务，避免留下写了一半的文件；队列中的任务下次启动时继续
+        self.queue_runner.shutdown()
+        self.job_engine.shutdown()
+        if self.watch_engine is not None:
+            self.watch_engine.shutdown()
+        self.thumbnails.shutdown()
+        super().closeEvent(event)
+
+class QueueWidget(QWidget):
+    """任务队列页面：显示排队、运行中和已结束的任务，可以取消、重试和删除"""
+    COLUMNS = ("任务", "状态", "进度", "说明")
+
+    # 监视文件夹的分组规则：显示名称 -> watch_folder 中的规则
+    WATCH_RULES = {"按到达时间分组": "time", "按文件名分组": "name"}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.main_window = parent
+        self.runner = parent.queue_runner
+        self.job_ids = []
+        self.setup_ui()
+        self.runner.changed.connect(self.refresh)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(12)
+        
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(styled(QLabel("任务按加入顺序执行，关闭程序时未完成的任务在下次启动后继续"), "hint"), 1)
+        # 监视文件夹：扫描仪放入的文件写完后自动分组合并或转换
+        self.watch_rule_combo = QComboBox()
+        self.watch_rule_combo.addItems(self.WATCH_RULES)
+        self.watch_rule_combo.setToolTip("按文件名分组时，文件名中第一个“_”之前相同的文件为一组")
+        top_layout.addWidget(self.watch_rule_combo)
+        self.watch_button = AddFileButton()
+        self.watch_button.clicked.connect(self.toggle_watch)
+        top_layout.addWidget(self.watch_button)
+        layout.addLayout(top_layout)
+        self.update_watch_button()
+        
+        self.table = styled(QTableWidget(0, len(self.COLUMNS)), "queueTable")
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for column in range(1, len(self.COLUMNS)):
+            header.setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        layout.addWidget(self.table, 1)
+        
+        bottom_layout = QHBoxLayout()
+        for text, action in (("取消", self.runner.cancel), ("重试", self.runner.retry),
+                             ("删除", self.runner.remove)):
+            button = AddFileButton()
+            button.setText(text)
+            button.clicked.connect(lambda _, action=action: self.apply(action))
+            bottom_layout.addWidget(button)
+        clear_button = AddFileButton()
+        clear_button.setText("清除已结束的任务")
+        clear_button.clicked.connect(self.runner.clear_finished)
+        bottom_layout.addWidget(clear_button)
+        bottom_layout.addStretch()
+        
+        bottom_layout.addWidget(styled(QLabel("同时运行"), "hint"))
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, MAX_CONCURRENCY)
+        self.concurrency_spin.setValue(self.runner.queue.concurrency)
+        self.concurrency_spin.valueChanged.connect(self.runner.set_concurrency)
+        bottom_layout.addWidget(self.concurrency_spin)
+        layout.addLayout(bottom_layout)
+
+    def toggle_watch(self):
+        if self.main_window.watch_job is not None:
+            self.main_window.stop_watch()
+            self.watch_button.setEnabled(False)
+            return
+        folder = QFileDialog.getExistingDirectory(self, "选择要监视的文件夹")
+        if not folder:
+            return
+        job = self.main_window.start_watch(folder, self.WATCH_RULES[self.watch_rule_combo.currentText()])
+        job.signals.done.connect(self.update_watch_button)
+        self.update_watch_button()
+        self.main_window.show_toast(f"正在监视 {os.path.basename(folder)}，结果保存在其中的“输出”文件夹")
+
+    def update_watch_button(self):
+        watching = self.main_window.watch_job is not None
+        self.watch_button.setText("停止监视" if watching else "监视文件夹...")
+        self.watch_button.setEnabled(True)
+        self.watch_rule_combo.setEnabled(not watching)
+
+    def apply(self, action):
+        """对选中的任务执行 action(任务编号)"""
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        for row in rows:
+            action(self.job_ids[row])
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        # 不可见时不更新，切换到本页时再读取
+        if not self.isVisible():
+            return
+        selected = {self.job_ids[index.row()] for index in self.table.selectionModel().selectedRows()}
+        jobs = self.runner.queue.jobs()
+        self.job_ids = [job["id"] for job in jobs]
+        self.table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            progress = f"{job['files_done']}/{job['file_count']}" if job["file_count"] else ""
+            values = (job["title"], STATUS_NAMES.get(job["status"], job["status"]), progress, job["message"])
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setToolTip(value)
+                self.table.setItem(row, column, item)
+        selection = self.table.selectionModel()
+        selection.clearSelection()
+        for row, job_id in enumerate(self.job_ids):
+            if job_id in selected:
+                selection.select(self.table.model().index(row, 0),
+                                 QItemSelectionModel.Select | QItemSelectionModel.Rows)
 
 class ImageToPDFWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.main_window = parent
         self.setup_ui()
-        self.image_files = []  # 存储图片文件路径
 
     def setup_ui(self):
         layout = QVBoxLayout()
@@ -864,20 +1017,16 @@ class ImageToPDFWidget(QWidget):
         layout.setSpacing(12)
         
         # 创建列表容器
-        list_container = QWidget()
-        list_container.setStyleSheet("""
-            QWidget {
-                background-color: white;
-                border: 1px solid #F3F4F7;
-                border-radius: 4px;
-            }
-        """)
+        list_container = styled(QWidget(), "listContainer")
         list_layout = QVBoxLayout(list_container)
         list_layout.setContentsMargins(4, 4, 4, 4)
         
         # 文件列表
-        self.file_list = DragDropListWidget(self)
-        self.file_list.setFixedHeight(300)  # 使用固定高度替代最小高度
+        self.file_list = DragDropListView(self)
+        self.file_list.setFixedHeight(FILE_LIST_HEIGHT)  # 使用固定高度替代最小高度
+        self.file_list.set_thumbnails(self.main_window.thumbnails)
+        self.file_model = self.file_list.model()
+        self.file_list.delegate.delete_requested.connect(self.file_model.remove_row)
         
         # 添加文件按钮
         self.add_file_button = AddFileButton()
@@ -888,13 +1037,7 @@ class ImageToPDFWidget(QWidget):
         layout.addWidget(list_container)
         
         # 提示语
-        self.label = QLabel("添加要转换的图片文件，支持jpg、png等格式，可拖拽调整顺序")
-        self.label.setStyleSheet("""
-            QLabel {
-                color: #666666;
-                font-size: 13px;
-            }
-        """)
+        self.label = styled(QLabel("添加要转换的图片文件，支持jpg、png等格式，可拖拽调整顺序"), "hint")
         layout.addWidget(self.label)
         
         # 添加纸张设置
@@ -902,60 +1045,22 @@ class ImageToPDFWidget(QWidget):
         paper_layout = QHBoxLayout(paper_container)
         paper_layout.setContentsMargins(0, 0, 0, 0)
         
-        paper_label = QLabel("纸张设置：")
-        paper_label.setStyleSheet("""
-            QLabel {
-                color: #333333;
-                font-size: 15px;
-            }
-        """)
+        paper_label = styled(QLabel("纸张设置："), "fieldLabel")
         
         self.paper_combo = QComboBox()
         self.paper_combo.addItems(["原图", "A4纸", "A3纸"])
-        self.paper_combo.setStyleSheet("""
-            QComboBox {
-                color: #333333;
-                background-color: white;
-                border: 1px solid #E0E0E0;
-                border-radius: 4px;
-                padding: 4px 12px;
-                font-size: 15px;
-                min-width: 120px;
-            }
-            QComboBox:hover {
-                border-color: #2B6DE8;
-            }
-            QComboBox::drop-down {
-                width: 20px;
-                border: none;
-                background: transparent;
-            }
-            QComboBox::down-arrow {
-                image: none;  /* 移除默认箭头图片 */
-                border-left: 5px solid transparent;
-                border-right: 5px solid transparent;
-                border-top: 5px solid #666666;
-                margin-right: 8px;
-            }
-            QComboBox QAbstractItemView {
-                border: 1px solid #E0E0E0;
-                border-radius: 4px;
-                background-color: white;
-                selection-background-color: #F0F7FF;
-                selection-color: #2B6DE8;
-            }
-            QComboBox QAbstractItemView::item {
-                height: 32px;
-                padding-left: 12px;
-                color: #333333;
-            }
-            QComboBox QAbstractItemView::item:hover {
-                background-color: #F5F5F5;
-            }
-        """)
+        
+        # 输出质量：缩小并重新压缩图片，减小文件体积
+        profile_label = styled(QLabel("输出质量："), "fieldLabel")
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItems(list(IMAGE_PROFILES))
+        self.profile_combo.setCurrentText(DEFAULT_IMAGE_PROFILE)
         
         paper_layout.addWidget(paper_label)
         paper_layout.addWidget(self.paper_combo)
+        paper_layout.addSpacing(16)
+        paper_layout.addWidget(profile_label)
+        paper_layout.addWidget(self.profile_combo)
         paper_layout.addStretch()
         
         layout.addWidget(paper_container)
@@ -965,7 +1070,9 @@ class ImageToPDFWidget(QWidget):
         bottom_layout = QHBoxLayout(bottom_container)
         bottom_layout.setContentsMargins(20, 10, 20, 20)
         
-        # 按钮靠右放置
+        # 进度条在左，按钮靠右放置
+        self.progress_panel = ProgressPanel()
+        bottom_layout.addWidget(self.progress_panel, 1)
         bottom_layout.addStretch()
         self.convert_button = ActionButton("转换为PDF")
         self.convert_button.clicked.connect(self.convert_to_pdf)
@@ -981,7 +1088,7 @@ class ImageToPDFWidget(QWidget):
                 btn.setChecked(False)
 
     def convert_to_pdf(self):
-        if not self.image_files:
+        if self.file_model.rowCount() == 0:
             self.main_window.show_toast("请先添加图片文件")
             return
         
@@ -994,71 +1101,54 @@ class ImageToPDFWidget(QWidget):
         if not output_file:
             return
             
-        try:
-            import img2pdf
-            ordered_files = self.get_ordered_files()
-            
-            # 获取选中的纸张类型
-            paper_type = self.paper_combo.currentText()
-            
-            # 根据纸张类型设置布局选项
-            if paper_type == "原图":
-                layout_fun = img2pdf.get_layout_fun(None)
-            else:
-                if paper_type == "A4纸":
-                    layout_fun = img2pdf.get_layout_fun((img2pdf.mm_to_pt(210), img2pdf.mm_to_pt(297)))
-                else:  # A3纸
-                    layout_fun = img2pdf.get_layout_fun((img2pdf.mm_to_pt(297), img2pdf.mm_to_pt(420)))
-            
-            with open(output_file, "wb") as f:
-                f.write(img2pdf.convert(
-                    ordered_files,
-                    layout_fun=layout_fun,
-                    rotation=img2pdf.Rotation.auto  # 自动检测并旋转图片
-                ))
-            
-            self.main_window.show_toast("转换完成！文件已保存至目标文件夹")
-            self.clear_files()
-            
-        except Exception as e:
-            self.main_window.show_toast("转换过程中出错，请检查图片文件")
+        ordered_files = self.get_ordered_files()
+        
+        # 获取选中的纸张类型
+        paper_type = self.paper_combo.currentText()
+        
+        # 在后台线程中转换，图片较多时再分给多个进程解码和重新编码
+        workers = default_workers() if len(ordered_files) >= PARALLEL_CONVERT_MIN_FILES else None
+        self.main_window.start_job(
+            self.progress_panel, self.convert_button, "正在转换...",
+            images_to_pdf, ordered_files, output_file, paper_type, workers=workers,
+            profile=self.profile_combo.currentText(), on_finished=self.on_convert_finished)
+
+    def on_convert_finished(self, output_file):
+        size = format_size(os.path.getsize(output_file))
+        self.main_window.show_toast(f"转换完成！文件已保存至目标文件夹（{size}）")
+        self.clear_files()
 
     def get_ordered_files(self):
         """获取列表中的文件顺序"""
-        ordered_files = []
-        for index in range(self.file_list.count()):
-            item = self.file_list.item(index)
-            widget = self.file_list.itemWidget(item)
-            file_name = widget.layout().itemAt(0).widget().text()
-            file_path = next((f for f in self.image_files if os.path.basename(f) == file_name), None)
-            if file_path:
-                ordered_files.append(file_path)
-        return ordered_files
+        return self.file_model.paths()
 
     def clear_files(self):
         """清空文件列表"""
-        self.file_list.clear()
-        self.image_files.clear()
-        self.file_list.updateEmptyState()
+        self.file_model.clear()
 
     def is_valid_image(self, file_path):
         """检查是否为支持的图片格式"""
-        return file_path.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))
+        return file_path.lower().endswith(IMAGE_EXTENSIONS)
 
     def handle_dropped_files(self, urls):
         """处理拖拽的文件"""
+        image_files = []
+        folders = []
         for url in urls:
             if url.isLocalFile():
                 file_path = url.toLocalFile()
                 if os.path.isfile(file_path):
                     if self.is_valid_image(file_path):
-                        if file_path not in self.image_files:
-                            self.image_files.append(file_path)
-                            self.add_file_with_delete(file_path)
-                        else:
-                            self.main_window.show_toast("已存在相同的文件")
+                        image_files.append(file_path)
                     else:
                         self.main_window.show_toast("不支持的文件格式")
+                elif os.path.isdir(file_path):
+                    folders.append(file_path)
+        self.add_image_files(image_files)
+        if folders:
+            self.main_window.start_scan(
+                self.progress_panel, self.convert_button, folders, IMAGE_EXTENSIONS,
+                on_found=self.file_model.add_paths)
 
     def select_files(self):
         """选择图片文件"""
@@ -1069,56 +1159,18 @@ class ImageToPDFWidget(QWidget):
             "图片文件 (*.jpg *.jpeg *.png *.bmp)"
         )
         if files:
-            for file in files:
-                if file not in self.image_files:
-                    self.image_files.append(file)
-                    self.add_file_with_delete(file)
-                else:
-                    self.main_window.show_toast("已存在相同的文件")
-
-    def add_file_with_delete(self, file_path):
-        """添加文件到列表，包含删除按钮"""
-        item = QListWidgetItem()
-        widget = QWidget()
-        layout = QHBoxLayout(widget)
-        layout.setContentsMargins(12, 4, 12, 4)
-        
-        # 文件名标签
-        label = QLabel(os.path.basename(file_path))
-        label.setStyleSheet("""
-            QLabel {
-                color: #333333;
-                font-size: 13px;
-                border: none;
-                background: transparent;
-            }
-        """)
-        label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
-        
-        # 删除按钮
-        delete_btn = DeleteButton()
-        delete_btn.setFixedWidth(40)
-        delete_btn.clicked.connect(lambda: self.remove_file(item, file_path))
-        
-        layout.addWidget(label)
-        layout.addWidget(delete_btn)
-        
-        widget.setStyleSheet("background: transparent; border: none;")
-        widget.setFixedHeight(36)
-        item.setSizeHint(widget.sizeHint())
-        
-        self.file_list.addItem(item)
-        self.file_list.setItemWidget(item, widget)
-
-    def remove_file(self, item, file_path):
-        """从列表中移除文件"""
-        row = self.file_list.row(item)
-        self.file_list.takeItem(row)
-        if file_path in self.image_files:
-            self.image_files.remove(file_path)
-        self.file_list.updateEmptyState()
+            self.add_image_files(files)
+
+    def add_image_files(self, files):
+        """批量添加图片文件，有重复文件时提示"""
+        if self.file_model.add_paths(files) < len(files):
+            self.main_window.show_toast("已存在相同的文件")
 
 def main():
+    if getattr(sys, 'frozen', False):
+        # 打包后的程序启动并行合并的子进程时需要；源码运行时不必在启动时导入 multiprocessing
+        import multiprocessing
+        multiprocessing.freeze_support()
     print("应用程序已启动")
     app = QApplication(sys.argv)
     window = PDFMergerApp()
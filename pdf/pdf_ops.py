@@ -0,0 +1,1250 @@
+"""PDF合并、提取和图片转PDF的核心操作（不依赖Qt，可在后台线程中运行）
+
+PyPDF2、img2pdf、写入器、索引和进程池都在用到时才导入，界面启动时只加载本模块的常量和函数。
+"""
+import errno
+import gc
+import os
+import re
+import shutil
+import sys
+import tempfile
+from collections import deque
+from io import BytesIO
+from itertools import islice
+from time import perf_counter
+
+from doc_cache import document_cache
+import instrument
+
+# 流式合并的默认内存上限（MB），可通过环境变量配置，未设置时不限制
+DEFAULT_MEMORY_LIMIT = int(os.environ.get("PDF_TOOLBOX_MEMORY_LIMIT_MB", "0")) * 1024 * 1024 or None
+# 超过该大小的流写出后立即移出读取器缓存
+LARGE_STREAM_SIZE = 256 * 1024
+# 增量合并时允许的空闲对象编号（超出“已用编号”部分）的下限，超过后完整合并一次
+INCREMENTAL_SLACK = 100000
+# 输出文件的写缓冲区大小，写入器逐个对象写出，大缓冲区减少系统调用
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+# 设置 PDF_TOOLBOX_FSYNC=1 时输出文件改名前先写入磁盘，断电后也不会得到空文件，但写出较慢
+FSYNC_OUTPUT = os.environ.get("PDF_TOOLBOX_FSYNC", "") not in ("", "0")
+# 指定 work_dir 的流式合并中，未完成的输出和每个输入写完后的记录在工作目录中的文件名
+PARTIAL_OUTPUT_NAME = "output.part"
+CHECKPOINT_SUFFIX = ".part.json"
+
+
+class OperationCancelled(Exception):
+    """操作被用户取消"""
+
+
+class OperationError(Exception):
+    """操作失败，消息可直接展示给用户"""
+
+
+def error_message(error):
+    """展示给用户的错误信息，附带引起错误的原始异常"""
+    if error.__cause__ is not None:
+        return f"{error}（{type(error.__cause__).__name__}: {error.__cause__}）"
+    return str(error)
+
+
+def _check_cancel(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise OperationCancelled()
+
+
+def _report(progress, file_index, file_count, page_index, page_count):
+    if progress is not None:
+        progress(file_index, file_count, page_index, page_count)
+
+
+def memory_usage():
+    """返回 (当前RSS, 峰值RSS)，单位字节；无法获取的项为 None"""
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return info.rss, getattr(info, 'peak_wset', None) or _peak_rss_from_os()
+    except ImportError:
+        pass
+    if sys.platform.startswith('linux'):
+        values = {}
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    values[key] = int(value.split()[0]) * 1024
+        return values.get('VmRSS'), values.get('VmHWM')
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                    "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                    "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize, counters.PeakWorkingSetSize
+        return None, None
+    # macOS 等系统只能拿到峰值
+    peak = _peak_rss_from_os()
+    return peak, peak
+
+
+def _peak_rss_from_os():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def format_size(num_bytes):
+    """把字节数格式化为便于阅读的字符串"""
+    if num_bytes is None:
+        return "未知"
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+def check_free_space(path, needed):
+    """path 所在磁盘的可用空间少于 needed 字节时抛出 OperationError"""
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        free = shutil.disk_usage(directory).free
+    except OSError:
+        return
+    if free < needed:
+        raise OperationError(f"磁盘空间不足：预计需要 {format_size(needed)}，可用 {format_size(free)}")
+
+
+def _total_size(paths):
+    """输入文件的总大小，读取不到的文件按 0 计算，由后续的读取报告错误"""
+    total = 0
+    for path in paths:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
+
+
+def _pages_size(pdf_file, page_count):
+    """按页数比例估算从 pdf_file 中取出 page_count 页的输出大小"""
+    try:
+        return _total_size([pdf_file]) * page_count // max(count_pages(pdf_file), 1)
+    except Exception:
+        return 0
+
+
+def _output_mode():
+    """新建文件的默认权限；mkstemp 创建的临时文件只有所有者可读写"""
+    if sys.platform == 'win32':
+        return None
+    mask = os.umask(0)
+    os.umask(mask)
+    return 0o666 & ~mask
+
+
+_OUTPUT_MODE = _output_mode()
+
+
+def _write_output(output_file, write, partial_file=None):
+    """调用 write(file) 写出结果并返回其返回值
+
+    先写入目标文件夹中的临时文件，成功后改名为 output_file，中途失败、取消或程序崩溃
+    都不会留下不完整的 output_file，已存在的同名文件在成功之前保持不变。
+    FSYNC_OUTPUT 为 True 时改名前先把数据写入磁盘。可用空间由调用方在开始前用
+    check_free_space() 按预计的输出大小检查，写入时磁盘写满同样报告空间不足。
+    partial_file 不为 None 时改用这个文件（须与 output_file 在同一文件系统中）代替临时文件，
+    以读写方式打开，已有的内容由 write 决定是否沿用；失败时保留它，以便之后继续写入。
+    """
+    document_cache.invalidate(output_file)
+    directory = os.path.dirname(os.path.abspath(output_file))
+    # 覆盖已有文件时保留它的权限
+    try:
+        mode = os.stat(output_file).st_mode & 0o7777
+    except OSError:
+        mode = _OUTPUT_MODE
+    if partial_file is None:
+        fd, temp_file = tempfile.mkstemp(prefix=".pdf-toolbox-", suffix=".tmp", dir=directory)
+    else:
+        fd, temp_file = os.open(partial_file, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o600), partial_file
+    try:
+        with os.fdopen(fd, 'r+b' if partial_file else 'wb', buffering=OUTPUT_BUFFER_SIZE) as out:
+            result = write(out)
+            out.flush()
+            if FSYNC_OUTPUT:
+                os.fsync(out.fileno())
+        if mode is not None:
+            os.chmod(temp_file, mode)
+        os.replace(temp_file, output_file)
+        if FSYNC_OUTPUT and hasattr(os, 'O_DIRECTORY'):
+            # 改名记录在文件夹中，同样写入磁盘
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    except BaseException as e:
+        if partial_file is None:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+        if isinstance(e, OSError) and e.errno == errno.ENOSPC:
+            raise OperationError("磁盘空间不足，文件未保存") from e
+        raise
+    return result
+
+
+PDF_EXTENSIONS = ('.pdf',)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def iter_files(paths, extensions, cancel_event=None, sort=True):
+    """展开文件和文件夹，逐个返回扩展名匹配的文件路径
+
+    文件夹用 os.scandir 逐层遍历，边遍历边返回结果；sort 为 True 时同一文件夹内按名称排序。
+    通过符号链接形成的目录环只会遍历一次，无权限访问的目录会被跳过。
+    """
+    visited = set()
+    for path in paths:
+        _check_cancel(cancel_event)
+        if not os.path.isdir(path):
+            if path.lower().endswith(extensions):
+                yield path
+            continue
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            try:
+                info = os.stat(directory)
+                key = (info.st_dev, info.st_ino)
+                if key in visited:
+                    continue
+                visited.add(key)
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name) if sort else it
+                    subdirs = []
+                    for entry in entries:
+                        _check_cancel(cancel_event)
+                        try:
+                            if entry.is_dir():
+                                subdirs.append(entry.path)
+                            elif entry.name.lower().endswith(extensions):
+                                yield entry.path
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            # 倒序入栈，保证按名称顺序深度优先遍历
+            stack.extend(reversed(subdirs))
+
+
+def parse_page_ranges(input_text, max_pages):
+    """解析页码输入（如 "1,3,5-9"），返回排序后的页码列表，格式错误或超出范围时返回 None"""
+    try:
+        # 替换中文逗号为英文逗号
+        input_text = input_text.replace('，', ',')
+        pages = set()
+        parts = input_text.replace(' ', '').split(',')
+        
+        for part in parts:
+            if '-' in part:
+                start, end = map(int, part.split('-'))
+                if start < 1 or end > max_pages or start > end:
+                    raise ValueError
+                pages.update(range(start, end + 1))
+            else:
+                page = int(part)
+                if page < 1 or page > max_pages:
+                    raise ValueError
+                pages.add(page)
+        
+        return sorted(list(pages))
+    except ValueError:
+        return None
+
+
+def format_page_ranges(pages):
+    """parse_page_ranges 的逆操作：把页码列表写成 "1,3,5-9" 的形式"""
+    parts = []
+    pages = sorted(set(pages))
+    start = 0
+    for i in range(1, len(pages) + 1):
+        if i == len(pages) or pages[i] != pages[i - 1] + 1:
+            first, last = pages[start], pages[i - 1]
+            parts.append(str(first) if first == last else f"{first}-{last}")
+            start = i
+    return ",".join(parts)
+
+
+def extract_output_name(pdf_file, pages):
+    """提取结果的默认文件名：原文件名_提取_起止页.pdf，保存在原文件夹"""
+    base_name = os.path.splitext(pdf_file)[0]
+    page_desc = f"{pages[0]}-{pages[-1]}" if len(pages) > 1 else str(pages[0])
+    return f"{base_name}_提取_{page_desc}.pdf"
+
+
+def count_pages(pdf_file):
+    """读取PDF页数，只读取交叉引用和页面树根节点"""
+    return document_cache.probe(pdf_file)["pages"]
+
+
+def merge_pdf_files(file_list, output_file, progress=None, cancel_event=None,
+                    streaming=True, memory_limit=None, workers=None, optimize=False, incremental=False,
+                    work_dir=None):
+    """按 file_list 的顺序合并PDF文件
+
+    progress(file_index, file_count, page_index, page_count) 在每页处理后回调，
+    cancel_event 为 threading.Event，被置位时抛出 OperationCancelled。
+    streaming 为 True 时逐个文件流式写出，内存占用与输入总大小无关；
+    memory_limit（字节）为内存上限，超过时丢弃读取器的对象缓存，默认取 DEFAULT_MEMORY_LIMIT。
+    workers 大于 1 时在多个进程中并行解析输入，再按 file_list 的顺序拼接。
+    optimize 为 True 时共享内容相同的对象、压缩未压缩的流并写出对象流，
+    需要跨文件比较内容，因此总是在单进程中流式合并。
+    incremental 为 True 时在输出旁保存合并记录（见 merge_manifest），下次合并到同一输出时
+    内容未变的输入直接复制上次输出中对应的部分，只重新解析改动过的文件；优化模式和
+    streaming 为 False 时不支持。
+    work_dir 不为 None 时未完成的输出（并行合并时为每个输入的片段）保存在该文件夹中，
+    每写完一个输入记录一次，中断后用同样的参数再次调用，已完成的文件不再解析；
+    成功后删除该文件夹。work_dir 应位于输出文件夹中，优化模式不支持。
+    返回包含 output_file、pages 和 peak_rss 的字典，优化模式下另含 saved_bytes 和 shared_objects，
+    增量合并时另含 reused 和 rebuilt（重用和重新解析的文件数）。
+    """
+    from stream_writer import SegmentOverflow
+    if memory_limit is None:
+        memory_limit = DEFAULT_MEMORY_LIMIT
+    parallel = streaming and not optimize and workers and workers > 1 and len(file_list) > 1
+    # 输出大小约为输入之和；并行合并时片段文件同时占用同样多的空间
+    check_free_space(output_file, _total_size(file_list) * (2 if parallel else 1))
+    if optimize:
+        return _merge_streaming(file_list, output_file, progress, cancel_event, memory_limit, optimize=True)
+    record = incremental and streaming
+    manifest = None
+    if record:
+        from merge_manifest import load_manifest
+        manifest = load_manifest(output_file)
+        if manifest is not None:
+            result = _merge_incremental(file_list, output_file, progress, cancel_event, manifest)
+            if result is not None:
+                return result
+    result = None
+    if parallel:
+        try:
+            result = _merge_parallel(file_list, output_file, progress, cancel_event, workers, record, work_dir)
+        except SegmentOverflow:
+            # 个别损坏文件的对象数超过了交叉引用表声明的数量，退回单进程合并
+            pass
+    if streaming:
+        if result is None:
+            result = _merge_streaming(file_list, output_file, progress, cancel_event, memory_limit, record=record,
+                                      work_dir=work_dir)
+        if record:
+            _save_manifest(file_list, output_file, result.pop("segments"), manifest)
+            result.update(reused=0, rebuilt=len(file_list))
+        return result
+
+    from PyPDF2 import PdfReader, PdfWriter
+    pdf_writer = PdfWriter()
+    file_count = len(file_list)
+
+    for file_index, file_path in enumerate(file_list):
+        _check_cancel(cancel_event)
+        try:
+            with instrument.stage("parse", bytes_read=os.path.getsize(file_path)):
+                pdf_reader = PdfReader(file_path)
+                page_count = len(pdf_reader.pages)
+            with instrument.stage("copy_pages", pages=page_count):
+                for page_index, page in enumerate(pdf_reader.pages):
+                    _check_cancel(cancel_event)
+                    pdf_writer.add_page(page)
+                    _report(progress, file_index, file_count, page_index + 1, page_count)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            raise OperationError(f"处理文件 {os.path.basename(file_path)} 时出错") from e
+
+    _check_cancel(cancel_event)
+    try:
+        with instrument.stage("write") as writing:
+            _write_output(output_file, pdf_writer.write)
+            writing.add(bytes_written=os.path.getsize(output_file))
+    except OperationError:
+        raise
+    except Exception as e:
+        raise OperationError("保存文件时出错") from e
+    return {"output_file": output_file, "pages": len(pdf_writer.pages),
+            "peak_rss": memory_usage()[1]}
+
+
+def _merge_streaming(file_list, output_file, progress, cancel_event, memory_limit, optimize=False,
+                     record=False, work_dir=None):
+    from stream_writer import StreamingPdfWriter
+    file_count = len(file_list)
+    segments = []
+    partial_file = None
+    if work_dir is not None:
+        os.makedirs(work_dir, exist_ok=True)
+        partial_file = os.path.join(work_dir, PARTIAL_OUTPUT_NAME)
+
+    def write(out):
+        writer = StreamingPdfWriter(out, optimize=optimize)
+        if partial_file is not None:
+            # 沿用上次中断前已写完的文件，之后的内容截掉重写
+            segments.extend(_load_stream_checkpoints(work_dir, file_list, os.fstat(out.fileno()).st_size))
+            if segments:
+                out.seek(segments[-1]["start"] + segments[-1]["length"])
+                writer.restore(segments)
+                _report(progress, len(segments) - 1, file_count, 1, 1)
+            out.truncate()
+        for file_index in range(len(segments), file_count):
+            file_path = file_list[file_index]
+            _check_cancel(cancel_event)
+            mark = writer.mark()
+            try:
+                start = perf_counter()
+                with document_cache.reader(file_path) as reader:
+                    # 页面中的对象在复制时才按需解析，这部分耗时计入 copy_pages
+                    instrument.record("parse", perf_counter() - start, bytes_read=os.path.getsize(file_path))
+                    checked = len(reader.resolved_objects)
+
+                    def after_page():
+                        nonlocal checked
+                        checked = _trim_reader_cache(reader, memory_limit, checked)
+
+                    with instrument.stage("copy_pages") as copying:
+                        pages_before = len(writer.page_refs)
+                        writer.append_pages(
+                            reader,
+                            progress=lambda page_index, page_count: _report(
+                                progress, file_index, file_count, page_index, page_count),
+                            cancel_check=lambda: _check_cancel(cancel_event),
+                            after_page=after_page)
+                        copying.add(pages=len(writer.page_refs) - pages_before)
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                raise OperationError(f"处理文件 {os.path.basename(file_path)} 时出错") from e
+            if record or partial_file is not None:
+                segments.append(writer.segment_since(mark))
+            if partial_file is not None:
+                _save_stream_checkpoint(work_dir, file_index, file_path, segments[-1], out)
+            # 读取器已归还缓存，超出缓存预算的部分在归还时释放
+            del reader
+            gc.collect()
+        _check_cancel(cancel_event)
+        with instrument.stage("write") as writing:
+            writer.close()
+            writing.add(bytes_written=writer.offset)
+        if optimize:
+            # 压缩发生在复制页面的过程中，耗时同时包含在 copy_pages 内
+            instrument.record("compress", writer.compress_seconds, saved_bytes=writer.saved_bytes)
+        return writer
+
+    try:
+        writer = _write_output(output_file, write, partial_file)
+    except (OperationCancelled, OperationError):
+        raise
+    except Exception as e:
+        raise OperationError("保存文件时出错") from e
+    if work_dir is not None:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    result = {"output_file": output_file, "pages": len(writer.page_refs),
+              "peak_rss": memory_usage()[1]}
+    if optimize:
+        result["saved_bytes"] = writer.saved_bytes
+        result["shared_objects"] = writer.shared_objects
+    if record:
+        result["segments"] = segments
+    return result
+
+
+def _load_stream_checkpoints(work_dir, file_list, partial_size):
+    """读取 _save_stream_checkpoint 保存的记录，返回从第一个文件起连续已完成的片段
+
+    输入文件改动过、记录缺失或超出未完成输出的长度时，从该文件起重新合并。
+    """
+    import json
+    segments = []
+    for index, file_path in enumerate(file_list):
+        try:
+            with open(os.path.join(work_dir, f"{index}{CHECKPOINT_SUFFIX}"), encoding='utf-8') as f:
+                info = json.load(f)
+            stat = os.stat(file_path)
+            if [info["path"], info["size"], info["mtime_ns"]] != \
+                    [os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns]:
+                break
+            segment = info["segment"]
+            if segment["start"] + segment["length"] > partial_size:
+                break
+        except (OSError, ValueError, KeyError, TypeError):
+            break
+        segments.append(segment)
+    return segments
+
+
+def _save_stream_checkpoint(work_dir, file_index, file_path, segment, out):
+    """一个输入写完后，先把未完成的输出写入磁盘，再记录它对应的片段"""
+    import json
+    out.flush()
+    if FSYNC_OUTPUT:
+        os.fsync(out.fileno())
+    stat = os.stat(file_path)
+    info = {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "segment": segment}
+    checkpoint = os.path.join(work_dir, f"{file_index}{CHECKPOINT_SUFFIX}")
+    with open(checkpoint + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(info, f, separators=(",", ":"))
+    os.replace(checkpoint + ".tmp", checkpoint)
+
+
+def _save_manifest(file_list, output_file, segments, previous=None):
+    """保存增量合并的记录；内容摘要沿用上次记录中未改动文件的结果"""
+    from merge_manifest import input_digests, save_manifest
+    with instrument.stage("scan"):
+        digests = input_digests(file_list, previous)
+    save_manifest(output_file, file_list, digests, segments)
+
+
+def _free_range(used, size):
+    """在已占用的对象编号范围 used（按起点排序）之间找出能容纳 size 个编号的第一个空隙"""
+    from stream_writer import CATALOG
+    position = CATALOG + 1
+    for start, stop in used:
+        if start - position >= size:
+            return position
+        position = max(position, stop)
+    return position
+
+
+def _merge_incremental(file_list, output_file, progress, cancel_event, manifest):
+    """按合并记录重用上次输出中内容未变的输入，只重新解析其余文件；无法重用时返回 None
+
+    重用的部分保持原来的对象编号，原样复制；重新解析的文件写成片段，编号放在未占用的
+    范围内（通常就是它自己上次的范围）。空闲编号过多时返回 None，完整合并一次。
+    """
+    from merge_manifest import input_digests, save_manifest
+    from stream_writer import StreamingPdfWriter, SegmentOverflow
+    file_count = len(file_list)
+    with instrument.stage("scan") as scanning:
+        digests = input_digests(file_list, manifest)
+        scanning.add(files=file_count)
+
+    # 上次的每个片段只能用一次，同一文件在列表中出现两次时第二次重新解析
+    available = {}
+    for entry in manifest["inputs"]:
+        available.setdefault(entry["digest"], []).append(entry)
+    plan = [available[digest].pop(0) if available.get(digest) else None for _, _, digest in digests]
+    reused = [entry for entry in plan if entry is not None]
+    if not reused:
+        return None
+    try:
+        with open(output_file, 'rb') as old:
+            for entry in reused:
+                # 片段开头应是它的第一个对象，对不上说明记录与输出不符
+                first = entry["first"] + entry["offsets"].index(0)
+                old.seek(entry["start"])
+                if not old.read(32).startswith(b"%d 0 obj" % first):
+                    return None
+    except (OSError, ValueError):
+        return None
+
+    used = sorted((entry["first"], entry["first"] + len(entry["offsets"])) for entry in reused)
+    bases = {}
+    with instrument.stage("parse"):
+        for index, entry in enumerate(plan):
+            if entry is not None:
+                continue
+            try:
+                size = _xref_size(file_list[index])
+            except Exception as e:
+                raise OperationError(f"处理文件 {os.path.basename(file_list[index])} 时出错") from e
+            base = _free_range(used, size)
+            bases[index] = (base, size)
+            used.append((base, base + size))
+            used.sort()
+    if used[-1][1] > 2 * sum(stop - start for start, stop in used) + INCREMENTAL_SLACK:
+        return None
+
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    with tempfile.TemporaryDirectory(prefix=".pdf-toolbox-", dir=output_dir) as segment_dir:
+        built = {}
+        for index, (base, size) in bases.items():
+            _check_cancel(cancel_event)
+            file_path = file_list[index]
+            segment_file = os.path.join(segment_dir, f"{index}.seg")
+            with instrument.stage("copy_pages", bytes_read=os.path.getsize(file_path)) as copying:
+                try:
+                    built[index] = _build_segment(file_path, base, base + size, segment_file)
+                except SegmentOverflow:
+                    return None
+                except Exception as e:
+                    raise OperationError(f"处理文件 {os.path.basename(file_path)} 时出错") from e
+                copying.add(pages=len(built[index][1]))
+        segments = []
+
+        def write(out):
+            writer = StreamingPdfWriter(out)
+            # 在 write 内打开并关闭旧输出，改名替换时旧文件已经关闭
+            with open(output_file, 'rb') as old:
+                for file_index, entry in enumerate(plan):
+                    _check_cancel(cancel_event)
+                    mark = writer.mark()
+                    if entry is not None:
+                        base, offsets, page_refs = entry["first"], entry["offsets"], entry["pages"]
+                        with instrument.stage("copy_pages", pages=len(page_refs)):
+                            writer.append_segment(old, base, offsets, page_refs, entry["start"], entry["length"])
+                    else:
+                        base = bases[file_index][0]
+                        offsets, page_refs = built[file_index]
+                        writer.append_segment(os.path.join(segment_dir, f"{file_index}.seg"), base, offsets, page_refs)
+                    segments.append(writer.segment_since(mark, base, base + len(offsets)))
+                    _report(progress, file_index, file_count, 1, 1)
+            _check_cancel(cancel_event)
+            with instrument.stage("write") as writing:
+                writer.close()
+                writing.add(bytes_written=writer.offset)
+            return writer
+
+        try:
+            writer = _write_output(output_file, write)
+        except (OperationCancelled, OperationError):
+            raise
+        except Exception as e:
+            raise OperationError("保存文件时出错") from e
+    save_manifest(output_file, file_list, digests, segments)
+    trace = instrument.current_job()
+    if trace is not None:
+        trace.add(reused=len(reused), rebuilt=len(bases))
+    return {"output_file": output_file, "pages": len(writer.page_refs), "peak_rss": memory_usage()[1],
+            "reused": len(reused), "rebuilt": len(bases)}
+
+
+def default_workers():
+    """并行合并默认使用的进程数"""
+    return max(1, min(os.cpu_count() or 1, 16))
+
+
+def _xref_size(file_path):
+    """读取文件尾中的 /Size（对象编号上限），只读取文件末尾的少量数据"""
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(0, end - 2048))
+        tail = f.read()
+        trailer = tail.rfind(b'trailer')
+        if trailer >= 0:
+            match = re.search(rb'/Size\s+(\d+)', tail[trailer:])
+        else:
+            # 交叉引用流：/Size 在 startxref 指向的流对象字典中
+            match = None
+            startxref = re.findall(rb'startxref\s+(\d+)', tail)
+            if startxref:
+                f.seek(int(startxref[-1]))
+                match = re.search(rb'/Size\s+(\d+)', f.read(4096))
+        if match:
+            return int(match.group(1))
+        from PyPDF2 import PdfReader
+        f.seek(0)
+        return int(PdfReader(f).trailer['/Size'])
+
+
+def _build_segment(file_path, segment_base, segment_limit, segment_file):
+    """在子进程中解析一个输入文件，把它的页面写成片段文件"""
+    from PyPDF2 import PdfReader
+    from pdf_index import map_file
+    from stream_writer import StreamingPdfWriter
+    with map_file(file_path) as f, open(segment_file, 'wb', buffering=OUTPUT_BUFFER_SIZE) as out:
+        writer = StreamingPdfWriter(out, segment_base, segment_limit)
+        reader = PdfReader(f)
+        checked = 0
+
+        def after_page():
+            nonlocal checked
+            checked = _trim_reader_cache(reader, None, checked)
+
+        writer.append_pages(reader, after_page=after_page)
+    return writer.offsets, writer.page_refs
+
+
+def _load_checkpoint(segment_file, file_path, base, limit):
+    """读取 _save_checkpoint 保存的片段信息；输入文件或编号范围已改变时返回 None"""
+    import json
+    try:
+        with open(segment_file + ".json", encoding='utf-8') as f:
+            info = json.load(f)
+        stat = os.stat(file_path)
+        if [info["path"], info["size"], info["mtime_ns"], info["base"], info["limit"]] != \
+                [os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, base, limit]:
+            return None
+        if not os.path.exists(segment_file):
+            return None
+        return info["offsets"], info["page_refs"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _save_checkpoint(segment_file, file_path, base, limit, future):
+    """片段写完后记录它的信息，片段文件和记录都在时才算这个文件已完成"""
+    import json
+    if future.cancelled() or future.exception() is not None:
+        return
+    offsets, page_refs = future.result()
+    stat = os.stat(file_path)
+    info = {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "base": base, "limit": limit, "offsets": list(offsets), "page_refs": list(page_refs)}
+    with open(segment_file + ".json.tmp", 'w', encoding='utf-8') as f:
+        json.dump(info, f)
+    os.replace(segment_file + ".json.tmp", segment_file + ".json")
+
+
+def _merge_parallel(file_list, output_file, progress, cancel_event, workers, record=False, work_dir=None):
+    from concurrent.futures import Future, ProcessPoolExecutor, wait
+    from contextlib import nullcontext
+    from functools import partial
+    from stream_writer import StreamingPdfWriter, SegmentOverflow, CATALOG
+    file_count = len(file_list)
+
+    # 按每个输入声明的对象数量预留互不重叠的编号范围，子进程直接写出最终编号
+    ranges = []
+    base = CATALOG + 1
+    with instrument.stage("parse"):
+        for file_path in file_list:
+            try:
+                size = _xref_size(file_path)
+            except Exception as e:
+                raise OperationError(f"处理文件 {os.path.basename(file_path)} 时出错") from e
+            ranges.append((base, base + size))
+            base += size
+
+    if work_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(output_file))
+        segment_context = tempfile.TemporaryDirectory(prefix=".pdf-toolbox-", dir=output_dir)
+    else:
+        os.makedirs(work_dir, exist_ok=True)
+        segment_context = nullcontext(work_dir)
+    with segment_context as segment_dir, \
+            ProcessPoolExecutor(max_workers=min(workers or 1, file_count)) as pool:
+        futures = []
+        for index, (file_path, (start, limit)) in enumerate(zip(file_list, ranges)):
+            segment_file = os.path.join(segment_dir, f"{index}.seg")
+            done = _load_checkpoint(segment_file, file_path, start, limit) if work_dir else None
+            if done is not None:
+                # 上次中断前已完成的文件
+                future = Future()
+                future.set_result(done)
+            else:
+                future = pool.submit(_build_segment, file_path, start, limit, segment_file)
+                if work_dir:
+                    future.add_done_callback(partial(_save_checkpoint, segment_file, file_path, start, limit))
+            futures.append(future)
+
+        segments = []
+
+        def write(out):
+            writer = StreamingPdfWriter(out)
+            # 按原顺序等待各片段，先完成的片段在磁盘上等待拼接
+            for file_index, future in enumerate(futures):
+                file_path = file_list[file_index]
+                # 解析和复制页面在子进程中进行，这里记录的是等待子进程的时间
+                with instrument.stage("parse", bytes_read=os.path.getsize(file_path)):
+                    while not wait([future], timeout=0.1).done:
+                        _check_cancel(cancel_event)
+                    _check_cancel(cancel_event)
+                    try:
+                        offsets, page_refs = future.result()
+                    except SegmentOverflow:
+                        raise
+                    except Exception as e:
+                        raise OperationError(f"处理文件 {os.path.basename(file_path)} 时出错") from e
+                segment_file = os.path.join(segment_dir, f"{file_index}.seg")
+                base = ranges[file_index][0]
+                mark = writer.mark()
+                with instrument.stage("copy_pages", pages=len(page_refs)):
+                    writer.append_segment(segment_file, base, offsets, page_refs)
+                if record:
+                    segments.append(writer.segment_since(mark, base, base + len(offsets)))
+                if work_dir is None:
+                    os.remove(segment_file)
+                _report(progress, file_index, file_count, 1, 1)
+            with instrument.stage("write") as writing:
+                writer.close()
+                writing.add(bytes_written=writer.offset)
+            return writer
+
+        try:
+            writer = _write_output(output_file, write)
+        except (OperationCancelled, OperationError, SegmentOverflow):
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        except Exception as e:
+            raise OperationError("保存文件时出错") from e
+    if work_dir is not None:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    result = {"output_file": output_file, "pages": len(writer.page_refs),
+              "peak_rss": memory_usage()[1]}
+    if record:
+        result["segments"] = segments
+    return result
+
+
+def _trim_reader_cache(reader, memory_limit, checked=0):
+    """每页写完后调用，返回下次调用时的 checked
+
+    已写出的对象不会再被访问：上一页之后新解析的大型流（多为图片）立即移出读取器缓存，
+    不在 Python 堆中累积；内存超过上限时再丢弃全部已解析的对象和其他缓存的文档。
+    """
+    cache = reader.resolved_objects
+    # 缓存按解析顺序排列，只检查末尾新增的部分
+    new_keys = [key for key, obj in islice(reversed(cache.items()), max(len(cache) - checked, 0))
+                if len(getattr(obj, "_data", b"")) >= LARGE_STREAM_SIZE]
+    for key in new_keys:
+        del cache[key]
+    if memory_limit and cache:
+        current = memory_usage()[0]
+        if current is not None and current > memory_limit:
+            cache.clear()
+            document_cache.clear()
+            gc.collect()
+    return len(cache)
+
+
+def extract_pages(pdf_file, pages, output_file, progress=None, cancel_event=None):
+    """从 pdf_file 中提取 pages（从1开始的页码列表）保存到 output_file
+
+    通过交叉引用按需读取：只读取页面树中通往所选页面的节点和这些页面引用的对象，
+    耗时与所选页数有关，与文档大小无关。索引无法处理的文件（加密、交叉引用损坏）
+    退回完整解析。
+    """
+    from PyPDF2 import PdfWriter
+    from PyPDF2.errors import PdfReadError
+    from pdf_index import map_file
+    check_free_space(output_file, _pages_size(pdf_file, len(pages)))
+    try:
+        # 输出先写入临时文件再改名，覆盖原文件时也不会读到写了一半的数据
+        with map_file(pdf_file) as f:
+            with instrument.stage("parse"):
+                index = _open_index(f)
+                selected = _index_pages(index, pages)
+            if selected is not None:
+                try:
+                    _write_pages(output_file, selected, cancel_event,
+                                 lambda page_index, count: _report(progress, 0, 1, page_index, count), index)
+                    return output_file
+                except PdfReadError:
+                    # 索引按严格模式读取对象，格式不规范（如流长度错误）时交给 PdfReader 容错解析
+                    pass
+
+        pdf_writer = PdfWriter()
+        # 同一文件多次提取时复用缓存中已解析的读取器
+        start = perf_counter()
+        with document_cache.reader(pdf_file) as pdf_reader:
+            instrument.record("parse", perf_counter() - start, bytes_read=os.path.getsize(pdf_file))
+            # 添加选定的页面
+            with instrument.stage("copy_pages", pages=len(pages)):
+                for index, page_num in enumerate(pages):
+                    _check_cancel(cancel_event)
+                    pdf_writer.add_page(pdf_reader.pages[page_num - 1])
+                    _report(progress, 0, 1, index + 1, len(pages))
+
+        _check_cancel(cancel_event)
+        with instrument.stage("write") as writing:
+            _write_output(output_file, pdf_writer.write)
+            writing.add(bytes_written=os.path.getsize(output_file))
+    except (OperationCancelled, OperationError):
+        raise
+    except Exception as e:
+        raise OperationError("提取PDF时出错") from e
+    return output_file
+
+
+def _open_index(stream):
+    """打开 PdfIndex，加密或无法解析时返回 None，由调用方退回 PdfReader"""
+    from pdf_index import PdfIndex
+    try:
+        index = PdfIndex(stream)
+    except Exception:
+        return None
+    return None if "/Encrypt" in index.trailer else index
+
+
+def _index_pages(index, pages):
+    """用 PdfIndex 定位 pages 中的页面，无法定位时返回 None"""
+    if index is None:
+        return None
+    try:
+        return [index.page(page_num - 1) for page_num in pages]
+    except Exception:
+        return None
+
+
+def _write_pages(output_file, pages, cancel_event=None, progress=None, index=None):
+    """把页面对象流式写成一个新文件；index 为页面来源的 PdfIndex，每页写完后释放其中的大型流"""
+    from stream_writer import StreamingPdfWriter
+
+    def write(out):
+        writer = StreamingPdfWriter(out)
+        with instrument.stage("copy_pages", pages=len(pages)):
+            writer.append_pages(None, pages, progress=progress, cancel_check=lambda: _check_cancel(cancel_event),
+                                after_page=None if index is None else lambda: index.release_streams(LARGE_STREAM_SIZE))
+        _check_cancel(cancel_event)
+        with instrument.stage("write") as writing:
+            writer.close()
+            writing.add(bytes_written=writer.offset)
+
+    _write_output(output_file, write)
+
+
+def parse_range_groups(input_text, max_pages):
+    """解析用分号分隔的多组页码（如 "1-3;4-9;10,12"），每组对应一个输出文件，格式错误时返回 None"""
+    parts = [part for part in input_text.replace('；', ';').split(';') if part.strip()]
+    groups = [parse_page_ranges(part, max_pages) for part in parts]
+    if not groups or None in groups:
+        return None
+    return groups
+
+
+def every_n_pages(max_pages, n):
+    """每 n 页为一组，最后一组可能不足 n 页"""
+    if n < 1:
+        raise OperationError("每个文件的页数必须大于0")
+    return [list(range(start, min(start + n, max_pages + 1))) for start in range(1, max_pages + 1, n)]
+
+
+def bookmark_groups(pdf_file):
+    """按顶层书签拆分，返回 (书签标题列表, 页码列表的列表)
+
+    每组从书签所在页到下一个书签的前一页，第一个书签之前的页面（如封面）归入第一组。
+    """
+    try:
+        with document_cache.reader(pdf_file) as reader:
+            page_count = len(reader.pages)
+            starts = {}
+            for item in reader.outline:
+                if isinstance(item, list):  # 子书签
+                    continue
+                try:
+                    page = reader.get_destination_page_number(item)
+                except Exception:
+                    continue
+                if page is not None and page >= 0:
+                    starts.setdefault(page + 1, str(item.title))
+    except Exception as e:
+        raise OperationError("读取书签时出错") from e
+    if not starts:
+        raise OperationError("PDF文件中没有可用于拆分的书签")
+    pages = sorted(starts)
+    titles = [starts[page] for page in pages]
+    pages[0] = 1
+    bounds = pages[1:] + [page_count + 1]
+    return titles, [list(range(start, end)) for start, end in zip(pages, bounds)]
+
+
+def _safe_filename(text):
+    name = re.sub(r'[\\/:*?"<>|\s]+', '_', text).strip('_.')
+    return name[:60] or "未命名"
+
+
+def split_output_names(pdf_file, groups, titles=None, output_dir=None):
+    """拆分结果的文件名：有书签标题时为 原文件名_序号_标题.pdf，否则为 原文件名_提取_起止页.pdf
+
+    默认保存在原文件夹，重名时追加序号。
+    """
+    directory = output_dir or os.path.dirname(os.path.abspath(pdf_file))
+    base_name = os.path.splitext(os.path.basename(pdf_file))[0]
+    names = []
+    used = set()
+    for index, pages in enumerate(groups, 1):
+        if titles:
+            name = f"{base_name}_{index:03d}_{_safe_filename(titles[index - 1])}"
+        else:
+            name = os.path.splitext(os.path.basename(extract_output_name(pdf_file, pages)))[0]
+        if name in used:
+            name = f"{name}_{index}"
+        used.add(name)
+        names.append(os.path.join(directory, name + ".pdf"))
+    return names
+
+
+# 拆分时每个子进程一次处理的输出文件数上限
+SPLIT_CHUNK_OUTPUTS = 50
+# 拆分过程中索引缓存的对象数超过该值时清空，大文件拆分的内存不随已写出的页数增长
+SPLIT_CACHE_OBJECTS = 20000
+
+
+def split_pdf_file(pdf_file, groups, output_files, progress=None, cancel_event=None, workers=None):
+    """把 pdf_file 按 groups（每组为从1开始的页码列表）拆分为多个文件 output_files
+
+    源文件只打开一次，每组通过交叉引用只读取所需的对象；workers 大于 1 时把各组
+    分成若干批在多个进程中并行写出，每个进程各自打开一次源文件。
+    progress 在每个文件写完后回调，返回包含 outputs 和 pages 的字典。
+    """
+    if not groups:
+        raise OperationError("没有要拆分的页面")
+    check_free_space(output_files[0], _pages_size(pdf_file, sum(len(pages) for pages in groups)))
+    jobs = list(zip(groups, output_files))
+    try:
+        if workers and workers > 1 and len(jobs) > 1:
+            _split_parallel(pdf_file, jobs, progress, cancel_event, workers)
+        else:
+            _split_chunk(pdf_file, jobs, cancel_event,
+                         done=lambda index: _report(progress, index, len(jobs), 1, 1))
+    except (OperationCancelled, OperationError):
+        raise
+    except Exception as e:
+        raise OperationError("拆分PDF时出错") from e
+    return {"outputs": len(jobs), "pages": sum(len(pages) for pages in groups)}
+
+
+def split_by_bookmarks(pdf_file, output_dir=None, progress=None, cancel_event=None, workers=None):
+    """按顶层书签拆分，每个书签一个文件，文件名中带书签标题"""
+    titles, groups = bookmark_groups(pdf_file)
+    return split_pdf_file(pdf_file, groups, split_output_names(pdf_file, groups, titles, output_dir),
+                          progress, cancel_event, workers)
+
+
+def _split_chunk(pdf_file, jobs, cancel_event=None, done=None):
+    """打开一次 pdf_file，依次写出 jobs 中的每个 (页码列表, 输出文件)"""
+    from PyPDF2 import PdfReader
+    from PyPDF2.errors import PdfReadError
+    from pdf_index import map_file
+    with map_file(pdf_file) as f:
+        with instrument.stage("parse", bytes_read=os.path.getsize(pdf_file)):
+            index = _open_index(f)
+        reader = None
+        for job_index, (pages, output_file) in enumerate(jobs):
+            _check_cancel(cancel_event)
+            with instrument.stage("parse"):
+                selected = _index_pages(index, pages)
+            if selected is not None:
+                try:
+                    _write_pages(output_file, selected, cancel_event, index=index)
+                except PdfReadError:
+                    # 格式不规范的文件改用 PdfReader 容错解析，之后的各组也不再使用索引
+                    index = selected = None
+            if selected is None:
+                if reader is None:
+                    f.seek(0)
+                    with instrument.stage("parse"):
+                        reader = PdfReader(f)
+                _write_pages(output_file, [reader.pages[page_num - 1] for page_num in pages], cancel_event)
+            if index is not None and len(index.objects) > SPLIT_CACHE_OBJECTS:
+                index.clear_cache()
+            if done is not None:
+                done(job_index)
+
+
+def _split_parallel(pdf_file, jobs, progress, cancel_event, workers):
+    from concurrent.futures import ProcessPoolExecutor, wait
+    # 分成比进程数多的批次，页数不均时各进程的负载也大致相同
+    chunk_size = max(1, min(SPLIT_CHUNK_OUTPUTS, -(-len(jobs) // (workers * 4))))
+    chunks = [jobs[start:start + chunk_size] for start in range(0, len(jobs), chunk_size)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        futures = [pool.submit(_split_chunk, pdf_file, chunk) for chunk in chunks]
+        written = 0
+        try:
+            for chunk, future in zip(chunks, futures):
+                # 各阶段在子进程中进行，这里只记录等待各批完成的时间和页数
+                with instrument.stage("copy_pages", pages=sum(len(pages) for pages, _ in chunk)):
+                    while not wait([future], timeout=0.1).done:
+                        _check_cancel(cancel_event)
+                    future.result()
+                written += len(chunk)
+                _report(progress, written - 1, len(jobs), 1, 1)
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+# 纸张尺寸（毫米），“原图”的页面大小由图片的像素数和DPI决定
+PAPER_SIZES_MM = {
+    "A4纸": (210, 297),
+    "A3纸": (297, 420),
+}
+
+# 图片输出方案：(目标DPI, JPEG质量)，None 表示原样嵌入图片数据
+IMAGE_PROFILES = {
+    "原图（无损）": None,
+    "打印 300 DPI": (300, 85),
+    "屏幕 150 DPI": (150, 75),
+}
+DEFAULT_IMAGE_PROFILE = "原图（无损）"
+
+# 图片未记录DPI时按此值计算尺寸，与 img2pdf 一致
+DEFAULT_IMAGE_DPI = 96
+
+
+def get_paper_layout(paper_type):
+    """根据纸张类型返回 img2pdf 的布局函数"""
+    import img2pdf
+    size = PAPER_SIZES_MM.get(paper_type)
+    if size is None:
+        return img2pdf.get_layout_fun(None)  # 原图
+    return img2pdf.get_layout_fun(tuple(img2pdf.mm_to_pt(mm) for mm in size))
+
+
+def _flatten_alpha(image):
+    """把透明背景合成到白色上，JPEG 和 PDF 图片都不支持透明通道"""
+    from PIL import Image
+    background = Image.new("RGB", image.size, "white")
+    background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+    return background
+
+
+def _recompress_image(data, paper_type, profile):
+    """按输出方案把图片缩小到目标DPI并重新压缩，返回新的图片数据
+
+    缩放和颜色转换由 Pillow 在C代码中整块完成。只有黑白两色的扫描件用 CCITT G4 压缩，
+    其余用 JPEG；已经不超过目标DPI的 JPEG 原样返回，避免再次有损压缩。
+    JBIG2 需要额外的编码器，这里不使用。
+    """
+    settings = IMAGE_PROFILES[profile]
+    if settings is None:
+        return data
+    target_dpi, quality = settings
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(data)) as original:
+        source_format = original.format
+        dpi = original.info.get("dpi") or (DEFAULT_IMAGE_DPI, DEFAULT_IMAGE_DPI)
+        image_dpi = float(dpi[0]) or DEFAULT_IMAGE_DPI
+        # 按 EXIF 方向转正，重新编码后 img2pdf 无法再读取原来的方向信息
+        image = ImageOps.exif_transpose(original)
+        width, height = image.size
+
+        paper = PAPER_SIZES_MM.get(paper_type)
+        if paper is None:
+            scale = target_dpi / image_dpi
+        else:
+            # img2pdf 把图片等比缩放到页面内，按显示宽度计算需要的像素数
+            page_width, page_height = (mm / 25.4 for mm in paper)
+            shown_width = min(page_width, page_height * width / height)
+            scale = shown_width * target_dpi / width
+        if scale >= 1 and source_format == "JPEG":
+            return data
+        scale = min(scale, 1.0)
+        new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        # 保持页面的物理尺寸不变
+        new_dpi = image_dpi * new_size[0] / width
+
+        if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+            image = _flatten_alpha(image)
+        bilevel = image.mode == "1" or (image.mode in ("L", "P", "RGB")
+                                        and _is_black_and_white(image))
+        output = BytesIO()
+        if bilevel:
+            image = image.convert("L")
+            if new_size != image.size:
+                image = image.resize(new_size, Image.LANCZOS)
+            image = image.convert("1", dither=Image.NONE)
+            # PDF 只能直接嵌入单个条带的 G4 数据，条带大小设为整张图
+            strip_size = (image.size[0] + 7) // 8 * image.size[1]
+            image.save(output, "TIFF", compression="group4", strip_size=strip_size, dpi=(new_dpi, new_dpi))
+        else:
+            if image.mode not in ("L", "RGB", "CMYK"):
+                image = image.convert("RGB")
+            if new_size != image.size:
+                image = image.resize(new_size, Image.LANCZOS)
+            image.save(output, "JPEG", quality=quality, dpi=(new_dpi, new_dpi))
+    # 少数图片（如本来就压缩得很好的黑白PNG）重新压缩后反而更大，保留原图
+    return output.getvalue() if output.tell() < len(data) else data
+
+
+def _is_black_and_white(image):
+    colors = image.convert("L").getcolors(2)  # 超过两种颜色时返回 None，不会统计整张图
+    return colors is not None and all(value in (0, 255) for _, value in colors)
+
+
+def _convert_image(file_path, paper_type, profile=DEFAULT_IMAGE_PROFILE):
+    """把一张图片转换为只含这张图片的PDF（字节串）；读取图片头、计算DPI和旋转、
+    必要时缩小并重新编码像素数据都在这里完成，可在子进程中运行"""
+    import img2pdf
+    with open(file_path, 'rb') as f:
+        data = _recompress_image(f.read(), paper_type, profile)
+    return img2pdf.convert(
+        data,
+        layout_fun=get_paper_layout(paper_type),
+        rotation=img2pdf.Rotation.auto  # 自动检测并旋转图片
+    )
+
+
+def _iter_converted_images(image_files, paper_type, profile, cancel_event, workers):
+    """按原顺序产生每张图片转换后的PDF
+
+    workers 大于 1 时在进程池中转换，最多提前转换 2 × workers 张，内存占用不随图片数量增长。
+    """
+    if not workers or workers <= 1 or len(image_files) <= 1:
+        for file_path in image_files:
+            _check_cancel(cancel_event)
+            yield _convert_image(file_path, paper_type, profile)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, wait
+    remaining = iter(image_files)
+    with ProcessPoolExecutor(max_workers=min(workers, len(image_files))) as pool:
+        pending = deque(pool.submit(_convert_image, file_path, paper_type, profile)
+                        for file_path in islice(remaining, 2 * workers))
+        while pending:
+            future = pending.popleft()
+            while not wait([future], timeout=0.1).done:
+                _check_cancel(cancel_event)
+            _check_cancel(cancel_event)
+            next_file = next(remaining, None)
+            if next_file is not None:
+                pending.append(pool.submit(_convert_image, next_file, paper_type, profile))
+            yield future.result()
+
+
+def images_to_pdf(image_files, output_file, paper_type="原图", progress=None, cancel_event=None,
+                  workers=None, profile=DEFAULT_IMAGE_PROFILE):
+    """将图片按顺序转换为一个PDF文件
+
+    每张图片单独用 img2pdf 转成页面后立即写入输出文件，内存中只有少量图片的数据，
+    与图片数量无关。workers 大于 1 时在多个进程中并行转换，仍按原顺序写出。
+    profile 为 IMAGE_PROFILES 中的输出方案。progress 在每张图片写完后回调。
+    """
+    if profile not in IMAGE_PROFILES:
+        raise OperationError(f"未知的输出方案: {profile}")
+    if not image_files:
+        raise OperationError("未选择任何图片")
+    # 原样嵌入时输出与图片大小相当，缩小的方案只会更小
+    check_free_space(output_file, _total_size(image_files))
+    from PyPDF2 import PdfReader
+    from stream_writer import StreamingPdfWriter
+    try:
+        file_count = len(image_files)
+
+        def write(out):
+            writer = StreamingPdfWriter(out)
+            converted = _iter_converted_images(image_files, paper_type, profile, cancel_event, workers)
+            # 并行转换时 compress 记录的是等待转换结果的时间
+            for file_index, page_bytes in enumerate(instrument.iterate("compress", converted)):
+                # 多帧图片（如 TIFF）会生成多页，一并写出
+                with instrument.stage("copy_pages") as copying:
+                    pages_before = len(writer.page_refs)
+                    writer.append_pages(PdfReader(BytesIO(page_bytes)))
+                    copying.add(pages=len(writer.page_refs) - pages_before,
+                                bytes_read=os.path.getsize(image_files[file_index]))
+                del page_bytes
+                _report(progress, file_index, file_count, 1, 1)
+            _check_cancel(cancel_event)
+            with instrument.stage("write") as writing:
+                writer.close()
+                writing.add(bytes_written=writer.offset)
+
+        _write_output(output_file, write)
+    except (OperationCancelled, OperationError):
+        raise
+    except Exception as e:
+        raise OperationError("转换过程中出错，请检查图片文件") from e
+    return output_file
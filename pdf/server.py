@@ -0,0 +1,384 @@
+"""本机 HTTP 服务：供其他程序通过网络调用合并、提取和图片转PDF，只依赖标准库
+
+    python pdf/cli.py serve --port 8765 -j 4
+
+接口（请求和返回的 JSON 均为 UTF-8）：
+
+    POST /uploads            请求体为文件内容，Content-Type 为 application/pdf、image/jpeg、
+                             image/png 或 image/bmp（或用 ?name=文件名 指定扩展名），返回 {"id": ...}
+    DELETE /uploads/<id>     删除上传的文件；未删除的文件 UPLOAD_TTL 秒后自动删除
+    POST /merge              {"inputs": [上传编号或路径, ...], "optimize": false}
+    POST /extract            {"input": 上传编号或路径, "pages": "1,3,5-9"}
+    POST /img2pdf            {"inputs": [...], "paper": "a4", "profile": "screen"}
+    GET /health              运行中和等待中的任务数
+
+任务参数与 batch 清单中的任务相同（见 cli.run_job）。/extract 和 /img2pdf 的请求体也可以直接是
+一个文件，参数放在查询字符串中（如 POST /extract?pages=1-3）。成功时直接返回生成的PDF，
+失败时返回 {"error": 原因}。只有用 --allow-path 允许的文件夹中的路径可以直接使用。
+
+请求体边读边写入磁盘，结果边读边发送，客户端读得慢时暂停发送（背压）。任务在进程池中执行，
+同时执行的任务数为进程数，等待的任务超过 max_queue 或连接数超过 max_connections 时返回 503，
+上传超过 max_upload 字节时返回 413。每个连接只处理一个请求。
+"""
+import asyncio
+import json
+import os
+import re
+import secrets
+import shutil
+import signal
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, quote, urlsplit
+
+from pdf_ops import OperationError, check_free_space, default_workers, error_message
+import instrument
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_UPLOAD = 512 * 1024 * 1024
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_MAX_CONNECTIONS = 64
+# JSON 请求体的大小上限
+MAX_JSON_BODY = 1024 * 1024
+# 读写请求体和结果的块大小
+CHUNK_SIZE = 256 * 1024
+# 读取请求头和每块请求体的超时（秒），防止连接长时间占用
+HEADER_TIMEOUT = 30
+BODY_TIMEOUT = 60
+# 上传的文件保留时间（秒）
+UPLOAD_TTL = 3600
+CLEANUP_INTERVAL = 60
+
+UPLOAD_TYPES = {
+    "application/pdf": ".pdf",
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/bmp": ".bmp",
+}
+UPLOAD_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".bmp")
+UPLOAD_ID = re.compile(r"^[0-9a-f]{32}\.(pdf|jpg|jpeg|png|bmp)$")
+# 各操作接受的参数：上传编号或路径所在的键，其余参数
+COMMANDS = {
+    "merge": ("inputs", ("optimize",)),
+    "extract": ("input", ("pages",)),
+    "img2pdf": ("inputs", ("paper", "profile")),
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers")
+
+    def __init__(self, method, path, query, headers):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+
+
+def _init_worker():
+    # Ctrl+C 由主进程处理，子进程随进程池退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _run_job(job):
+    """在子进程中执行一个任务"""
+    from cli import run_job
+    try:
+        with instrument.job(job["command"], source="server"):
+            return run_job(job)
+    except OperationError as e:
+        # 异常链不能传回主进程，原因并入信息中
+        raise OperationError(error_message(e)) from None
+
+
+class PdfService:
+    """处理 HTTP 请求，任务交给进程池执行"""
+
+    def __init__(self, spool_dir, workers=None, max_upload=DEFAULT_MAX_UPLOAD, max_queue=DEFAULT_MAX_QUEUE,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, allowed_paths=()):
+        self.upload_dir = os.path.join(spool_dir, "uploads")
+        self.output_dir = os.path.join(spool_dir, "outputs")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.workers = workers or default_workers()
+        self.max_upload = max_upload
+        self.max_queue = max_queue
+        self.max_connections = max_connections
+        self.allowed_paths = [os.path.realpath(path) for path in allowed_paths]
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+        self.slots = None
+        self.running = 0
+        self.waiting = 0
+        self.connections = 0
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        self.slots = asyncio.Semaphore(self.workers)
+        server = await asyncio.start_server(self.handle, host, port)
+        cleanup = asyncio.create_task(self._cleanup_uploads())
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            cleanup.cancel()
+            self.pool.shutdown(wait=True, cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            if self.connections > self.max_connections:
+                raise HttpError(503, "连接数过多，请稍后重试", {"Retry-After": "1"})
+            request = await self._read_head(reader)
+            await self._route(request, reader, writer)
+        except HttpError as e:
+            await self._send_json(writer, e.status, {"error": str(e)}, e.headers)
+        except OperationError as e:
+            await self._send_json(writer, 400, {"error": error_message(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            await self._send_json(writer, 500, {"error": f"处理时出错: {type(e).__name__}: {e}"})
+        finally:
+            self.connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_head(self, reader):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HttpError(408, "读取请求超时")
+        except asyncio.LimitOverrunError:
+            raise HttpError(431, "请求头过大")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "无法解析的请求")
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        url = urlsplit(target)
+        return Request(method.upper(), url.path, dict(parse_qsl(url.query)), headers)
+
+    async def _route(self, request, reader, writer):
+        parts = [part for part in request.path.split("/") if part]
+        if request.method == "GET" and parts == ["health"]:
+            await self._send_json(writer, 200, {"status": "ok", "workers": self.workers,
+                                                "running": self.running, "waiting": self.waiting})
+        elif request.method == "POST" and parts == ["uploads"]:
+            path = await self._receive_upload(request, reader, writer)
+            await self._send_json(writer, 201, {"id": os.path.basename(path), "size": os.path.getsize(path)})
+        elif request.method == "DELETE" and len(parts) == 2 and parts[0] == "uploads":
+            try:
+                os.remove(self._upload_path(parts[1]))
+            except FileNotFoundError:
+                raise HttpError(404, "没有这个上传的文件")
+            await self._send_json(writer, 200, {"deleted": parts[1]})
+        elif request.method == "POST" and len(parts) == 1 and parts[0] in COMMANDS:
+            await self._run_command(parts[0], request, reader, writer)
+        else:
+            raise HttpError(404, "没有这个接口")
+
+    async def _run_command(self, command, request, reader, writer):
+        input_key, option_keys = COMMANDS[command]
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        upload = None
+        if content_type == "application/json":
+            try:
+                params = json.loads(await self._read_body(request, reader, writer, MAX_JSON_BODY))
+            except ValueError:
+                raise HttpError(400, "请求体不是有效的 JSON")
+            if not isinstance(params, dict):
+                raise HttpError(400, "请求体应为 JSON 对象")
+        else:
+            # 请求体直接是一个文件，参数在查询字符串中
+            upload = await self._receive_upload(request, reader, writer)
+            params = dict(request.query, **{input_key: upload if input_key == "input" else [upload]})
+        output = os.path.join(self.output_dir, secrets.token_hex(16) + ".pdf")
+        try:
+            job = {"command": command, "output": output}
+            for key in option_keys:
+                if key in params:
+                    job[key] = params[key]
+            if input_key == "input":
+                job["input"] = self._resolve(params.get("input"))
+            else:
+                inputs = params.get("inputs")
+                if not isinstance(inputs, list) or not inputs:
+                    raise HttpError(400, "inputs 应为非空的列表")
+                job["inputs"] = [self._resolve(value) for value in inputs]
+            message = await self._submit(job)
+            await self._send_file(writer, output, f"{command}.pdf", message)
+        finally:
+            for path in (output, upload):
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+
+    async def _submit(self, job):
+        """等待空闲的进程后执行任务；等待的任务过多时拒绝"""
+        if self.waiting >= self.max_queue:
+            raise HttpError(503, "服务繁忙，请稍后重试", {"Retry-After": "5"})
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, _run_job, job)
+        except OperationError as e:
+            # 进程池把子进程的调用栈作为异常原因，不展示给客户端
+            raise HttpError(400, str(e))
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            raise HttpError(400, f"任务参数错误: {type(e).__name__}: {e}")
+        finally:
+            self.running -= 1
+            self.slots.release()
+
+    def _resolve(self, value):
+        """上传编号或允许访问的路径 -> 文件路径"""
+        if not isinstance(value, str) or not value:
+            raise HttpError(400, "缺少输入文件")
+        if UPLOAD_ID.match(value):
+            path = self._upload_path(value)
+            if not os.path.exists(path):
+                raise HttpError(404, f"上传的文件不存在或已过期: {value}")
+            return path
+        if os.path.isabs(value) and os.path.dirname(value) == self.upload_dir:
+            return value  # 请求体中直接上传的文件
+        real = os.path.realpath(value)
+        if not any(real == root or real.startswith(root + os.sep) for root in self.allowed_paths):
+            raise HttpError(403, f"不允许访问的路径: {value}")
+        return real
+
+    def _upload_path(self, upload_id):
+        if not UPLOAD_ID.match(upload_id):
+            raise HttpError(404, "没有这个上传的文件")
+        return os.path.join(self.upload_dir, upload_id)
+
+    async def _receive_upload(self, request, reader, writer):
+        """把请求体写入上传文件夹，返回文件路径"""
+        extension = os.path.splitext(request.query.get("name", ""))[1].lower()
+        if extension not in UPLOAD_EXTENSIONS:
+            content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+            extension = UPLOAD_TYPES.get(content_type)
+        if extension is None:
+            raise HttpError(415, "不支持的文件类型，请使用PDF或 jpg、png、bmp 图片")
+        length = self._content_length(request, self.max_upload)
+        try:
+            check_free_space(os.path.join(self.upload_dir, "upload"), length)
+        except OperationError as e:
+            raise HttpError(507, str(e))
+        path = os.path.join(self.upload_dir, secrets.token_hex(16) + extension)
+        try:
+            with open(path, "wb") as f:
+                async for chunk in self._iter_body(request, reader, writer, length):
+                    f.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    async def _read_body(self, request, reader, writer, limit):
+        length = self._content_length(request, limit)
+        return b"".join([chunk async for chunk in self._iter_body(request, reader, writer, length)])
+
+    def _content_length(self, request, limit):
+        if "chunked" in request.headers.get("transfer-encoding", "").lower():
+            raise HttpError(411, "请提供 Content-Length")
+        try:
+            length = int(request.headers["content-length"])
+        except (KeyError, ValueError):
+            raise HttpError(411, "请提供 Content-Length")
+        if length > limit:
+            raise HttpError(413, f"请求体超过上限 {limit} 字节")
+        return length
+
+    async def _iter_body(self, request, reader, writer, length):
+        """按块读取请求体；一块写入磁盘后才读取下一块，客户端发送得快时由 TCP 流量控制限速"""
+        if request.headers.get("expect", "").lower() == "100-continue":
+            # 检查过大小后才让客户端开始发送
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        remaining = length
+        while remaining:
+            try:
+                chunk = await asyncio.wait_for(reader.read(min(CHUNK_SIZE, remaining)), BODY_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise HttpError(408, "读取请求体超时")
+            if not chunk:
+                raise HttpError(400, "请求体不完整")
+            remaining -= len(chunk)
+            yield chunk
+
+    def _write_head(self, writer, status, headers):
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        lines += [f"{name}: {value}" for name, value in dict(headers, Connection="close").items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("utf-8"))
+
+    async def _send_json(self, writer, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        try:
+            self._write_head(writer, status, dict(headers or {}, **{
+                "Content-Type": "application/json; charset=utf-8", "Content-Length": str(len(body))}))
+            writer.write(body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _send_file(self, writer, path, filename, message):
+        """发送生成的PDF；每块写出后等待发送缓冲区排空，内存占用与文件大小无关"""
+        self._write_head(writer, 200, {
+            "Content-Type": "application/pdf",
+            "Content-Length": str(os.path.getsize(path)),
+            "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+            "X-Result": quote(message or ""),
+        })
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+
+    async def _cleanup_uploads(self):
+        while True:
+            await asyncio.sleep(CLEANUP_INTERVAL)
+            expired = time.time() - UPLOAD_TTL
+            with os.scandir(self.upload_dir) as it:
+                for entry in it:
+                    try:
+                        if entry.stat().st_mtime < expired:
+                            os.remove(entry.path)
+                    except OSError:
+                        continue
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, spool_dir=None, ready=None, **options):
+    """运行服务直到按下 Ctrl+C；spool_dir 为上传和结果的临时文件夹，默认在退出时删除"""
+    temporary = spool_dir is None
+    if temporary:
+        spool_dir = tempfile.mkdtemp(prefix="pdf-toolbox-server-")
+    service = PdfService(spool_dir, **options)
+    try:
+        asyncio.run(service.serve(host, port, ready))
+    finally:
+        if temporary:
+            shutil.rmtree(spool_dir, ignore_errors=True)
@@ -0,0 +1,467 @@
+"""流式PDF写入器：逐页把页面及其引用的对象直接写入输出文件，不在内存中保留整个文档"""
+import hashlib
+import time
+import zlib
+from io import BytesIO
+from array import array
+
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+# 页面字典中不复制的键：父节点由写入器重新指定，结构树和文章线索不随页面复制
+EXCLUDED_PAGE_KEYS = ("/Parent", "/StructParents", "/B")
+
+PAGES_ROOT = 1
+CATALOG = 2
+XREF_CHUNK = 10000
+COPY_CHUNK = 1024 * 1024
+
+# 优化模式：每个对象流最多容纳的对象数和数据量
+OBJSTM_MAX_OBJECTS = 100
+OBJSTM_MAX_BYTES = 256 * 1024
+# 小于该长度的未压缩流不值得压缩
+MIN_COMPRESS_LENGTH = 64
+# offsets 中压缩对象记为 -(对象流编号 << OBJSTM_INDEX_BITS | 序号) - 1
+OBJSTM_INDEX_BITS = 16
+
+
+class SegmentOverflow(Exception):
+    """片段中的对象数量超出了预留的编号范围"""
+
+
+class StreamingPdfWriter:
+    """将页面增量写入二进制文件对象 stream
+
+    对象编号 1 和 2 预留给页面树根和文档目录，在 close() 时写出。
+    每个源文档的对象编号映射只在 append_pages() 期间保存，写完即释放。
+
+    segment_base 不为 None 时写出的是“片段”：没有文件头和文件尾，对象编号从
+    segment_base 开始且小于 segment_limit，偏移相对片段开头，由 append_segment()
+    拼接到最终文件中。这样多个进程可以并行生成各自的片段。
+    非优化模式下每次 append_pages() 写出的内容本身也是一个片段，对象编号连续、
+    只引用页面树根，可以从输出文件中原样复制到下一次合并的结果里。
+
+    optimize 为 True 时：内容相同的流（连同引用它的字体、图片等对象）只写一份；
+    未压缩的流用 Flate 压缩；非流对象打包进对象流，最后写出交叉引用流。
+    节省的字节数（估算）记在 saved_bytes，共享的对象数记在 shared_objects，
+    压缩（不含交叉引用流）累计的耗时记在 compress_seconds。
+    """
+
+    def __init__(self, stream, segment_base=None, segment_limit=None, optimize=False):
+        if optimize and segment_base is not None:
+            raise ValueError("片段不支持优化模式")
+        self.stream = stream
+        self.offset = 0
+        self.page_refs = array('q')
+        self.segment_limit = segment_limit
+        self.optimize = optimize
+        self.saved_bytes = 0
+        self.shared_objects = 0
+        self.compress_seconds = 0.0
+        self._shared = {}  # 内容摘要 -> 已写出的对象编号
+        self._digests = {}  # 当前源文档中对象的摘要，append_pages() 结束后清空
+        self._skipped = set()  # 当前源文档中因共享而不必写出的对象
+        self._objstm = []  # 等待打包进对象流的 (编号, 内容)
+        self._objstm_size = 0
+        if segment_base is None:
+            self.base = 0
+            self.offsets = array('q', [0, 0, 0])  # 按对象编号保存文件偏移，0 表示空闲
+            self._write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        else:
+            self.base = segment_base
+            self.offsets = array('q')
+
+    def _write(self, data):
+        self.stream.write(data)
+        self.offset += len(data)
+
+    def _allocate(self):
+        num = self.base + len(self.offsets)
+        if self.segment_limit is not None and num >= self.segment_limit:
+            raise SegmentOverflow()
+        self.offsets.append(0)
+        return num
+
+    def _write_object(self, num, write_body, is_stream=False):
+        buffer = BytesIO()
+        write_body(buffer)
+        if self.optimize and not is_stream:
+            self._add_to_object_stream(num, buffer.getvalue())
+        else:
+            self._write_direct(num, buffer.getvalue())
+
+    def _write_direct(self, num, body):
+        self.offsets[num - self.base] = self.offset
+        self._write(b"%d 0 obj\n" % num)
+        self._write(body)
+        self._write(b"\nendobj\n")
+
+    def _add_to_object_stream(self, num, body):
+        self._objstm.append((num, body))
+        self._objstm_size += len(body)
+        if len(self._objstm) >= OBJSTM_MAX_OBJECTS or self._objstm_size >= OBJSTM_MAX_BYTES:
+            self._flush_object_stream()
+
+    def _flush_object_stream(self):
+        """把排队的对象压缩成一个对象流写出"""
+        if not self._objstm:
+            return
+        stream_num = self._allocate()
+        header = []
+        body = BytesIO()
+        for num, data in self._objstm:
+            header.append(b"%d %d" % (num, body.tell()))
+            body.write(data)
+            body.write(b"\n")
+        header = b" ".join(header) + b"\n"
+        start = time.perf_counter()
+        data = zlib.compress(header + body.getvalue())
+        self.compress_seconds += time.perf_counter() - start
+        self._write_direct(stream_num, b"<<\n/Type /ObjStm\n/N %d\n/First %d\n/Filter /FlateDecode\n/Length %d\n>>"
+                                       b"\nstream\n%s\nendstream" % (len(self._objstm), len(header), len(data), data))
+        for index, (num, _) in enumerate(self._objstm):
+            self.offsets[num - self.base] = -((stream_num << OBJSTM_INDEX_BITS) | index) - 1
+        self._objstm = []
+        self._objstm_size = 0
+
+    def append_pages(self, reader, pages=None, progress=None, cancel_check=None, after_page=None):
+        """把 reader 中的页面（默认全部）按顺序追加到输出
+
+        progress(page_index, page_count) 每写完一页回调一次；
+        cancel_check() 在每页开始前调用，可抛出异常中止；
+        after_page() 在每页写完后调用，可用于按内存上限清理读取器缓存。
+        """
+        if pages is None:
+            pages = reader.pages
+        pages = list(pages)
+        mapping = {}
+
+        # 先为所有页面分配编号，页面之间的链接（如书签目标）可以直接指向新编号
+        page_nums = []
+        for page in pages:
+            num = self._allocate()
+            ref = page.indirect_reference
+            if ref is not None:
+                mapping[(ref.idnum, ref.generation)] = num
+            page_nums.append(num)
+        page_set = set(page_nums)
+
+        try:
+            for index, (page, num) in enumerate(zip(pages, page_nums)):
+                if cancel_check is not None:
+                    cancel_check()
+                pending = []
+                self._write_object(num, lambda out: self._write_page(out, page, mapping, pending))
+                self.page_refs.append(num)
+                self._drain(pending, mapping, page_set)
+                if after_page is not None:
+                    after_page()
+                if progress is not None:
+                    progress(index + 1, len(pages))
+        finally:
+            self._digests = {}
+            self._skipped = set()
+
+    def _write_page(self, out, page, mapping, pending):
+        out.write(b"<<\n")
+        for key, value in page.items():
+            if key in EXCLUDED_PAGE_KEYS:
+                continue
+            key.write_to_stream(out, None)
+            out.write(b" ")
+            self._write_value(out, value, mapping, pending)
+            out.write(b"\n")
+        out.write(b"/Parent %d 0 R\n>>" % PAGES_ROOT)
+
+    def _drain(self, pending, mapping, page_set):
+        """写出当前页面引用到的所有尚未写出的对象"""
+        while pending:
+            num, ref = pending.pop()
+            obj = ref.get_object()
+            if isinstance(obj, DictionaryObject) and obj.get("/Type") in ("/Page", "/Pages") \
+                    and num not in page_set:
+                # 指向未复制页面或原页面树的引用，写成空对象，避免把整个源文档带进来
+                self._write_object(num, lambda out: out.write(b"null"))
+                continue
+            self._write_object(num, lambda out: self._write_value(out, obj, mapping, pending),
+                               is_stream=isinstance(obj, StreamObject))
+
+    def _write_value(self, out, value, mapping, pending):
+        """写出对象，间接引用替换为输出文件中的新编号"""
+        if isinstance(value, IndirectObject):
+            key = (value.idnum, value.generation)
+            num = mapping.get(key)
+            if num is None:
+                digest = self._shareable_digest(value) if self.optimize else None
+                if digest is not None and digest[0] in self._shared:
+                    # 与已写出的对象内容相同，直接引用那一份
+                    num = mapping[key] = self._shared[digest[0]]
+                    self.shared_objects += 1
+                    self.saved_bytes += self._unwritten_bytes(value, mapping)
+                else:
+                    num = mapping[key] = self._allocate()
+                    if digest is not None:
+                        self._shared[digest[0]] = num
+                    pending.append((num, value))
+            out.write(b"%d 0 R" % num)
+        elif isinstance(value, StreamObject):
+            data = value._data
+            overrides = {"/Length": b"%d" % len(data)}
+            if self.optimize and "/Filter" not in value and len(data) >= MIN_COMPRESS_LENGTH \
+                    and value.get("/Type") != "/Metadata":  # XMP 元数据按惯例保持明文
+                start = time.perf_counter()
+                compressed = zlib.compress(data)
+                self.compress_seconds += time.perf_counter() - start
+                if len(compressed) < len(data):
+                    self.saved_bytes += len(data) - len(compressed)
+                    data = compressed
+                    overrides = {"/Length": b"%d" % len(data), "/Filter": b"/FlateDecode"}
+            self._write_dict(out, value, mapping, pending, overrides)
+            out.write(b"\nstream\n")
+            out.write(data)
+            out.write(b"\nendstream")
+        elif isinstance(value, DictionaryObject):
+            self._write_dict(out, value, mapping, pending)
+        elif isinstance(value, ArrayObject):
+            out.write(b"[")
+            for item in value:
+                out.write(b" ")
+                self._write_value(out, item, mapping, pending)
+            out.write(b" ]")
+        elif value is None:
+            out.write(b"null")
+        else:
+            value.write_to_stream(out, None)
+
+    def _write_dict(self, out, value, mapping, pending, overrides=None):
+        out.write(b"<<\n")
+        for key, item in value.items():
+            if overrides and key in overrides:
+                continue
+            key.write_to_stream(out, None)
+            out.write(b" ")
+            self._write_value(out, item, mapping, pending)
+            out.write(b"\n")
+        if overrides:
+            for key, item in overrides.items():
+                out.write(b"%s %s\n" % (key.encode(), item))
+        out.write(b">>")
+
+    def _unwritten_bytes(self, ref, mapping):
+        """共享对象时实际省去的流数据：对象及其引用的对象中尚未写出的部分"""
+        saved = 0
+        stack = [ref]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, IndirectObject):
+                key = (value.idnum, value.generation)
+                if key in self._skipped or (value is not ref and key in mapping):
+                    continue
+                self._skipped.add(key)
+                value = value.get_object()
+                if isinstance(value, StreamObject):
+                    saved += len(value._data)
+            if isinstance(value, DictionaryObject):
+                stack.extend(value.raw_get(key) for key in value)
+            elif isinstance(value, ArrayObject):
+                stack.extend(value)
+        return saved
+
+    def _shareable_digest(self, ref):
+        """返回 (摘要, 流数据字节数)：只有本身是流或引用了流的对象才值得共享，其余返回 None"""
+        try:
+            digest = self._digest(ref, set())
+        except RecursionError:
+            return None
+        if digest is None or not digest[1]:
+            return None
+        return digest
+
+    def _digest(self, ref, in_progress):
+        """计算对象内容的摘要，引用替换为被引用对象的摘要；页面、页面树和循环引用不能共享"""
+        key = (ref.idnum, ref.generation)
+        if key in self._digests:
+            return self._digests[key]
+        if key in in_progress:
+            return None
+        obj = ref.get_object()
+        result = None
+        if not (isinstance(obj, DictionaryObject) and obj.get("/Type") in ("/Page", "/Pages")):
+            in_progress.add(key)
+            hasher = hashlib.blake2b(digest_size=20)
+            stream_bytes = self._hash_value(obj, hasher, in_progress)
+            in_progress.discard(key)
+            if stream_bytes is not None:
+                result = (hasher.digest(), stream_bytes)
+        self._digests[key] = result
+        return result
+
+    def _hash_value(self, value, hasher, in_progress):
+        """把值加入摘要，返回其中流数据的字节数；包含不能共享的引用时返回 None"""
+        if isinstance(value, IndirectObject):
+            digest = self._digest(value, in_progress)
+            if digest is None:
+                return None
+            hasher.update(b"R" + digest[0])
+            return digest[1]
+        if isinstance(value, DictionaryObject):
+            stream_bytes = 0
+            hasher.update(b"<<")
+            for key in sorted(value):
+                if key == "/Length" and isinstance(value, StreamObject):
+                    continue
+                hasher.update(key.encode() + b" ")
+                item = self._hash_value(value.raw_get(key), hasher, in_progress)
+                if item is None:
+                    return None
+                stream_bytes += item
+            hasher.update(b">>")
+            if isinstance(value, StreamObject):
+                data = value._data
+                hasher.update(b"stream%d:" % len(data))
+                hasher.update(data)
+                stream_bytes += len(data)
+            return stream_bytes
+        if isinstance(value, ArrayObject):
+            stream_bytes = 0
+            hasher.update(b"[")
+            for item in value:
+                item_bytes = self._hash_value(item, hasher, in_progress)
+                if item_bytes is None:
+                    return None
+                stream_bytes += item_bytes
+            hasher.update(b"]")
+            return stream_bytes
+        buffer = BytesIO()
+        if value is None:
+            buffer.write(b"null")
+        else:
+            value.write_to_stream(buffer, None)
+        hasher.update(type(value).__name__.encode() + b":" + buffer.getvalue() + b" ")
+        return 0
+
+    def append_segment(self, segment_file, segment_base, offsets, page_refs, start=0, length=None):
+        """把片段原样拼接到当前位置
+
+        segment_file 为另一个写入器生成的片段文件，或已打开的二进制文件，从 start 处
+        读取 length 字节（如上次输出中可以重用的一段）。片段的对象编号可以位于任意尚未
+        使用的范围，不必按顺序；offsets 相对片段开头，-1 表示未使用的编号。
+        """
+        end = segment_base + len(offsets)
+        # 片段之间未使用的编号作为空闲对象
+        if len(self.offsets) < end:
+            self.offsets.extend(array('q', bytes(8 * (end - len(self.offsets)))))
+        if any(self.offsets[segment_base:end]):
+            raise ValueError("片段的对象编号与已写出的对象重叠")
+        position = self.offset
+        self.offsets[segment_base:end] = array('q', (position + offset if offset >= 0 else 0 for offset in offsets))
+        self.page_refs.extend(page_refs)
+        if isinstance(segment_file, str):
+            with open(segment_file, 'rb') as f:
+                self._copy(f, length)
+        else:
+            segment_file.seek(start)
+            self._copy(segment_file, length)
+
+    def _copy(self, f, length):
+        remaining = float('inf') if length is None else length
+        while remaining > 0:
+            chunk = f.read(int(min(COPY_CHUNK, remaining)))
+            if not chunk:
+                if length is not None:
+                    raise ValueError("片段数据不完整")
+                break
+            self._write(chunk)
+            remaining -= len(chunk)
+
+    def restore(self, segments):
+        """恢复到写完 segments（此前各次 segment_since() 的结果，按顺序）之后的状态
+
+        用于继续中断的合并：stream 中已有这些内容，调用方负责把 stream 定位到最后一个片段之后。
+        """
+        for segment in segments:
+            if segment["first"] != len(self.offsets):
+                raise ValueError("片段的对象编号不连续")
+            start = segment["start"]
+            self.offsets.extend(array('q', (start + offset if offset >= 0 else 0 for offset in segment["offsets"])))
+            self.page_refs.extend(segment["pages"])
+            self.offset = start + segment["length"]
+
+    def mark(self):
+        """记下当前位置，之后用 segment_since() 取得其间写出的片段"""
+        return self.offset, len(self.offsets), len(self.page_refs)
+
+    def segment_since(self, mark, first=None, stop=None):
+        """mark() 之后写出的内容作为可重用片段的描述，用于增量合并
+
+        返回字典：start、length 为片段在文件中的位置，first 为起始对象编号，
+        offsets 为各编号相对片段开头的偏移（-1 表示未使用），pages 为页面的对象编号。
+        first、stop 默认为 mark() 之后分配的编号（append_pages 的情形）。
+        """
+        start, mark_objects, mark_pages = mark
+        first = mark_objects if first is None else first
+        stop = len(self.offsets) if stop is None else stop
+        return {
+            "start": start,
+            "length": self.offset - start,
+            "first": first,
+            "offsets": [offset - start if offset > 0 else -1 for offset in self.offsets[first:stop]],
+            "pages": list(self.page_refs[mark_pages:]),
+        }
+
+    def close(self):
+        """写出页面树、文档目录、交叉引用表和文件尾"""
+        kids = b" ".join(b"%d 0 R" % num for num in self.page_refs)
+        self._write_object(PAGES_ROOT, lambda out: out.write(
+            b"<<\n/Type /Pages\n/Count %d\n/Kids [ %s ]\n>>" % (len(self.page_refs), kids)))
+        self._write_object(CATALOG, lambda out: out.write(
+            b"<<\n/Type /Catalog\n/Pages %d 0 R\n>>" % PAGES_ROOT))
+
+        if self.optimize:
+            self._flush_object_stream()
+            self._write_xref_stream()
+        else:
+            self._write_xref_table()
+        self.stream.flush()
+
+    def _write_xref_table(self):
+        xref_offset = self.offset
+        size = len(self.offsets)
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        # 分块写出交叉引用表，对象很多时也不会拼出巨大的字节串
+        for start in range(1, size, XREF_CHUNK):
+            end = min(start + XREF_CHUNK, size)
+            self._write(b"".join(b"%010d 00000 n \n" % self.offsets[num] if self.offsets[num]
+                                 else b"0000000000 00001 f \n" for num in range(start, end)))
+        self._write(b"trailer\n<<\n/Size %d\n/Root %d 0 R\n>>\nstartxref\n%d\n%%%%EOF\n"
+                    % (size, CATALOG, xref_offset))
+
+    def _write_xref_stream(self):
+        """写出压缩的交叉引用流（PDF 1.5），每个条目为 类型、偏移或对象流编号、序号"""
+        xref_num = self._allocate()
+        xref_offset = self.offset
+        self.offsets[xref_num - self.base] = xref_offset
+        size = len(self.offsets)
+        width = max(4, (xref_offset.bit_length() + 7) // 8)
+        compressor = zlib.compressobj()
+        chunks = []
+        for start in range(0, size, XREF_CHUNK):
+            rows = bytearray()
+            for num in range(start, min(start + XREF_CHUNK, size)):
+                value = self.offsets[num]
+                if num == 0:
+                    rows += b"\x00" + bytes(width) + b"\xff\xff"
+                elif value > 0:
+                    rows += b"\x01" + value.to_bytes(width, "big") + b"\x00\x00"
+                elif value < 0:
+                    packed = -value - 1
+                    rows += b"\x02" + (packed >> OBJSTM_INDEX_BITS).to_bytes(width, "big") \
+                        + (packed & ((1 << OBJSTM_INDEX_BITS) - 1)).to_bytes(2, "big")
+                else:
+                    rows += b"\x00" + bytes(width) + b"\x00\x01"
+            chunks.append(compressor.compress(bytes(rows)))
+        chunks.append(compressor.flush())
+        data = b"".join(chunks)
+        self._write(b"%d 0 obj\n<<\n/Type /XRef\n/Size %d\n/W [ 1 %d 2 ]\n/Root %d 0 R\n"
+                    b"/Filter /FlateDecode\n/Length %d\n>>\nstream\n" % (xref_num, size, width, CATALOG, len(data)))
+        self._write(data)
+        self._write(b"\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
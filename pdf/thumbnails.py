@@ -0,0 +1,460 @@
+"""缩略图：在后台线程中以低分辨率渲染PDF页面和图片，缓存在内存和磁盘中
+
+内存中按 LRU 保留最近显示过的缩略图，并记下渲染时文件的大小和修改时间，同一路径的文件
+被改写（如重新扫描或重新合并的输出）后重新渲染。磁盘缓存以文件内容的哈希和页码为键，
+文件改名、移动后仍然有效，再次打开同一文档时无需重新渲染。
+视图只在绘制某一项时请求它的缩略图，最近请求的排在最前面，可见区域总是先渲染；
+滚动过去还没渲染的请求超过 MAX_PENDING 个时丢弃最早的。
+
+PDF 页面用 pypdfium2 渲染，没有安装时只显示页码占位；图片用 Pillow 缩小。
+两者都在第一次渲染时才导入。
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from io import BytesIO
+
+from PyQt5.QtCore import (Qt, QObject, QAbstractListModel, QModelIndex, QRect, QSize, QTimer,
+                          QItemSelection, QItemSelectionModel, pyqtSignal)
+from PyQt5.QtGui import QColor, QFont, QImage
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+
+from file_list import THUMBNAIL_ROLE, draw_thumbnail
+from job_engine import BatchJob, JobEngine
+from pdf_ops import IMAGE_EXTENSIONS
+
+# 缩略图长边的像素数，视图按需缩小显示
+THUMBNAIL_SIZE = 160
+# 内存缓存的预算（MB）
+DEFAULT_MEMORY_BUDGET = int(os.environ.get("PDF_TOOLBOX_THUMBNAIL_MB", "64")) * 1024 * 1024
+# 磁盘缓存的上限，超出时删除最久未使用的缩略图
+DISK_CACHE_LIMIT = 256 * 1024 * 1024
+# 渲染线程数；pdfium 不是线程安全的，PDF 页面依次渲染，图片可以同时缩小
+THUMBNAIL_THREADS = 2
+MAX_PENDING = 200
+# 渲染失败的页面在文件改动后或经过这么多秒后重试（文件可能正在写入或被占用）
+FAILED_RETRY_INTERVAL = 60.0
+# 内存中的缩略图每隔这么多秒（在显示时）检查一次文件是否被改写，不必每次绘制都读取文件信息
+STAMP_CHECK_INTERVAL = 2.0
+# file_hash 缓存的条目数上限，超出时丢弃最久未使用的
+HASH_CACHE_SIZE = 4096
+# 计算文件哈希时读取开头和结尾各这么多字节，不必读完整个大文件
+HASH_SAMPLE_SIZE = 1024 * 1024
+
+
+def default_cache_dir():
+    """磁盘缓存目录，环境变量 PDF_TOOLBOX_THUMBNAIL_DIR 可指定其他目录，设为空字符串则关闭"""
+    configured = os.environ.get("PDF_TOOLBOX_THUMBNAIL_DIR")
+    if configured is not None:
+        return configured or None
+    return os.path.join(os.path.expanduser("~"), ".pdf-toolbox", "thumbnails")
+
+
+cache_dir = default_cache_dir()
+
+_hash_lock = threading.Lock()
+_hashes = OrderedDict()
+_pdfium_lock = threading.Lock()
+_pdfium_document = None  # (路径, 文件大小, 修改时间, PdfDocument)
+_pruned = False
+
+
+def file_hash(path):
+    """文件内容的哈希：文件大小加上开头和结尾各 HASH_SAMPLE_SIZE 字节
+
+    PDF 改动后结尾的交叉引用表和文件标识总会变化，不必读完整个文件。
+    结果按 (路径, 大小, 修改时间) 缓存，最多 HASH_CACHE_SIZE 条。
+    """
+    stat = os.stat(path)
+    key = (os.path.normcase(os.path.abspath(path)), stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        digest = _hashes.get(key)
+        if digest is not None:
+            _hashes.move_to_end(key)
+    if digest is not None:
+        return digest
+    h = hashlib.blake2b(str(stat.st_size).encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        h.update(f.read(HASH_SAMPLE_SIZE))
+        if stat.st_size > 2 * HASH_SAMPLE_SIZE:
+            f.seek(-HASH_SAMPLE_SIZE, os.SEEK_END)
+        h.update(f.read(HASH_SAMPLE_SIZE))
+    digest = h.hexdigest()
+    with _hash_lock:
+        _hashes[key] = digest
+        while len(_hashes) > HASH_CACHE_SIZE:
+            _hashes.popitem(last=False)
+    return digest
+
+
+def _cache_file(digest, page):
+    return os.path.join(cache_dir, digest[:2], f"{digest}-{page}-{THUMBNAIL_SIZE}.png")
+
+
+def load_thumbnail(path, page):
+    """返回 path 第 page 页（从 0 开始，图片为 0）缩略图的 PNG 数据，先查磁盘缓存"""
+    cache_file = _cache_file(file_hash(path), page) if cache_dir else None
+    if cache_file is not None:
+        try:
+            with open(cache_file, 'rb') as f:
+                data = f.read()
+            os.utime(cache_file)  # 修改时间用于淘汰最久未使用的缩略图
+            return data
+        except OSError:
+            pass
+    data = render_thumbnail(path, page)
+    if cache_file is not None and data is not None:
+        _store(cache_file, data)
+    return data
+
+
+def _store(cache_file, data):
+    """写入磁盘缓存；先写临时文件再改名，其他线程不会读到写了一半的缩略图"""
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, temp_file = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(cache_file))
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                out.write(data)
+            os.replace(temp_file, cache_file)
+        except BaseException:
+            os.remove(temp_file)
+            raise
+    except OSError:
+        pass  # 缓存写不进去时只是下次重新渲染
+
+
+def prune_disk_cache(limit=DISK_CACHE_LIMIT):
+    """磁盘缓存超过 limit 字节时，按修改时间删除最久未使用的缩略图"""
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return
+    entries = []
+    total = 0
+    for root, _, names in os.walk(cache_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def render_thumbnail(path, page, size=THUMBNAIL_SIZE):
+    """把一页PDF或一张图片缩小到长边 size 像素，返回 PNG 数据；无法渲染时返回 None"""
+    if path.lower().endswith(IMAGE_EXTENSIONS):
+        from PIL import Image, ImageOps
+        with Image.open(path) as original:
+            original.draft("RGB", (size, size))  # JPEG 在解码时直接缩小
+            image = ImageOps.exif_transpose(original)
+            image.thumbnail((size, size))
+            if image.mode not in ("RGB", "RGBA", "L"):
+                image = image.convert("RGBA")
+    else:
+        image = _render_pdf_page(path, page, size)
+        if image is None:
+            return None
+    output = BytesIO()
+    image.save(output, "PNG")
+    return output.getvalue()
+
+
+def _render_pdf_page(path, page, size):
+    global _pdfium_document
+    try:
+        import pypdfium2
+    except ImportError:
+        return None
+    stat = os.stat(path)
+    with _pdfium_lock:
+        # 依次渲染同一文档的多页时只打开一次
+        if _pdfium_document is None or _pdfium_document[:3] != (path, stat.st_size, stat.st_mtime_ns):
+            _close_document()
+            _pdfium_document = (path, stat.st_size, stat.st_mtime_ns, pypdfium2.PdfDocument(path))
+        pdf_page = _pdfium_document[3][page]
+        try:
+            width, height = pdf_page.get_size()
+            bitmap = pdf_page.render(scale=size / max(width, height, 1))
+            return bitmap.to_pil()
+        finally:
+            pdf_page.close()
+
+
+def _close_document():
+    global _pdfium_document
+    if _pdfium_document is not None:
+        _pdfium_document[3].close()
+        _pdfium_document = None
+
+
+def release_document():
+    """关闭渲染时打开的文档；文档保持打开时 Windows 上无法覆盖该文件"""
+    with _pdfium_lock:
+        _close_document()
+
+
+def _file_stamp(path):
+    """文件的大小和修改时间，文件不存在时返回 None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class ThumbnailJob(BatchJob):
+    """从 loader 的请求队列中依次取出 (路径, 页码) 渲染
+
+    found 信号携带 (键, QImage 或 None, 渲染前文件的大小和修改时间)。
+    """
+    stage = "render"
+
+    def __init__(self, loader):
+        super().__init__()
+        self.loader = loader
+
+    def items(self):
+        global _pruned
+        try:
+            while not self.cancel_event.is_set():
+                key = self.loader.next_request()
+                if key is None:
+                    break
+                # 在渲染前取得，渲染期间文件被改写时下次检查会发现不一致
+                stamp = _file_stamp(key[0])
+                try:
+                    data = load_thumbnail(*key)
+                except Exception:
+                    data = None
+                image = QImage.fromData(data, "PNG") if data else None
+                yield key, image if image is not None and not image.isNull() else None, stamp
+        finally:
+            release_document()
+        if not _pruned:
+            _pruned = True
+            prune_disk_cache()
+
+
+class ThumbnailLoader(QObject):
+    """按需加载缩略图：thumbnail() 立即返回已缓存的图片，没有时排队在后台渲染
+
+    渲染完成后发出 updated 信号，视图据此重绘。只在界面线程中调用。
+    """
+    updated = pyqtSignal()
+
+    def __init__(self, parent=None, memory_budget=DEFAULT_MEMORY_BUDGET, threads=THUMBNAIL_THREADS):
+        super().__init__(parent)
+        self.memory_budget = memory_budget
+        self.threads = threads
+        self.used = 0
+        self.engine = JobEngine(self, max_threads=threads)
+        self._images = OrderedDict()  # 键 -> [QImage, 文件大小和修改时间, 上次检查的时间]
+        self._failed = {}  # 键 -> (文件大小和修改时间, 失败的时间)
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._queued = set()  # 已排队或正在渲染的键
+        self._new = []
+        self._jobs = set()
+
+    def thumbnail(self, path, page=0):
+        """返回缩略图（QImage），尚未渲染或无法渲染时返回 None"""
+        key = (path, page)
+        entry = self._images.get(key)
+        if entry is not None:
+            now = time.monotonic()
+            if now - entry[2] >= STAMP_CHECK_INTERVAL:
+                if _file_stamp(path) != entry[1]:
+                    # 文件已被改写，丢弃后重新渲染
+                    self.used -= self._images.pop(key)[0].sizeInBytes()
+                    entry = None
+                else:
+                    entry[2] = now
+            if entry is not None:
+                self._images.move_to_end(key)
+                return entry[0]
+        if key in self._failed and self._should_retry(key):
+            del self._failed[key]
+        if key not in self._failed and key not in self._queued:
+            self._queued.add(key)
+            if not self._new:
+                # 同一次绘制中的请求合并后一起排到队首
+                QTimer.singleShot(0, self._dispatch)
+            self._new.append(key)
+        return None
+
+    def forget(self, path):
+        """丢弃 path 在内存中的缩略图，文件改动后调用"""
+        for key in [key for key in self._images if key[0] == path]:
+            self.used -= self._images.pop(key)[0].sizeInBytes()
+        self._failed = {key: value for key, value in self._failed.items() if key[0] != path}
+
+    def _should_retry(self, key):
+        stamp, failed_at = self._failed[key]
+        return time.monotonic() - failed_at >= FAILED_RETRY_INTERVAL or _file_stamp(key[0]) != stamp
+
+    def next_request(self):
+        """由渲染线程调用，取出最近请求的键；队列为空时返回 None"""
+        with self._lock:
+            return self._queue.popleft() if self._queue else None
+
+    def _dispatch(self):
+        new, self._new = self._new, []
+        with self._lock:
+            self._queue.extendleft(reversed(new))
+            while len(self._queue) > MAX_PENDING:
+                self._queued.discard(self._queue.pop())
+        self._start_jobs()
+
+    def _start_jobs(self):
+        with self._lock:
+            waiting = len(self._queue)
+        while waiting > len(self._jobs) and len(self._jobs) < self.threads:
+            job = ThumbnailJob(self)
+            job.signals.found.connect(self._on_found)
+            job.signals.done.connect(lambda job=job: self._on_done(job))
+            self._jobs.add(job)
+            self.engine.start(job)
+
+    def _on_found(self, results):
+        now = time.monotonic()
+        for key, image, stamp in results:
+            self._queued.discard(key)
+            if image is None:
+                self._failed[key] = (stamp, now)
+                continue
+            old = self._images.pop(key, None)
+            if old is not None:
+                self.used -= old[0].sizeInBytes()
+            self._images[key] = [image, stamp, now]
+            self.used += image.sizeInBytes()
+        while self.used > self.memory_budget and len(self._images) > 1:
+            _, (image, _, _) = self._images.popitem(last=False)
+            self.used -= image.sizeInBytes()
+        self.updated.emit()
+
+    def _on_done(self, job):
+        self._jobs.discard(job)
+        # 线程结束前刚好有新请求排队时，再启动一个
+        self._start_jobs()
+
+    def shutdown(self, msecs=5000):
+        return self.engine.shutdown(msecs)
+
+
+class PageListModel(QAbstractListModel):
+    """一个PDF文件的全部页面，第 row 行为第 row + 1 页"""
+
+    def __init__(self, loader, parent=None):
+        super().__init__(parent)
+        self.loader = loader
+        self.path = None
+        self.pages = 0
+
+    def set_document(self, path, pages):
+        self.beginResetModel()
+        self.path = path
+        self.pages = pages
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.pages
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return str(index.row() + 1)
+        if role == THUMBNAIL_ROLE:
+            return self.loader.thumbnail(self.path, index.row())
+        return None
+
+
+class PageItemDelegate(QStyledItemDelegate):
+    """绘制页面缩略图和下方的页码；没有缩略图时显示空白页"""
+    CELL = QSize(92, 128)
+    IMAGE = QSize(76, 100)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.font = QFont()
+        self.font.setPixelSize(12)
+
+    def sizeHint(self, option, index):
+        return self.CELL
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect
+        selected = option.state & QStyle.State_Selected
+        if selected:
+            painter.fillRect(rect.adjusted(2, 2, -2, -2), QColor("#EEF7FF"))
+        box = QRect(rect.left() + (rect.width() - self.IMAGE.width()) // 2, rect.top() + 6,
+                    self.IMAGE.width(), self.IMAGE.height())
+        draw_thumbnail(painter, box, index.data(THUMBNAIL_ROLE), "#2B6DE8" if selected else "#E0E0E0")
+        painter.setFont(self.font)
+        painter.setPen(QColor("#2B6DE8" if selected else "#666666"))
+        painter.drawText(QRect(rect.left(), box.bottom() + 2, rect.width(), rect.bottom() - box.bottom() - 2),
+                         Qt.AlignCenter, index.data(Qt.DisplayRole))
+        painter.restore()
+
+
+class PageGridView(QListView):
+    """页面缩略图网格，可多选页面；pages_selected 携带选中的页码（从 1 开始）"""
+    pages_selected = pyqtSignal(list)
+
+    def __init__(self, loader, parent=None):
+        super().__init__(parent)
+        self.setModel(PageListModel(loader, self))
+        self.setItemDelegate(PageItemDelegate(self))
+        self.setViewMode(QListView.IconMode)
+        self.setMovement(QListView.Static)
+        self.setResizeMode(QListView.Adjust)
+        self.setWrapping(True)
+        self.setUniformItemSizes(True)  # 网格布局无需逐项计算尺寸，上千页也能立即排好
+        self.setGridSize(PageItemDelegate.CELL)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        loader.updated.connect(self.viewport().update)
+        self.selectionModel().selectionChanged.connect(self._emit_selection)
+        self._updating = False
+
+    def set_document(self, path, pages):
+        self.model().set_document(path, pages)
+
+    def selected_pages(self):
+        return sorted(index.row() + 1 for index in self.selectionModel().selectedIndexes())
+
+    def select_pages(self, pages):
+        """选中 pages 中的页码（从 1 开始），连续的页合并为一个选择范围"""
+        selection = QItemSelection()
+        model = self.model()
+        pages = sorted(set(pages))
+        start = 0
+        for i in range(1, len(pages) + 1):
+            if i == len(pages) or pages[i] != pages[i - 1] + 1:
+                selection.select(model.index(pages[start] - 1), model.index(pages[i - 1] - 1))
+                start = i
+        self._updating = True
+        try:
+            self.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+        finally:
+            self._updating = False
+        if pages:
+            self.scrollTo(model.index(pages[0] - 1))
+
+    def _emit_selection(self):
+        if not self._updating:
+            self.pages_selected.emit(self.selected_pages())
@@ -0,0 +1,249 @@
+"""监视文件夹：扫描仪等程序放入文件夹的PDF和图片写完后，自动分组合并或转换为PDF
+
+安装了 watchdog 时通过系统的文件通知（Linux 上为 inotify）得知文件夹的变化，空闲时几乎
+不占用CPU；没有时每隔 poll_interval 秒用 os.scandir 扫描一次。文件的大小和修改时间在
+settle 秒内不再变化才算写完。写完的文件按 rule 分组：
+
+    time  到达间隔不超过 gap 秒的文件为一组
+    name  文件名中 pattern 的第一个分组相同的文件为一组（默认为第一个“_”之前的部分）
+
+一组在 gap 秒内没有新文件后处理：先把文件移动到 已处理/组名/，再按文件名顺序合并（PDF）
+或转换（图片）为 输出/组名.pdf。处理过的文件不再留在被监视的文件夹中，重启后也不会重复处理。
+输出文件在分组时即以空文件占用（见 reserve_path），同名的组（如同时到达的 a_1.pdf 和 a_1.jpg，
+或前一组仍在队列中等待时又来了同名的组）得到 组名_2.pdf 等不同的输出，不会相互覆盖。
+本模块不依赖 PyQt5，界面中通过 job_engine.WatchJob 运行。
+"""
+import os
+import re
+import shutil
+import threading
+import time
+
+from pdf_ops import (PDF_EXTENSIONS, IMAGE_EXTENSIONS, DEFAULT_IMAGE_PROFILE,
+                     merge_pdf_files, images_to_pdf)
+import instrument
+
+RULES = ("time", "name")
+DEFAULT_GAP = 30.0
+DEFAULT_SETTLE = 2.0
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_PATTERN = r"^([^_]+)_"
+# 使用文件通知时仍定期扫描一次，以免漏掉通知
+RESCAN_INTERVAL = 60.0
+# 检查是否已停止的间隔（秒）
+CANCEL_CHECK_INTERVAL = 0.5
+# 一组的文件数达到该值时不再等待，立即处理
+MAX_GROUP_FILES = 500
+PROCESSED_DIR_NAME = "已处理"
+OUTPUT_DIR_NAME = "输出"
+
+
+class WatchGroup:
+    """一组已移入 已处理 文件夹、等待合并或转换的文件"""
+    __slots__ = ("name", "kind", "files", "output")
+
+    def __init__(self, name, kind, files, output):
+        self.name = name
+        self.kind = kind  # "pdf" 或 "image"
+        self.files = files
+        self.output = output
+
+
+def file_kind(name):
+    lower = name.lower()
+    if lower.endswith(PDF_EXTENSIONS):
+        return "pdf"
+    if lower.endswith(IMAGE_EXTENSIONS):
+        return "image"
+    return None
+
+
+def reserve_path(path, directory=False):
+    """创建空文件（directory 为 True 时创建文件夹）占用 path，已存在时依次尝试 _2、_3……
+
+    检查和创建是同一个操作，多个组或多个程序同时分组时也不会得到同一个路径。返回占用的路径。
+    """
+    stem, ext = os.path.splitext(path) if not directory else (path, "")
+    candidate, index = path, 2
+    while True:
+        try:
+            if directory:
+                os.mkdir(candidate)
+            else:
+                os.close(os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+            return candidate
+        except FileExistsError:
+            candidate = f"{stem}_{index}{ext}"
+            index += 1
+
+
+def notifications_available():
+    """是否安装了 watchdog"""
+    import importlib.util
+    return importlib.util.find_spec("watchdog") is not None
+
+
+def start_observer(folder, wake):
+    """用 watchdog 监视 folder，有变化时置位 wake；未安装 watchdog 或无法监视时返回 None"""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            wake.set()
+
+    try:
+        observer = Observer()
+        observer.schedule(Handler(), folder, recursive=False)
+        observer.start()
+    except OSError:
+        return None
+    return observer
+
+
+class FolderWatcher:
+    """监视 folder，groups() 逐个返回可以处理的 WatchGroup"""
+
+    def __init__(self, folder, output_dir=None, processed_dir=None, rule="time", gap=DEFAULT_GAP,
+                 pattern=DEFAULT_PATTERN, settle=DEFAULT_SETTLE, poll_interval=DEFAULT_POLL_INTERVAL,
+                 kinds=("pdf", "image"), polling=False):
+        if rule not in RULES:
+            raise ValueError(f"未知的分组规则: {rule}")
+        self.folder = os.path.abspath(folder)
+        self.output_dir = output_dir or os.path.join(self.folder, OUTPUT_DIR_NAME)
+        self.processed_dir = processed_dir or os.path.join(self.folder, PROCESSED_DIR_NAME)
+        self.rule = rule
+        self.gap = gap
+        self.pattern = re.compile(pattern)
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.kinds = kinds
+        self.polling = polling
+        self.using_notifications = False
+        self._pending = {}  # 路径 -> ((大小, 修改时间), 开始不变的时间)
+        self._grouped = set()
+        self._groups = {}  # 分组键 -> {"name", "kind", "files", "last"}
+
+    def groups(self, cancel_event=None):
+        """持续监视，逐个返回已移入 已处理 文件夹的组，cancel_event 被置位时结束"""
+        wake = threading.Event()
+        observer = None if self.polling else start_observer(self.folder, wake)
+        self.using_notifications = observer is not None
+        try:
+            while cancel_event is None or not cancel_event.is_set():
+                now = time.monotonic()
+                self._scan(now)
+                yield from self._due_groups(now)
+                self._wait(wake, self._timeout(time.monotonic()), cancel_event)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def _wait(self, wake, timeout, cancel_event):
+        deadline = time.monotonic() + timeout
+        while cancel_event is None or not cancel_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or wake.wait(min(remaining, CANCEL_CHECK_INTERVAL)):
+                break
+        wake.clear()
+
+    def _timeout(self, now):
+        """到下一次需要扫描或处理的时间"""
+        timeout = RESCAN_INTERVAL if self.using_notifications else self.poll_interval
+        if self._pending:
+            timeout = min(timeout, self.settle)
+        for group in self._groups.values():
+            timeout = min(timeout, max(0.0, group["last"] + self.gap - now))
+        return timeout
+
+    def _scan(self, now):
+        """扫描文件夹，大小和修改时间 settle 秒内不变的文件加入分组"""
+        seen = set()
+        try:
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    if entry.name.startswith('.') or entry.path in self._grouped:
+                        continue
+                    kind = file_kind(entry.name)
+                    if kind not in self.kinds:
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    seen.add(entry.path)
+                    stamp = (stat.st_size, stat.st_mtime_ns)
+                    state = self._pending.get(entry.path)
+                    if state is None or state[0] != stamp:
+                        self._pending[entry.path] = (stamp, now)
+                    elif now - state[1] >= self.settle and stat.st_size > 0:
+                        del self._pending[entry.path]
+                        self._add(entry.path, kind, now)
+        except FileNotFoundError:
+            pass
+        for path in list(self._pending):
+            if path not in seen:
+                del self._pending[path]
+
+    def _add(self, path, kind, now):
+        if self.rule == "name":
+            stem = os.path.splitext(os.path.basename(path))[0]
+            match = self.pattern.search(stem)
+            name = (match.group(1) if match.re.groups else match.group(0)) if match else stem
+        else:
+            name = None
+        key = (kind, name)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = {"name": name or time.strftime("%Y%m%d-%H%M%S"),
+                                         "kind": kind, "files": []}
+        group["files"].append(path)
+        group["last"] = now
+        self._grouped.add(path)
+
+    def _due_groups(self, now):
+        for key, group in list(self._groups.items()):
+            if now - group["last"] >= self.gap or len(group["files"]) >= MAX_GROUP_FILES:
+                del self._groups[key]
+                self._grouped.difference_update(group["files"])
+                staged = self._stage(group)
+                if staged is not None:
+                    yield staged
+
+    def _stage(self, group):
+        """把一组文件按文件名顺序移动到 已处理/组名/ 并占用输出文件，返回 WatchGroup；文件都已不在时返回 None"""
+        os.makedirs(self.processed_dir, exist_ok=True)
+        target_dir = reserve_path(os.path.join(self.processed_dir, group["name"]), directory=True)
+        files = []
+        for path in sorted(group["files"], key=os.path.basename):
+            target = os.path.join(target_dir, os.path.basename(path))
+            try:
+                shutil.move(path, target)
+            except FileNotFoundError:
+                continue
+            files.append(target)
+        if not files:
+            os.rmdir(target_dir)
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        # 输出在处理时才写出，先用空文件占用，之后分组的同名组不会选中同一个文件
+        output = reserve_path(os.path.join(self.output_dir, group["name"] + ".pdf"))
+        return WatchGroup(group["name"], group["kind"], files, output)
+
+
+def process_group(group, paper_type="原图", profile=DEFAULT_IMAGE_PROFILE, workers=None,
+                  progress=None, cancel_event=None):
+    """合并或转换一组文件，返回输出文件"""
+    with instrument.job("watch_" + group.kind, group=group.name, files=len(group.files)):
+        if group.kind == "pdf":
+            merge_pdf_files(group.files, group.output, progress, cancel_event, workers=workers)
+        else:
+            images_to_pdf(group.files, group.output, paper_type, progress, cancel_event,
+                          workers=workers, profile=profile)
+    return group.output
@@ -0,0 +1,12 @@
+"""测试运行时从 pdf/ 和 benchmarks/ 导入模块，并关闭性能日志和缩略图磁盘缓存"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("PDF_TOOLBOX_LOG", "")
+os.environ.setdefault("PDF_TOOLBOX_QUEUE_DB", "")
+os.environ.setdefault("PDF_TOOLBOX_THUMBNAIL_DIR", "")
+for directory in ("pdf", "benchmarks"):
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
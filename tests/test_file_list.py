@@ -0,0 +1,50 @@
+"""文件列表模型：拖动排序后的顺序与按行号重新排列的结果相同"""
+import random
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from PyQt5.QtCore import QPersistentModelIndex  # noqa: E402
+
+from file_list import FileListModel  # noqa: E402
+
+
+def expected_order(paths, rows, target):
+    rows = sorted(set(rows))
+    insert_at = target - sum(1 for row in rows if row < target)
+    remaining = [path for row, path in enumerate(paths) if row not in set(rows)]
+    return remaining[:insert_at] + [paths[row] for row in rows] + remaining[insert_at:]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_move_rows(seed):
+    rng = random.Random(seed)
+    model = FileListModel()
+    model.add_paths([f"/files/{index}.pdf" for index in range(30)])
+    before = model.paths()
+    rows = rng.sample(range(30), rng.randint(1, 8))
+    if seed % 2:
+        # 连续的多行
+        start = rng.randrange(25)
+        rows = list(range(start, start + 5))
+    target = rng.randint(0, 30)
+    model.move_rows(rows, target)
+    assert model.paths() == expected_order(before, rows, target)
+
+
+def test_move_keeps_persistent_indexes():
+    model = FileListModel()
+    model.add_paths([f"/files/{index}.pdf" for index in range(10)])
+    tracked = QPersistentModelIndex(model.index(7))
+    model.move_rows([6, 7], 1)
+    assert model.path(tracked.row()) == "/files/7.pdf"
+
+
+def test_remove_row_keeps_dedup_in_sync():
+    model = FileListModel()
+    model.add_paths(["/a/x.pdf", "/b/x.pdf", "/c/y.pdf"])
+    model.remove_row(1)
+    assert model.paths() == ["/a/x.pdf", "/c/y.pdf"]
+    assert "/b/x.pdf" not in model
+    assert model.add_paths(["/b/x.pdf", "/a/x.pdf"]) == 1
@@ -0,0 +1,67 @@
+"""增量合并：输入改动、调换顺序、删除输入和输出被改动后，结果与完整合并相同"""
+import os
+
+import pytest
+from PyPDF2 import PdfReader
+
+from corpus import make_pdf
+from pdf_ops import merge_pdf_files
+
+
+def pdf_content(path):
+    """页数和每页的文字"""
+    reader = PdfReader(path)
+    texts = [page.extract_text() for page in reader.pages]
+    assert all("the quick brown fox" in text for text in texts)
+    return len(texts), texts
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    return [make_pdf(str(tmp_path / f"{index}.pdf"), pages=index + 2, lines_per_page=3, seed=index)
+            for index in range(4)]
+
+
+def merge_twice(tmp_path, first, second):
+    """先增量合并 first，再增量合并 second 到同一输出，返回第二次的结果和完整合并的输出"""
+    output = str(tmp_path / "out.pdf")
+    merge_pdf_files(first, output, incremental=True)
+    result = merge_pdf_files(second, output, incremental=True)
+    fresh = str(tmp_path / "fresh.pdf")
+    merge_pdf_files(second, fresh)
+    assert pdf_content(output) == pdf_content(fresh)
+    return result
+
+
+def test_changed_input(tmp_path, inputs):
+    output = str(tmp_path / "out.pdf")
+    merge_pdf_files(inputs, output, incremental=True)
+    make_pdf(inputs[1], pages=1, lines_per_page=3, seed=10)
+    result = merge_pdf_files(inputs, output, incremental=True)
+    fresh = str(tmp_path / "fresh.pdf")
+    merge_pdf_files(inputs, fresh)
+    assert pdf_content(output) == pdf_content(fresh)
+    assert (result["reused"], result["rebuilt"]) == (3, 1)
+
+
+def test_reordered_inputs(tmp_path, inputs):
+    result = merge_twice(tmp_path, inputs, inputs[::-1])
+    assert (result["reused"], result["rebuilt"]) == (4, 0)
+
+
+def test_removed_input(tmp_path, inputs):
+    result = merge_twice(tmp_path, inputs, inputs[:1] + inputs[2:])
+    assert (result["reused"], result["rebuilt"]) == (3, 0)
+
+
+def test_stale_output_mtime(tmp_path, inputs):
+    output = str(tmp_path / "out.pdf")
+    merge_pdf_files(inputs, output, incremental=True)
+    stat = os.stat(output)
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    # 输出被其他程序改动过，合并记录失效，应完整合并
+    result = merge_pdf_files(inputs[1:], output, incremental=True)
+    fresh = str(tmp_path / "fresh.pdf")
+    merge_pdf_files(inputs[1:], fresh)
+    assert pdf_content(output) == pdf_content(fresh)
+    assert (result["reused"], result["rebuilt"]) == (0, 3)
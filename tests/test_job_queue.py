@@ -0,0 +1,56 @@
+"""任务队列：只接手已退出的程序留下的运行中任务"""
+import os
+import subprocess
+import sys
+
+import job_queue
+from job_queue import JobQueue, QUEUED, RUNNING
+
+CRASHED_OWNER = """
+import os, sys
+sys.path.insert(0, {pdf_dir!r})
+from job_queue import JobQueue
+queue = JobQueue({path!r})
+job_id = queue.enqueue("extract_pages", "a.pdf", [0], "b.pdf")
+queue.mark_running(job_id)
+print(job_id)
+os._exit(0)
+"""
+
+
+def test_recover_skips_live_owner(tmp_path):
+    path = str(tmp_path / "queue.db")
+    first = JobQueue(path)
+    job_id = first.enqueue("extract_pages", "a.pdf", [0], "b.pdf")
+    assert first.mark_running(job_id)
+    second = JobQueue(path)
+    # 另一个程序不能再次开始或接手仍在运行的任务
+    assert not second.mark_running(job_id)
+    assert second.recover() == 0
+    assert second.get(job_id)["status"] == RUNNING
+    first.close()
+    assert second.recover() == 1
+    assert second.get(job_id)["status"] == QUEUED
+
+
+def test_recover_after_crash(tmp_path):
+    path = str(tmp_path / "queue.db")
+    pdf_dir = os.path.dirname(os.path.abspath(job_queue.__file__))
+    # 子进程开始执行任务后直接退出，不关闭队列，如同崩溃
+    output = subprocess.check_output([sys.executable, "-c", CRASHED_OWNER.format(pdf_dir=pdf_dir, path=path)])
+    job_id = int(output)
+    queue = JobQueue(path)
+    assert queue.recover() == 1
+    assert queue.get(job_id)["status"] == QUEUED
+
+
+def test_interactive_lane(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"))
+    merge = queue.enqueue("merge_pdf_files", ["a.pdf", "b.pdf"], str(tmp_path / "out.pdf"))
+    extract = queue.enqueue("extract_pages", "a.pdf", [0], "b.pdf")
+    # 提取排在合并之后，但在自己的名额中最先
+    assert queue.next_queued() == merge
+    assert queue.next_queued(interactive=True) == extract
+    queue.mark_running(merge)
+    assert queue.next_queued() is None
+    assert queue.next_queued(interactive=True) == extract
@@ -0,0 +1,77 @@
+"""指定 work_dir 的合并中断后继续：只解析剩余的文件，结果与一次完成的合并相同"""
+import os
+import threading
+
+import pytest
+
+import pdf_ops
+from corpus import make_pdf
+from pdf_ops import OperationCancelled, merge_pdf_files
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    return [make_pdf(str(tmp_path / f"{index}.pdf"), pages=3, lines_per_page=3, seed=index)
+            for index in range(6)]
+
+
+def interrupted_merge(inputs, output, work_dir, stop_file):
+    """合并到第 stop_file 个文件的第 2 页时取消，返回收到的进度"""
+    cancel_event = threading.Event()
+    reports = []
+
+    def progress(file_index, file_count, page_index, page_count):
+        reports.append((file_index, page_index, page_count))
+        if file_index == stop_file and page_index == 2:
+            cancel_event.set()
+
+    with pytest.raises(OperationCancelled):
+        merge_pdf_files(inputs, output, progress, cancel_event, work_dir=work_dir)
+    return reports
+
+
+def parsed_files(monkeypatch):
+    parsed = []
+    reader = pdf_ops.document_cache.reader
+
+    def record(path):
+        parsed.append(os.path.basename(path))
+        return reader(path)
+
+    monkeypatch.setattr(pdf_ops.document_cache, "reader", record)
+    return parsed
+
+
+def test_resume_after_cancel(tmp_path, inputs, monkeypatch):
+    output, work_dir = str(tmp_path / "out.pdf"), str(tmp_path / ".work")
+    reports = interrupted_merge(inputs, output, work_dir, stop_file=3)
+    # 单进程合并仍按页报告进度
+    assert (0, 1, 3) in reports
+    assert not os.path.exists(output)
+
+    parsed = parsed_files(monkeypatch)
+    merge_pdf_files(inputs, output, work_dir=work_dir)
+    assert parsed == ["3.pdf", "4.pdf", "5.pdf"]
+    assert not os.path.exists(work_dir)
+
+    monkeypatch.undo()
+    fresh = str(tmp_path / "fresh.pdf")
+    merge_pdf_files(inputs, fresh)
+    with open(output, 'rb') as a, open(fresh, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_changed_input_is_merged_again(tmp_path, inputs, monkeypatch):
+    output, work_dir = str(tmp_path / "out.pdf"), str(tmp_path / ".work")
+    interrupted_merge(inputs, output, work_dir, stop_file=4)
+    make_pdf(inputs[2], pages=1, lines_per_page=3, seed=20)
+
+    parsed = parsed_files(monkeypatch)
+    merge_pdf_files(inputs, output, work_dir=work_dir)
+    assert parsed == ["2.pdf", "3.pdf", "4.pdf", "5.pdf"]
+
+    monkeypatch.undo()
+    fresh = str(tmp_path / "fresh.pdf")
+    merge_pdf_files(inputs, fresh)
+    with open(output, 'rb') as a, open(fresh, 'rb') as b:
+        assert a.read() == b.read()
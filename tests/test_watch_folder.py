@@ -0,0 +1,37 @@
+"""监视文件夹：同名的组得到不同的输出文件"""
+import os
+
+from corpus import make_bmp, make_pdf
+from watch_folder import FolderWatcher, process_group
+
+
+def stage_all(watcher):
+    """扫描两次（文件在两次之间不变即视为写完），返回所有到期的组"""
+    watcher._scan(0.0)
+    watcher._scan(1.0)
+    return list(watcher._due_groups(1.0))
+
+
+def test_same_stem_pdf_and_image_groups(tmp_path):
+    make_pdf(str(tmp_path / "invoice_1.pdf"), pages=2)
+    make_bmp(str(tmp_path / "invoice_1.bmp"), 40, 60)
+    watcher = FolderWatcher(str(tmp_path), rule="name", gap=0, settle=0, polling=True)
+    groups = stage_all(watcher)
+    assert sorted(group.kind for group in groups) == ["image", "pdf"]
+    assert len({group.output for group in groups}) == 2
+    assert all(os.path.exists(group.output) for group in groups)
+
+    for group in groups:
+        process_group(group)
+    assert all(os.path.getsize(group.output) > 0 for group in groups)
+
+
+def test_same_name_while_first_output_is_pending(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), rule="name", gap=0, settle=0, polling=True)
+    make_pdf(str(tmp_path / "scan_1.pdf"), pages=1)
+    first = stage_all(watcher)
+    # 第一组尚未处理（如仍在任务队列中）时又来了同名的组
+    make_pdf(str(tmp_path / "scan_2.pdf"), pages=1)
+    second = stage_all(watcher)
+    assert [group.name for group in first + second] == ["scan", "scan"]
+    assert first[0].output != second[0].output